@@ -0,0 +1,178 @@
+"""
+Budget threshold alerts, evaluated as expenses are written.
+
+Triggers keep expense_month_totals (per user, month and category) current on
+every expense write, however it is made, so checking a category against its
+limit takes a few primary-key lookups instead of re-summing the month. Write
+routes call check() before committing, as they call events.publish(); a
+category reaching a threshold is recorded once per month in budget_alerts and
+announced on the live updates stream. /api/alerts reads only these tables.
+"""
+
+import calendar
+from datetime import date, datetime
+
+from sqlalchemy import func, or_
+
+import events
+from database import Budget, BudgetAlert, Expense, ExpenseMonthTotal, ExpenseRollup, Settings, category_name, from_cents, to_cents
+
+# Percent of a category's limit, highest first, with the status the dashboard shows from it
+THRESHOLDS = [(100, 'exceeded'), (80, 'warning')]
+# The monthly reports' names for the same statuses
+REPORT_STATUSES = {'exceeded': 'over', 'warning': 'warning', 'safe': 'under', 'no_budget': 'no_budget'}
+RECENT_ALERTS = 20
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def prorate_cents(limit_cents, month, tracking_start):
+    """The share of a monthly limit for the days of month on or after tracking_start."""
+    if tracking_start is None or tracking_start <= month:
+        return limit_cents
+    if month_start(tracking_start) != month:
+        return 0  # tracking starts after this month
+    days_in_month = calendar.monthrange(month.year, month.month)[1]
+    days_tracked = days_in_month - tracking_start.day + 1
+    # Rounded in dollars, as budgets have always been prorated, so half cents go the same way
+    return to_cents(round(from_cents(limit_cents) / days_in_month * days_tracked, 2))
+
+
+def tracking_start(db_session, user_id):
+    setting = db_session.query(Settings.value).filter_by(user_id=user_id, key='tracking_start_date').scalar()
+    return datetime.strptime(setting, '%Y-%m-%d').date() if setting else None
+
+
+def month_limits(db_session, user_id, month, category_ids=None):
+    """{category_id: prorated limit in cents} of the budget versions in effect in month."""
+    query = db_session.query(Budget.category_id, Budget.monthly_limit_cents).filter(
+        Budget.user_id == user_id,
+        Budget.effective_from <= month,
+        or_(Budget.effective_to.is_(None), Budget.effective_to > month)
+    )
+    if category_ids is not None:
+        query = query.filter(Budget.category_id.in_(category_ids))
+    start = tracking_start(db_session, user_id)
+    return {category: prorate_cents(limit_cents, month, start) for category, limit_cents in query}
+
+
+def month_totals(db_session, user_id, month, category_ids=None):
+    """{category_id: cents} spent in month, from the running totals and the archive's rollups."""
+    if db_session.get_bind().dialect.name != 'sqlite':
+        # No totals triggers; sum the month's expenses instead
+        next_month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+        query = db_session.query(Expense.category_id, func.sum(Expense.amount_cents)).filter(
+            Expense.user_id == user_id, Expense.date >= month, Expense.date < next_month
+        ).group_by(Expense.category_id)
+        if category_ids is not None:
+            query = query.filter(Expense.category_id.in_(category_ids))
+    else:
+        query = db_session.query(ExpenseMonthTotal.category_id, ExpenseMonthTotal.total_cents).filter(
+            ExpenseMonthTotal.user_id == user_id, ExpenseMonthTotal.month == month
+        )
+        if category_ids is not None:
+            query = query.filter(ExpenseMonthTotal.category_id.in_(category_ids))
+    totals = dict(query.all())
+
+    # Archiving deletes expenses, taking them out of the running totals; their month's rollup keeps them
+    rollups = db_session.query(ExpenseRollup.category_id, ExpenseRollup.total_cents).filter(
+        ExpenseRollup.user_id == user_id, ExpenseRollup.month == month
+    )
+    if category_ids is not None:
+        rollups = rollups.filter(ExpenseRollup.category_id.in_(category_ids))
+    for category, cents in rollups:
+        totals[category] = totals.get(category, 0) + cents
+    return totals
+
+
+def status_for(spent_cents, limit_cents):
+    """The status of spending against a limit, in exact cents; every view and alert uses this."""
+    if limit_cents <= 0:
+        return 'no_budget'
+    for threshold, status in THRESHOLDS:
+        if spent_cents * 100 >= limit_cents * threshold:
+            return status
+    return 'safe'
+
+
+def check(db_session, user_id, month, category_ids=None):
+    """Record the thresholds the categories' spending in month has newly reached.
+
+    Runs in the caller's transaction after its writes are flushed; pass the
+    categories that changed, or None after a change to limits. Returns the new
+    BudgetAlert rows.
+    """
+    limits = month_limits(db_session, user_id, month, category_ids)
+    if not limits:
+        return []
+    totals = month_totals(db_session, user_id, month, list(limits))
+    reached = [
+        (category, threshold)
+        for category, limit_cents in limits.items() if limit_cents > 0
+        for threshold, _ in THRESHOLDS if totals.get(category, 0) * 100 >= limit_cents * threshold
+    ]
+    if not reached:
+        return []
+
+    recorded = set(db_session.query(BudgetAlert.category_id, BudgetAlert.threshold).filter(
+        BudgetAlert.user_id == user_id,
+        BudgetAlert.month == month,
+        BudgetAlert.category_id.in_({category for category, _ in reached})
+    ))
+    alerts = []
+    for category, threshold in reached:
+        if (category, threshold) in recorded:
+            continue
+        alert = BudgetAlert(
+            user_id=user_id,
+            month=month,
+            category_id=category,
+            threshold=threshold,
+            spent_cents=totals.get(category, 0),
+            limit_cents=limits[category]
+        )
+        db_session.add(alert)
+        alerts.append(alert)
+    if alerts:
+        db_session.flush()
+        for alert in alerts:
+            events.publish(db_session, user_id, 'budget_alert', alert.id, 'create', serialize_alert(alert))
+    return alerts
+
+
+def serialize_alert(alert):
+    return {
+        'id': alert.id,
+        'month': alert.month.strftime('%Y-%m'),
+        'category': alert.category,
+        'threshold': alert.threshold,
+        'status': dict(THRESHOLDS)[alert.threshold],
+        'spent': from_cents(alert.spent_cents),
+        'budget': from_cents(alert.limit_cents),
+        'created_at': alert.created_at.isoformat() if alert.created_at else None
+    }
+
+
+def month_status(db_session, user_id, month):
+    """Each budgeted or spent-in category's spending against its limit in month."""
+    limits = month_limits(db_session, user_id, month)
+    totals = month_totals(db_session, user_id, month)
+    categories = []
+    for category in set(limits) | set(totals):
+        spent_cents = totals.get(category, 0)
+        limit_cents = limits.get(category, 0)
+        categories.append({
+            'category': category_name(db_session, category),
+            'spent': from_cents(spent_cents),
+            'budget': from_cents(limit_cents),
+            'percentage': round(spent_cents * 100 / limit_cents, 1) if limit_cents > 0 else 0,
+            'status': status_for(spent_cents, limit_cents)
+        })
+    return sorted(categories, key=lambda c: -c['percentage'])
+
+
+def recent_alerts(db_session, user_id, limit=RECENT_ALERTS):
+    alerts = db_session.query(BudgetAlert).filter_by(user_id=user_id).order_by(BudgetAlert.id.desc()).limit(limit)
+    return [serialize_alert(alert) for alert in alerts]
@@ -1,62 +1,80 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, session, redirect, send_file, send_from_directory, url_for
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
-from sqlalchemy import func, extract
-from database import get_session, User, Expense, Budget, Settings, Saving, SavingsGoal, RecurringExpense
+from sqlalchemy import func, extract, literal, select, union_all, and_, or_, Date
+from database import (
+    get_session, get_user_session, user_placement, replica_lag, REPLICA_URLS, MAX_REPLICA_LAG, User, Expense, Budget, Settings, Saving, SavingsGoal, GoalContribution, RecurringExpense, SyncClock, SyncTombstone, Job,
+    CATEGORIES, category_id, category_name, to_cents, from_cents
+)
+import alerts
+import archive
+import assets
+import events
+import forecast
+import households
+import jobs
+import memory_profile
+import range_totals
+import reports
+import search
+import write_buffer
+from auth_pool import login_throttle, verify_password, LoginBusy
+import heapq
+import itertools
 import json
 import os
+import time
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 
-# Predefined categories
-CATEGORIES = [
-    'Groceries',
-    'Dining Out',
-    'Transportation',
-    'Gas',
-    'Entertainment',
-    'Utilities',
-    'Shopping',
-    'Healthcare',
-    'Housing',
-    'Insurance',
-    'Subscriptions',
-    'Other'
-]
+# Behind a reverse proxy (e.g. Render) trust its X-Forwarded-For so remote_addr is the client IP
+if int(os.environ.get('TRUSTED_PROXIES', 0)) > 0:
+    from werkzeug.middleware.proxy_fix import ProxyFix
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=int(os.environ['TRUSTED_PROXIES']))
+assets.init_app(app)
+memory_profile.init_app(app)
 
-def get_prorated_budget(user_id, year, month, monthly_budget, db_session):
-    """Calculate prorated budget based on tracking start date for a specific month."""
-    import calendar
-
-    # Get tracking start date from settings
-    tracking_setting = db_session.query(Settings).filter_by(
-        user_id=user_id,
-        key='tracking_start_date'
-    ).first()
-
-    if not tracking_setting or not tracking_setting.value:
-        # No tracking start date set, return full budget
-        return monthly_budget
-
-    tracking_start = datetime.strptime(tracking_setting.value, '%Y-%m-%d').date()
-
-    # Only prorate if tracking started in the same month/year we're calculating
-    if tracking_start.year != year or tracking_start.month != month:
-        # If tracking started before this month, use full budget
-        if tracking_start < datetime(year, month, 1).date():
-            return monthly_budget
-        # If tracking starts after this month, budget is 0
-        else:
-            return 0
+# Usernames allowed to use the /api/admin endpoints
+ADMIN_USERS = {name.strip() for name in os.environ.get('ADMIN_USERS', '').split(',') if name.strip()}
+
+# Number of expenses embedded in the initial page render
+EXPENSE_PAGE_SIZE = 50
 
-    # Calculate proration
-    days_in_month = calendar.monthrange(year, month)[1]
-    tracking_day = tracking_start.day
-    days_tracked = days_in_month - tracking_day + 1  # +1 to include the start day
+# Days of contributions used to estimate a goal's saving rate
+CONTRIBUTION_RATE_WINDOW = 90
 
-    prorated_budget = (monthly_budget / days_in_month) * days_tracked
-    return round(prorated_budget, 2)
+# Most rows per table returned by one /api/sync call
+SYNC_PAGE_SIZE = 2000
+
+def get_prorated_budget(user_id, year, month, monthly_budget, db_session):
+    """Calculate prorated budget based on tracking start date for a specific month."""
+    tracking_start = alerts.tracking_start(db_session, user_id)
+    return from_cents(alerts.prorate_cents(to_cents(monthly_budget), datetime(year, month, 1).date(), tracking_start))
+
+def get_current_budgets(user_id, db_session):
+    """The budget versions in effect now (the open-ended ones)."""
+    return db_session.query(Budget).filter(Budget.user_id == user_id, Budget.effective_to.is_(None)).all()
+
+def get_budget_limits_by_month(user_id, month_starts, db_session):
+    """Limits in effect for each month, as {month_start: {category: limit}}.
+
+    One interval join over ix_budgets_user_effective resolves any number of
+    months (e.g. a whole year for trends) at once.
+    """
+    months = union_all(*[select(literal(m, Date).label('month_start')) for m in month_starts]).cte('months')
+    rows = db_session.query(months.c.month_start, Budget.category_id, Budget.monthly_limit_cents).join(
+        Budget, and_(
+            Budget.user_id == user_id,
+            Budget.effective_from <= months.c.month_start,
+            or_(Budget.effective_to.is_(None), Budget.effective_to > months.c.month_start)
+        )
+    ).all()
+
+    limits = {m: {} for m in month_starts}
+    for month_start, category, limit_cents in rows:
+        limits[month_start][category_name(db_session, category)] = from_cents(limit_cents)
+    return limits
 
 def get_current_user():
     """Get the current logged-in user."""
@@ -75,15 +93,221 @@ def login_required(f):
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session:
             return jsonify({'error': 'Not authenticated'}), 401
+        # Writes pause while rebalance_shards.py copies the user to another shard
+        if request.method != 'GET' and user_placement(session['user_id'])[1]:
+            return jsonify({'success': False, 'error': 'Your data is being moved. Please try again shortly.'}), 503, {'Retry-After': '5'}
+        response = f(*args, **kwargs)
+        if request.method != 'GET':
+            # Read-your-writes: replicas serve this user again once they've caught up
+            session['last_write'] = time.time()
+        return response
+    return decorated_function
+
+def admin_required(f):
+    """Decorator to limit routes to the users listed in ADMIN_USERS."""
+    from functools import wraps
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({'error': 'Not authenticated'}), 401
+        if session.get('username') not in ADMIN_USERS:
+            return jsonify({'success': False, 'error': 'Admins only'}), 403
         return f(*args, **kwargs)
     return decorated_function
 
+def get_read_session(user_id):
+    """Session for a read-only route: a caught-up replica if there is one, else the primary."""
+    return get_user_session(user_id, read_only=True, fresh_after=session.get('last_write'))
+
+def commit_insert(user_id, db_session, insert):
+    """Run insert(db_session) and commit, via the group-commit buffer when it is enabled."""
+    if write_buffer.enabled():
+        return write_buffer.submit(user_id, insert)
+    result = insert(db_session)
+    db_session.commit()
+    return result
+
+@app.errorhandler(write_buffer.CommitTimeout)
+def commit_timeout(e):
+    # The row may still be committed, so clients should reload rather than blindly retry
+    return jsonify({'success': False, 'error': 'Saving is taking longer than usual. Please refresh and check before retrying.'}), 503
+
+def serialize_expense(e):
+    return {
+        'id': e.id,
+        'date': e.date.strftime('%Y-%m-%d'),
+        'category': e.category,
+        'amount': e.amount,
+        'description': e.description
+    }
+
+def serialize_saving(s):
+    return {
+        'id': s.id,
+        'date': s.date.strftime('%Y-%m-%d'),
+        'amount': s.amount,
+        'description': s.description
+    }
+
+def serialize_goal(g):
+    return {
+        'id': g.id,
+        'name': g.name,
+        'target_amount': g.target_amount,
+        'current_amount': g.current_amount,
+        'progress_percentage': round((g.current_amount_cents / g.target_amount_cents * 100) if g.target_amount_cents > 0 else 0, 1),
+        'is_archived': g.is_archived,
+        'created_at': g.created_at.isoformat() if g.created_at else None,
+        'completed_at': g.completed_at.isoformat() if g.completed_at else None
+    }
+
+def serialize_recurring(r):
+    return {
+        'id': r.id,
+        'name': r.name,
+        'category': r.category,
+        'amount': r.amount,
+        'frequency': r.frequency,
+        'start_date': r.start_date.strftime('%Y-%m-%d'),
+        'end_date': r.end_date.strftime('%Y-%m-%d') if r.end_date else None,
+        'day_of_month': r.day_of_month,
+        'day_of_week': r.day_of_week,
+        'last_generated': r.last_generated.strftime('%Y-%m-%d') if r.last_generated else None
+    }
+
+def project_goal_completion(goal, contributions):
+    """Saving rate over the last CONTRIBUTION_RATE_WINDOW days and when the goal will be reached at that rate."""
+    if goal.completed_at:
+        return {'daily_rate': None, 'projected_completion_date': goal.completed_at.date().isoformat()}
+
+    now = datetime.utcnow()
+    window_start = now - timedelta(days=CONTRIBUTION_RATE_WINDOW)
+    recent = [c for c in contributions if c.created_at >= window_start]
+    if not recent:
+        return {'daily_rate': None, 'projected_completion_date': None}
+
+    # Measure from the first contribution in the window so new goals aren't diluted
+    days = max(1, (now - min(c.created_at for c in recent)).days + 1)
+    daily_rate_cents = sum(c.amount_cents for c in recent) / days
+    remaining_cents = goal.target_amount_cents - (goal.current_amount_cents or 0)
+    if daily_rate_cents <= 0:
+        return {'daily_rate': from_cents(round(daily_rate_cents)), 'projected_completion_date': None}
+
+    days_left = max(0, remaining_cents) / daily_rate_cents
+    return {
+        'daily_rate': from_cents(round(daily_rate_cents)),
+        'projected_completion_date': (now + timedelta(days=days_left)).date().isoformat()
+    }
+
+def get_dashboard_data(user_id, db_session):
+    """Current month spending vs budget, shared by the dashboard API and the initial page state."""
+    # Get current month date range
+    now = datetime.now()
+    start_of_month = now.replace(day=1).date()
+    if now.month == 12:
+        end_of_month = now.replace(year=now.year + 1, month=1, day=1).date()
+    else:
+        end_of_month = now.replace(month=now.month + 1, day=1).date()
+
+    # Get budgets
+    budgets = get_current_budgets(user_id, db_session)
+    budget_dict = {b.category: b.monthly_limit for b in budgets}
+
+    # Get current month expenses by category
+    expenses = db_session.query(
+        Expense.category_id,
+        func.sum(Expense.amount_cents).label('total')
+    ).filter(
+        Expense.user_id == user_id,
+        Expense.date >= start_of_month,
+        Expense.date < end_of_month
+    ).group_by(Expense.category_id).all()
+
+    spending_dict = {category_name(db_session, e.category_id): from_cents(e.total) for e in expenses}
+
+    # Combine budget and spending data
+    dashboard_data = []
+    total_budget = 0
+    total_spent = 0
+
+    for category, limit in budget_dict.items():
+        # Get prorated budget for current month
+        prorated_limit = get_prorated_budget(user_id, now.year, now.month, limit, db_session)
+
+        spent = spending_dict.get(category, 0)
+        percentage = (spent / prorated_limit * 100) if prorated_limit > 0 else 0
+        # Decided in cents, like the recorded alerts, so both agree at the thresholds
+        status = alerts.status_for(to_cents(spent), to_cents(prorated_limit)) if prorated_limit > 0 else 'safe'
+
+        dashboard_data.append({
+            'category': category,
+            'budget': prorated_limit,
+            'spent': spent,
+            'remaining': max(0, prorated_limit - spent),
+            'percentage': round(percentage, 1),
+            'status': status
+        })
+
+        total_budget += prorated_limit
+        total_spent += spent
+
+    # Add categories with spending but no budget
+    for category, spent in spending_dict.items():
+        if category not in budget_dict:
+            dashboard_data.append({
+                'category': category,
+                'budget': 0,
+                'spent': spent,
+                'remaining': 0,
+                'percentage': 0,
+                'status': 'no_budget'
+            })
+            total_spent += spent
+
+    return {
+        'categories': dashboard_data,
+        'total_budget': round(total_budget, 2),
+        'total_spent': round(total_spent, 2),
+        'total_remaining': round(max(0, total_budget - total_spent), 2)
+    }
+
 
 @app.route('/')
 def index():
     if 'user_id' not in session:
         return redirect(url_for('login_page'))
-    return render_template('index.html', categories=CATEGORIES)
+
+    # Embed the first screen's data so the page is usable without extra round trips
+    user_id = session['user_id']
+    db_session = get_user_session(user_id)
+    try:
+        budgets = get_current_budgets(user_id, db_session)
+        expenses = db_session.query(Expense).filter_by(user_id=user_id).order_by(
+            Expense.date.desc(), Expense.id.desc()
+        ).limit(EXPENSE_PAGE_SIZE + 1).all()
+
+        initial_state = {
+            'auth': {'logged_in': True, 'username': session.get('username')},
+            'budgets': {b.category: b.monthly_limit for b in budgets},
+            'dashboard': get_dashboard_data(user_id, db_session),
+            'expenses': {
+                'items': [serialize_expense(e) for e in expenses[:EXPENSE_PAGE_SIZE]],
+                'has_more': len(expenses) > EXPENSE_PAGE_SIZE or archive.archive_boundary(db_session, user_id) is not None,
+                'page_size': EXPENSE_PAGE_SIZE
+            }
+        }
+    finally:
+        db_session.close()
+
+    return render_template('index.html', categories=CATEGORIES, initial_state=initial_state)
+
+@app.route('/sw.js')
+def service_worker():
+    """Serve the service worker from the root so its scope covers the whole app."""
+    response = send_from_directory(os.path.join(app.static_folder, 'js'), 'sw.js', mimetype='application/javascript')
+    # Browsers check for a new worker on each visit; don't let a cache answer for it
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/login')
 def login_page():
@@ -94,18 +318,38 @@ def login():
     data = request.json
     username = data.get('username')
     password = data.get('password')
+    # The account key counts failures from every client, so it only ever delays
+    # (see auth_pool); the per-client one is what blocks a single guesser for long
+    throttle_keys = (('user', username, request.remote_addr), ('account', username), ('ip', request.remote_addr))
+
+    retry_after = login_throttle.retry_after(*throttle_keys)
+    if retry_after:
+        return jsonify({'success': False, 'error': 'Too many login attempts. Please try again later.'}), 429, {'Retry-After': str(retry_after)}
 
     db_session = get_session()
     try:
         user = db_session.query(User).filter_by(username=username).first()
-        if user and user.check_password(password):
-            session['user_id'] = user.id
-            session['username'] = user.username
-            return jsonify({'success': True, 'username': user.username})
-        return jsonify({'success': False, 'error': 'Invalid username or password'}), 401
+        user_id = user.id if user else None
+        password_hash = user.password_hash if user else None
     finally:
         db_session.close()
 
+    # Verify outside the DB session; key derivation runs in the bounded hash pool
+    try:
+        valid = bool(password_hash and password) and verify_password(password_hash, password)
+    except LoginBusy as e:
+        return jsonify({'success': False, 'error': 'Login is busy. Please try again shortly.'}), 503, {'Retry-After': str(e.retry_after)}
+
+    if valid:
+        # Only the account's counts: a client mustn't clear its IP's by logging in to an account of its own
+        login_throttle.reset(*throttle_keys[:2])
+        session['user_id'] = user_id
+        session['username'] = username
+        return jsonify({'success': True, 'username': username})
+
+    login_throttle.record_failure(*throttle_keys)
+    return jsonify({'success': False, 'error': 'Invalid username or password'}), 401
+
 @app.route('/api/auth/signup', methods=['POST'])
 def signup():
     data = request.json
@@ -155,45 +399,261 @@ def get_current_user_info():
         return jsonify({'logged_in': True, 'username': session.get('username')})
     return jsonify({'logged_in': False})
 
+@app.route('/api/events')
+@login_required
+def events_stream():
+    """Server-Sent Events stream of the current user's data changes."""
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    return Response(
+        events.stream(session['user_id'], last_event_id),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/replication')
+@login_required
+def replication_status():
+    """Lag of each read replica behind its primary, as seen by this worker."""
+    status = {}
+    for shard, urls in REPLICA_URLS.items():
+        status[shard] = []
+        for index, url in enumerate(urls):
+            lag = replica_lag(url)
+            status[shard].append({
+                'replica': index,
+                'lag_seconds': round(lag, 3) if lag is not None else None,
+                'healthy': lag is not None and lag <= MAX_REPLICA_LAG
+            })
+    return jsonify({'max_lag_seconds': MAX_REPLICA_LAG, 'replicas': status})
+
+@app.route('/api/admin/memory')
+@admin_required
+def memory_status():
+    """RSS of every worker on this host and per-route peak allocations (with MEMORY_PROFILING on)."""
+    return jsonify(memory_profile.report())
+
+@app.route('/api/sync')
+@login_required
+def sync():
+    """Rows changed since the version (and epoch) returned by an earlier call, for clients keeping a local copy."""
+    user_id = session['user_id']
+    since = request.args.get('since', 0, type=int)
+    client_epoch = request.args.get('epoch')
+    synced = [
+        ('expenses', Expense, serialize_expense),
+        ('savings', Saving, serialize_saving),
+        ('savings_goals', SavingsGoal, serialize_goal),
+        ('recurring_expenses', RecurringExpense, serialize_recurring),
+    ]
+
+    # Versions only mean something on one shard, and a move copies the user's rows
+    # under new ids without tombstones for the old ones: the epoch names both
+    shard, _, sync_epoch = user_placement(user_id)
+    epoch = f"{shard}.{sync_epoch}"
+
+    # Always the primary: a lagging replica could hand back an older version than the client has
+    db_session = get_session(shard)
+    try:
+        clock = db_session.query(SyncClock).filter_by(id=1).first()
+        if clock is None:
+            return jsonify({'success': False, 'error': 'Sync is not available'}), 503
+
+        # Tombstones the client needs are gone, or the version is from another database
+        # or an earlier copy of the user's rows: start over from a full copy
+        reset = since > 0 and (client_epoch != epoch or since < clock.pruned_through or since > clock.version)
+        if reset:
+            since = 0
+
+        version = clock.version
+        has_more = False
+        pages = []
+        for name, model, serialize in synced + [('tombstones', SyncTombstone, None)]:
+            rows = db_session.query(model).filter(
+                model.user_id == user_id,
+                model.row_version > since
+            ).order_by(model.row_version).limit(SYNC_PAGE_SIZE + 1).all()
+            if len(rows) > SYNC_PAGE_SIZE:
+                # Stop where the shortest page ends so nothing below the returned version is skipped
+                has_more = True
+                version = min(version, rows[SYNC_PAGE_SIZE - 1].row_version)
+            pages.append(rows)
+
+        changes = {name: [] for name, _, _ in synced}
+        deleted = {name: [] for name, _, _ in synced}
+        for (name, _, serialize), rows in zip(synced, pages):
+            for row in rows:
+                if row.row_version > version:
+                    continue
+                if name == 'recurring_expenses' and not row.is_active:
+                    deleted[name].append(row.id)  # deactivated templates are deleted as far as clients care
+                else:
+                    changes[name].append(serialize(row))
+        for tombstone in pages[-1]:
+            if tombstone.row_version <= version and tombstone.entity in deleted:
+                deleted[tombstone.entity].append(tombstone.entity_id)
+
+        boundary = archive.archive_boundary(db_session, user_id)
+        return jsonify({
+            'user_id': user_id,
+            'version': version,
+            'epoch': epoch,
+            # Expenses dated before this live in the archive and aren't synced
+            'archived_before': boundary.isoformat() if boundary else None,
+            'reset': reset or since == 0,
+            'has_more': has_more,
+            'changes': changes,
+            'deleted': deleted
+        })
+    finally:
+        db_session.close()
+
+@app.route('/api/exports', methods=['POST'])
+@login_required
+def create_export():
+    """Queue an export of the user's data; poll /api/jobs/<id> and download when it succeeds."""
+    user_id = session['user_id']
+    db_session = get_session()
+    try:
+        # One export at a time per user
+        pending = db_session.query(Job).filter(
+            Job.user_id == user_id, Job.kind == 'export_user', Job.status.in_(['queued', 'running'])
+        ).first()
+    finally:
+        db_session.close()
+
+    job_id = pending.id if pending else jobs.enqueue('export_user', user_id=user_id)
+    return jsonify({'success': True, 'job_id': job_id}), 202
+
+@app.route('/api/jobs/<int:job_id>')
+@login_required
+def job_status(job_id):
+    """Status and progress of one of the user's background jobs."""
+    db_session = get_session()
+    try:
+        job = db_session.query(Job).filter_by(id=job_id, user_id=session['user_id']).first()
+        if not job:
+            return jsonify({'success': False, 'error': 'Job not found'}), 404
+        return jsonify(jobs.serialize_job(job))
+    finally:
+        db_session.close()
+
+@app.route('/api/jobs/<int:job_id>/download')
+@login_required
+def job_download(job_id):
+    """The file a finished export job wrote."""
+    db_session = get_session()
+    try:
+        job = db_session.query(Job).filter_by(id=job_id, user_id=session['user_id'], kind='export_user').first()
+        if not job:
+            return jsonify({'success': False, 'error': 'Job not found'}), 404
+        if job.status != 'succeeded':
+            return jsonify({'success': False, 'error': 'Export is not ready'}), 409
+        filename = json.loads(job.result)['filename']
+    finally:
+        db_session.close()
+
+    if not os.path.exists(filename):
+        return jsonify({'success': False, 'error': 'Export has expired'}), 410
+    return send_file(os.path.abspath(filename), mimetype='application/json', as_attachment=True,
+                     download_name=f'budget-export-{job_id}.json')
+
 @app.route('/api/expenses', methods=['GET', 'POST'])
 @login_required
 def expenses():
     user_id = session['user_id']
-    db_session = get_session()
+    db_session = get_user_session(user_id)
     try:
         if request.method == 'POST':
             data = request.json
-            expense = Expense(
+            category = data['category']
+            values = dict(
                 user_id=user_id,
                 date=datetime.strptime(data['date'], '%Y-%m-%d').date(),
-                category=data['category'],
                 amount=float(data['amount']),
                 description=data.get('description', '')
             )
-            db_session.add(expense)
-            db_session.commit()
-            return jsonify({'success': True, 'id': expense.id})
+
+            def insert(db_session):
+                expense = Expense(category_id=category_id(db_session, category), **values)
+                db_session.add(expense)
+                db_session.flush()
+                events.publish(db_session, user_id, 'expense', expense.id, 'create', serialize_expense(expense))
+                alerts.check(db_session, user_id, alerts.month_start(expense.date), [expense.category_id])
+                return expense.id
+
+            return jsonify({'success': True, 'id': commit_insert(user_id, db_session, insert)})
 
         else:  # GET
             start_date = request.args.get('start_date')
             end_date = request.args.get('end_date')
+            limit = request.args.get('limit', type=int)
+            offset = request.args.get('offset', 0, type=int)
+            start = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+            end = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
 
             query = db_session.query(Expense).filter_by(user_id=user_id)
 
-            if start_date:
-                query = query.filter(Expense.date >= datetime.strptime(start_date, '%Y-%m-%d').date())
-            if end_date:
-                query = query.filter(Expense.date <= datetime.strptime(end_date, '%Y-%m-%d').date())
+            if start:
+                query = query.filter(Expense.date >= start)
+            if end:
+                query = query.filter(Expense.date <= end)
+
+            query = query.order_by(Expense.date.desc(), Expense.id.desc())
+
+            boundary = archive.archive_boundary(db_session, user_id)
+            if boundary and (start is None or start < boundary):
+                wanted = offset + limit if limit else None
+                hot = [serialize_expense(e) for e in query.limit(wanted)]
+                # Archived rows all sort after hot rows dated on or after the boundary
+                if not wanted or len(hot) < wanted or hot[-1]['date'] < str(boundary):
+                    # The page reaches into the archive: merge its rows in, newest first
+                    cold = (archive.serialize_archived(row) for row in archive.read_archived(
+                        db_session, user_id, start, end, newest_first=True
+                    ))
+                    hot = heapq.merge(hot, cold, key=lambda e: (e['date'], e['id']), reverse=True)
+                return jsonify(list(itertools.islice(hot, offset if limit else 0, wanted)))
+
+            if limit:
+                query = query.offset(offset).limit(limit)
+
+            return jsonify([serialize_expense(e) for e in query.all()])
+    finally:
+        db_session.close()
 
-            expenses = query.order_by(Expense.date.desc()).all()
+@app.route('/api/expenses/search')
+@login_required
+def search_expenses():
+    """Ranked full-text search over expense descriptions and recurring expense names."""
+    user_id = session['user_id']
+    query = request.args.get('q', '')
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    category = request.args.get('category')
+    limit = request.args.get('limit', search.DEFAULT_LIMIT, type=int)
+    offset = request.args.get('offset', 0, type=int)
+
+    if not search.build_match_query(query, 'description', user_id):
+        return jsonify({'success': False, 'error': 'Search query is required'}), 400
+
+    db_session = get_user_session(user_id)
+    try:
+        results, has_more = search.search_expenses(
+            db_session, user_id, query,
+            start_date=datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None,
+            end_date=datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None,
+            category=category,
+            limit=limit,
+            offset=offset
+        )
+        recurring = search.search_recurring(db_session, user_id, query, category=category) if offset == 0 else []
 
-            return jsonify([{
-                'id': e.id,
-                'date': e.date.strftime('%Y-%m-%d'),
-                'category': e.category,
-                'amount': e.amount,
-                'description': e.description
-            } for e in expenses])
+        return jsonify({
+            'query': query,
+            'results': results,
+            'recurring': recurring,
+            'has_more': has_more,
+            'offset': offset
+        })
     finally:
         db_session.close()
 
@@ -201,11 +661,12 @@ def expenses():
 @login_required
 def delete_expense(expense_id):
     user_id = session['user_id']
-    db_session = get_session()
+    db_session = get_user_session(user_id)
     try:
         expense = db_session.query(Expense).filter_by(id=expense_id, user_id=user_id).first()
         if expense:
             db_session.delete(expense)
+            events.publish(db_session, user_id, 'expense', expense_id, 'delete')
             db_session.commit()
             return jsonify({'success': True})
         return jsonify({'success': False, 'error': 'Expense not found'}), 404
@@ -217,23 +678,48 @@ def delete_expense(expense_id):
 @login_required
 def budgets():
     user_id = session['user_id']
-    db_session = get_session()
+    db_session = get_user_session(user_id)
     try:
         if request.method == 'POST':
             data = request.json
-
-            # Delete existing budgets and create new ones
-            db_session.query(Budget).filter_by(user_id=user_id).delete()
-
-            for category, limit in data.items():
-                budget = Budget(user_id=user_id, category=category, monthly_limit=float(limit))
-                db_session.add(budget)
-
+            month_start = datetime.now().date().replace(day=1)
+            current = {b.category_id: b for b in get_current_budgets(user_id, db_session)}
+            limits = {category_id(db_session, category): to_cents(float(limit)) for category, limit in data.items()}
+
+            # Only changed categories get a new version, effective from this month.
+            # A version that already started this month is amended instead.
+            for category, budget in current.items():
+                if category not in limits:
+                    if budget.effective_from >= month_start:
+                        db_session.delete(budget)
+                    else:
+                        budget.effective_to = month_start
+
+            for category, limit_cents in limits.items():
+                budget = current.get(category)
+                if budget and budget.monthly_limit_cents == limit_cents:
+                    continue
+                if budget and budget.effective_from >= month_start:
+                    budget.monthly_limit_cents = limit_cents
+                    continue
+                if budget:
+                    budget.effective_to = month_start
+                db_session.add(Budget(
+                    user_id=user_id,
+                    category_id=category,
+                    monthly_limit_cents=limit_cents,
+                    effective_from=month_start
+                ))
+
+            events.publish(db_session, user_id, 'budgets', None, 'replace', {c: float(l) for c, l in data.items()})
+            # A lower limit may already be reached this month
+            db_session.flush()
+            alerts.check(db_session, user_id, month_start)
             db_session.commit()
             return jsonify({'success': True})
 
         else:  # GET
-            budgets = db_session.query(Budget).filter_by(user_id=user_id).all()
+            budgets = get_current_budgets(user_id, db_session)
             return jsonify({b.category: b.monthly_limit for b in budgets})
     finally:
         db_session.close()
@@ -243,90 +729,60 @@ def budgets():
 def dashboard():
     """Get dashboard data with current month spending vs budget."""
     user_id = session['user_id']
-    db_session = get_session()
+    db_session = get_user_session(user_id)
     try:
-        # Get current month date range
-        now = datetime.now()
-        start_of_month = now.replace(day=1).date()
-        if now.month == 12:
-            end_of_month = now.replace(year=now.year + 1, month=1, day=1).date()
-        else:
-            end_of_month = now.replace(month=now.month + 1, day=1).date()
-
-        # Get budgets
-        budgets = db_session.query(Budget).filter_by(user_id=user_id).all()
-        budget_dict = {b.category: b.monthly_limit for b in budgets}
-
-        # Get current month expenses by category
-        expenses = db_session.query(
-            Expense.category,
-            func.sum(Expense.amount).label('total')
-        ).filter(
-            Expense.user_id == user_id,
-            Expense.date >= start_of_month,
-            Expense.date < end_of_month
-        ).group_by(Expense.category).all()
-
-        spending_dict = {e.category: float(e.total) for e in expenses}
-
-        # Combine budget and spending data
-        dashboard_data = []
-        total_budget = 0
-        total_spent = 0
-
-        for category, limit in budget_dict.items():
-            # Get prorated budget for current month
-            prorated_limit = get_prorated_budget(user_id, now.year, now.month, limit, db_session)
-
-            spent = spending_dict.get(category, 0)
-            percentage = (spent / prorated_limit * 100) if prorated_limit > 0 else 0
-
-            status = 'safe'
-            if percentage >= 100:
-                status = 'exceeded'
-            elif percentage >= 80:
-                status = 'warning'
-
-            dashboard_data.append({
-                'category': category,
-                'budget': prorated_limit,
-                'spent': spent,
-                'remaining': max(0, prorated_limit - spent),
-                'percentage': round(percentage, 1),
-                'status': status
-            })
-
-            total_budget += prorated_limit
-            total_spent += spent
+        return jsonify(get_dashboard_data(user_id, db_session))
+    finally:
+        db_session.close()
 
-        # Add categories with spending but no budget
-        for category, spent in spending_dict.items():
-            if category not in budget_dict:
-                dashboard_data.append({
-                    'category': category,
-                    'budget': 0,
-                    'spent': spent,
-                    'remaining': 0,
-                    'percentage': 0,
-                    'status': 'no_budget'
-                })
-                total_spent += spent
+@app.route('/api/alerts')
+@login_required
+def budget_alerts():
+    """This month's (or ?month=YYYY-MM's) spending against each limit, and the latest threshold alerts."""
+    user_id = session['user_id']
+    try:
+        month = datetime.strptime(request.args['month'], '%Y-%m').date() if request.args.get('month') else None
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid month, expected YYYY-MM'}), 400
+    month = month or datetime.now().date().replace(day=1)
 
+    db_session = get_read_session(user_id)
+    try:
         return jsonify({
-            'categories': dashboard_data,
-            'total_budget': total_budget,
-            'total_spent': total_spent,
-            'total_remaining': max(0, total_budget - total_spent)
+            'month': month.strftime('%Y-%m'),
+            'categories': alerts.month_status(db_session, user_id, month),
+            'alerts': alerts.recent_alerts(db_session, user_id)
         })
     finally:
         db_session.close()
 
+@app.route('/api/forecast/month-end')
+@login_required
+def month_end_forecast():
+    """Projected month-end spending per category, with percentile bands and the chance of going over budget."""
+    user_id = session['user_id']
+    try:
+        trials = int(request.args.get('trials', forecast.DEFAULT_TRIALS))
+        seed = int(request.args['seed']) if request.args.get('seed') else None
+    except ValueError:
+        return jsonify({'success': False, 'error': 'trials and seed must be integers'}), 400
+    if not 100 <= trials <= forecast.MAX_TRIALS:
+        return jsonify({'success': False, 'error': f'trials must be between 100 and {forecast.MAX_TRIALS}'}), 400
+    if seed is not None and seed < 0:
+        return jsonify({'success': False, 'error': 'seed must not be negative'}), 400
+
+    db_session = get_read_session(user_id)
+    try:
+        return jsonify(forecast.month_end(db_session, user_id, datetime.now().date(), trials, seed))
+    finally:
+        db_session.close()
+
 @app.route('/api/visualizations/monthly-trends')
 @login_required
 def monthly_trends():
     """Get monthly spending trends for the last 12 months."""
     user_id = session['user_id']
-    db_session = get_session()
+    db_session = get_read_session(user_id)
     try:
         # Get last 12 months
         end_date = datetime.now().date()
@@ -336,7 +792,7 @@ def monthly_trends():
         expenses = db_session.query(
             extract('year', Expense.date).label('year'),
             extract('month', Expense.date).label('month'),
-            func.sum(Expense.amount).label('total')
+            func.sum(Expense.amount_cents).label('total')
         ).filter(
             Expense.user_id == user_id,
             Expense.date >= start_date
@@ -348,7 +804,7 @@ def monthly_trends():
             month_str = f"{int(exp.year)}-{int(exp.month):02d}"
             monthly_data.append({
                 'month': month_str,
-                'total': float(exp.total)
+                'total': from_cents(exp.total)
             })
 
         return jsonify(monthly_data)
@@ -360,27 +816,54 @@ def monthly_trends():
 def category_breakdown():
     """Get category breakdown for specified period."""
     user_id = session['user_id']
-    db_session = get_session()
+    db_session = get_read_session(user_id)
     try:
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
 
-        query = db_session.query(
-            Expense.category,
-            func.sum(Expense.amount).label('total')
-        ).filter(Expense.user_id == user_id)
+        totals = range_totals.get_prefix_sums(db_session, user_id).totals(
+            datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None,
+            datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+        )
 
-        if start_date:
-            query = query.filter(Expense.date >= datetime.strptime(start_date, '%Y-%m-%d').date())
-        if end_date:
-            query = query.filter(Expense.date <= datetime.strptime(end_date, '%Y-%m-%d').date())
+        return jsonify([{
+            'category': category_name(db_session, category),
+            'total': from_cents(cents)
+        } for category, cents in totals.items()])
+    finally:
+        db_session.close()
 
-        expenses = query.group_by(Expense.category).all()
+@app.route('/api/visualizations/range-totals')
+@login_required
+def range_totals_report():
+    """Per-category totals for many date ranges at once (e.g. while dragging a range slider)."""
+    user_id = session['user_id']
+    labels = [r for r in request.args.get('ranges', '').split(',') if r.strip()]
+    if not labels:
+        return jsonify({'success': False, 'error': 'At least one range is required'}), 400
+    if len(labels) > range_totals.MAX_RANGES:
+        return jsonify({'success': False, 'error': f'At most {range_totals.MAX_RANGES} ranges per request'}), 400
 
-        return jsonify([{
-            'category': e.category,
-            'total': float(e.total)
-        } for e in expenses])
+    try:
+        ranges = [(label.strip(), *reports.parse_period(label)) for label in labels]
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    db_session = get_read_session(user_id)
+    try:
+        index = range_totals.get_prefix_sums(db_session, user_id)
+        results = []
+        for label, start, end in ranges:
+            last = end - timedelta(days=1)
+            totals = index.totals(start, last)
+            results.append({
+                'range': label,
+                'start_date': start.isoformat(),
+                'end_date': last.isoformat(),
+                'total': from_cents(sum(totals.values())),
+                'categories': {category_name(db_session, c): from_cents(cents) for c, cents in totals.items()}
+            })
+        return jsonify({'ranges': results})
     finally:
         db_session.close()
 
@@ -389,26 +872,26 @@ def category_breakdown():
 def budget_vs_actual():
     """Get budget vs actual spending comparison."""
     user_id = session['user_id']
-    db_session = get_session()
+    db_session = get_read_session(user_id)
     try:
         # Get current month
         now = datetime.now()
         start_of_month = now.replace(day=1).date()
 
         # Get budgets
-        budgets = db_session.query(Budget).filter_by(user_id=user_id).all()
+        budgets = get_current_budgets(user_id, db_session)
         budget_dict = {b.category: b.monthly_limit for b in budgets}
 
         # Get current month spending
         expenses = db_session.query(
-            Expense.category,
-            func.sum(Expense.amount).label('total')
+            Expense.category_id,
+            func.sum(Expense.amount_cents).label('total')
         ).filter(
             Expense.user_id == user_id,
             Expense.date >= start_of_month
-        ).group_by(Expense.category).all()
+        ).group_by(Expense.category_id).all()
 
-        spending_dict = {e.category: float(e.total) for e in expenses}
+        spending_dict = {category_name(db_session, e.category_id): from_cents(e.total) for e in expenses}
 
         # Combine data
         comparison = []
@@ -427,19 +910,25 @@ def budget_vs_actual():
 @login_required
 def savings():
     user_id = session['user_id']
-    db_session = get_session()
+    db_session = get_user_session(user_id)
     try:
         if request.method == 'POST':
             data = request.json
-            saving = Saving(
+            values = dict(
                 user_id=user_id,
                 date=datetime.strptime(data['date'], '%Y-%m-%d').date(),
                 amount=float(data['amount']),
                 description=data.get('description', '')
             )
-            db_session.add(saving)
-            db_session.commit()
-            return jsonify({'success': True, 'id': saving.id})
+
+            def insert(db_session):
+                saving = Saving(**values)
+                db_session.add(saving)
+                db_session.flush()
+                events.publish(db_session, user_id, 'saving', saving.id, 'create', serialize_saving(saving))
+                return saving.id
+
+            return jsonify({'success': True, 'id': commit_insert(user_id, db_session, insert)})
 
         else:  # GET
             start_date = request.args.get('start_date')
@@ -454,12 +943,7 @@ def savings():
 
             savings = query.order_by(Saving.date.desc()).all()
 
-            return jsonify([{
-                'id': s.id,
-                'date': s.date.strftime('%Y-%m-%d'),
-                'amount': s.amount,
-                'description': s.description
-            } for s in savings])
+            return jsonify([serialize_saving(s) for s in savings])
     finally:
         db_session.close()
 
@@ -467,11 +951,12 @@ def savings():
 @login_required
 def delete_saving(saving_id):
     user_id = session['user_id']
-    db_session = get_session()
+    db_session = get_user_session(user_id)
     try:
         saving = db_session.query(Saving).filter_by(id=saving_id, user_id=user_id).first()
         if saving:
             db_session.delete(saving)
+            events.publish(db_session, user_id, 'saving', saving_id, 'delete')
             db_session.commit()
             return jsonify({'success': True})
         return jsonify({'success': False, 'error': 'Saving not found'}), 404
@@ -482,7 +967,7 @@ def delete_saving(saving_id):
 @login_required
 def savings_goals():
     user_id = session['user_id']
-    db_session = get_session()
+    db_session = get_user_session(user_id)
     try:
         if request.method == 'POST':
             data = request.json
@@ -493,6 +978,8 @@ def savings_goals():
                 current_amount=0
             )
             db_session.add(goal)
+            db_session.flush()
+            events.publish(db_session, user_id, 'savings_goal', goal.id, 'create', serialize_goal(goal))
             db_session.commit()
             return jsonify({'success': True, 'id': goal.id})
 
@@ -505,16 +992,7 @@ def savings_goals():
                 is_archived=show_archived
             ).order_by(SavingsGoal.created_at.desc()).all()
 
-            return jsonify([{
-                'id': g.id,
-                'name': g.name,
-                'target_amount': g.target_amount,
-                'current_amount': g.current_amount,
-                'progress_percentage': round((g.current_amount / g.target_amount * 100) if g.target_amount > 0 else 0, 1),
-                'is_archived': g.is_archived,
-                'created_at': g.created_at.isoformat() if g.created_at else None,
-                'completed_at': g.completed_at.isoformat() if g.completed_at else None
-            } for g in goals])
+            return jsonify([serialize_goal(g) for g in goals])
     finally:
         db_session.close()
 
@@ -522,31 +1000,68 @@ def savings_goals():
 @login_required
 def add_to_goal(goal_id):
     user_id = session['user_id']
-    db_session = get_session()
+    db_session = get_user_session(user_id)
     try:
         data = request.json
-        goal = db_session.query(SavingsGoal).filter_by(id=goal_id, user_id=user_id).first()
+        amount_cents = to_cents(float(data['amount']))
+        now = datetime.utcnow()
 
-        if not goal:
+        # Increment in SQL rather than read-modify-write so concurrent deposits can't
+        # overwrite each other. Writing first also takes SQLite's write lock up front.
+        updated = db_session.query(SavingsGoal).filter_by(id=goal_id, user_id=user_id).update({
+            SavingsGoal.current_amount_cents: func.coalesce(SavingsGoal.current_amount_cents, 0) + amount_cents
+        }, synchronize_session=False)
+
+        if not updated:
             return jsonify({'success': False, 'error': 'Goal not found'}), 404
 
-        amount = float(data['amount'])
-        goal.current_amount += amount
+        db_session.query(SavingsGoal).filter(
+            SavingsGoal.id == goal_id,
+            SavingsGoal.completed_at.is_(None),
+            SavingsGoal.current_amount_cents >= SavingsGoal.target_amount_cents
+        ).update({SavingsGoal.completed_at: now}, synchronize_session=False)
 
-        # Check if goal is completed
-        if goal.current_amount >= goal.target_amount and not goal.completed_at:
-            goal.completed_at = datetime.utcnow()
+        db_session.add(GoalContribution(user_id=user_id, goal_id=goal_id, amount_cents=amount_cents, created_at=now))
+        goal = db_session.query(SavingsGoal).filter_by(id=goal_id).one()
 
+        events.publish(db_session, user_id, 'savings_goal', goal.id, 'update', serialize_goal(goal))
         db_session.commit()
         return jsonify({'success': True, 'new_amount': goal.current_amount})
     finally:
         db_session.close()
 
+@app.route('/api/savings-goals/<int:goal_id>/contributions')
+@login_required
+def goal_contributions(goal_id):
+    """Contribution history for a goal, with a completion date projected from the recent saving rate."""
+    user_id = session['user_id']
+    db_session = get_user_session(user_id)
+    try:
+        goal = db_session.query(SavingsGoal).filter_by(id=goal_id, user_id=user_id).first()
+        if not goal:
+            return jsonify({'success': False, 'error': 'Goal not found'}), 404
+
+        contributions = db_session.query(GoalContribution).filter_by(goal_id=goal_id).order_by(
+            GoalContribution.created_at.desc(), GoalContribution.id.desc()
+        ).all()
+
+        return jsonify({
+            'goal': serialize_goal(goal),
+            'contributions': [{
+                'id': c.id,
+                'amount': c.amount,
+                'created_at': c.created_at.isoformat()
+            } for c in contributions],
+            **project_goal_completion(goal, contributions)
+        })
+    finally:
+        db_session.close()
+
 @app.route('/api/savings-goals/<int:goal_id>/archive', methods=['POST'])
 @login_required
 def archive_goal(goal_id):
     user_id = session['user_id']
-    db_session = get_session()
+    db_session = get_user_session(user_id)
     try:
         goal = db_session.query(SavingsGoal).filter_by(id=goal_id, user_id=user_id).first()
 
@@ -557,6 +1072,7 @@ def archive_goal(goal_id):
         if not goal.completed_at:
             goal.completed_at = datetime.utcnow()
 
+        events.publish(db_session, user_id, 'savings_goal', goal.id, 'update', serialize_goal(goal))
         db_session.commit()
         return jsonify({'success': True})
     finally:
@@ -566,11 +1082,12 @@ def archive_goal(goal_id):
 @login_required
 def delete_goal(goal_id):
     user_id = session['user_id']
-    db_session = get_session()
+    db_session = get_user_session(user_id)
     try:
         goal = db_session.query(SavingsGoal).filter_by(id=goal_id, user_id=user_id).first()
         if goal:
             db_session.delete(goal)
+            events.publish(db_session, user_id, 'savings_goal', goal_id, 'delete')
             db_session.commit()
             return jsonify({'success': True})
         return jsonify({'success': False, 'error': 'Goal not found'}), 404
@@ -582,7 +1099,7 @@ def delete_goal(goal_id):
 def tracking_start_date():
     """Get or set the tracking start date."""
     user_id = session['user_id']
-    db_session = get_session()
+    db_session = get_user_session(user_id)
     try:
         if request.method == 'POST':
             data = request.json
@@ -614,6 +1131,10 @@ def tracking_start_date():
                 )
                 db_session.add(setting)
 
+            events.publish(db_session, user_id, 'settings', None, 'update', {'tracking_start_date': start_date})
+            # The month tracking starts in gets a prorated, smaller limit
+            db_session.flush()
+            alerts.check(db_session, user_id, alerts.month_start(datetime.strptime(start_date, '%Y-%m-%d').date()))
             db_session.commit()
             return jsonify({'success': True, 'start_date': start_date})
 
@@ -635,14 +1156,14 @@ def tracking_start_date():
 def recurring_expenses():
     """Get or create recurring expenses."""
     user_id = session['user_id']
-    db_session = get_session()
+    db_session = get_user_session(user_id)
     try:
         if request.method == 'POST':
             data = request.json
             recurring = RecurringExpense(
                 user_id=user_id,
                 name=data['name'],
-                category=data['category'],
+                category_id=category_id(db_session, data['category']),
                 amount=float(data['amount']),
                 frequency=data['frequency'],
                 start_date=datetime.strptime(data['start_date'], '%Y-%m-%d').date(),
@@ -651,6 +1172,8 @@ def recurring_expenses():
                 day_of_week=data.get('day_of_week')
             )
             db_session.add(recurring)
+            db_session.flush()
+            events.publish(db_session, user_id, 'recurring_expense', recurring.id, 'create', serialize_recurring(recurring))
             db_session.commit()
             return jsonify({'success': True, 'id': recurring.id})
 
@@ -660,18 +1183,7 @@ def recurring_expenses():
                 is_active=True
             ).order_by(RecurringExpense.created_at.desc()).all()
 
-            return jsonify([{
-                'id': r.id,
-                'name': r.name,
-                'category': r.category,
-                'amount': r.amount,
-                'frequency': r.frequency,
-                'start_date': r.start_date.strftime('%Y-%m-%d'),
-                'end_date': r.end_date.strftime('%Y-%m-%d') if r.end_date else None,
-                'day_of_month': r.day_of_month,
-                'day_of_week': r.day_of_week,
-                'last_generated': r.last_generated.strftime('%Y-%m-%d') if r.last_generated else None
-            } for r in recurring])
+            return jsonify([serialize_recurring(r) for r in recurring])
     finally:
         db_session.close()
 
@@ -680,7 +1192,7 @@ def recurring_expenses():
 def delete_recurring_expense(recurring_id):
     """Delete (deactivate) a recurring expense."""
     user_id = session['user_id']
-    db_session = get_session()
+    db_session = get_user_session(user_id)
     try:
         recurring = db_session.query(RecurringExpense).filter_by(
             id=recurring_id,
@@ -689,6 +1201,7 @@ def delete_recurring_expense(recurring_id):
 
         if recurring:
             recurring.is_active = False
+            events.publish(db_session, user_id, 'recurring_expense', recurring_id, 'delete')
             db_session.commit()
             return jsonify({'success': True})
         return jsonify({'success': False, 'error': 'Recurring expense not found'}), 404
@@ -700,10 +1213,11 @@ def delete_recurring_expense(recurring_id):
 def generate_recurring_expenses():
     """Generate expenses from recurring templates for today."""
     user_id = session['user_id']
-    db_session = get_session()
+    db_session = get_user_session(user_id)
     try:
         today = datetime.now().date()
         generated_count = 0
+        generated_categories = set()
 
         # Get all active recurring expenses
         recurring_list = db_session.query(RecurringExpense).filter_by(
@@ -712,48 +1226,33 @@ def generate_recurring_expenses():
         ).all()
 
         for recurring in recurring_list:
-            # Skip if not started yet
-            if today < recurring.start_date:
-                continue
-
-            # Skip if ended
-            if recurring.end_date and today > recurring.end_date:
-                continue
-
             # Skip if already generated today
             if recurring.last_generated == today:
                 continue
 
-            should_generate = False
-
-            # Check if we should generate based on frequency
-            if recurring.frequency == 'daily':
-                should_generate = True
-            elif recurring.frequency == 'weekly':
-                if recurring.day_of_week == today.weekday():
-                    should_generate = True
-            elif recurring.frequency == 'monthly':
-                if recurring.day_of_month == today.day:
-                    should_generate = True
-            elif recurring.frequency == 'yearly':
-                if recurring.start_date.month == today.month and recurring.start_date.day == today.day:
-                    should_generate = True
-
-            if should_generate:
+            # Check if it falls due today, within its start and end dates
+            if forecast.recurs_on(recurring, today):
                 # Create the expense
                 expense = Expense(
                     user_id=user_id,
                     date=today,
-                    category=recurring.category,
-                    amount=recurring.amount,
-                    description=f"{recurring.name} (recurring)"
+                    category_id=recurring.category_id,
+                    amount_cents=recurring.amount_cents,
+                    description=f"{recurring.name}{forecast.RECURRING_SUFFIX}"
                 )
                 db_session.add(expense)
 
                 # Update last generated
                 recurring.last_generated = today
                 generated_count += 1
+                generated_categories.add(recurring.category_id)
+
+                db_session.flush()
+                events.publish(db_session, user_id, 'expense', expense.id, 'create', serialize_expense(expense))
+                events.publish(db_session, user_id, 'recurring_expense', recurring.id, 'update', serialize_recurring(recurring))
 
+        if generated_categories:
+            alerts.check(db_session, user_id, alerts.month_start(today), list(generated_categories))
         db_session.commit()
         return jsonify({'success': True, 'generated': generated_count})
     finally:
@@ -764,7 +1263,7 @@ def generate_recurring_expenses():
 def monthly_report(year_month):
     """Get detailed monthly report for a specific month (format: YYYY-MM)."""
     user_id = session['user_id']
-    db_session = get_session()
+    db_session = get_read_session(user_id)
     try:
         # Parse year and month
         year, month = map(int, year_month.split('-'))
@@ -774,33 +1273,45 @@ def monthly_report(year_month):
         else:
             end_date = datetime(year, month + 1, 1).date()
 
-        # Get budgets
-        budgets = db_session.query(Budget).filter_by(user_id=user_id).all()
-        budget_dict = {b.category: b.monthly_limit for b in budgets}
+        # Get the budgets that were in effect that month
+        budget_dict = get_budget_limits_by_month(user_id, [start_date], db_session)[start_date]
 
         # Get expenses for the month
         expenses = db_session.query(
-            Expense.category,
-            func.sum(Expense.amount).label('total'),
+            Expense.category_id,
+            func.sum(Expense.amount_cents).label('total'),
             func.count(Expense.id).label('count')
         ).filter(
             Expense.user_id == user_id,
             Expense.date >= start_date,
             Expense.date < end_date
-        ).group_by(Expense.category).all()
-
-        spending_dict = {e.category: {'total': float(e.total), 'count': e.count} for e in expenses}
+        ).group_by(Expense.category_id).all()
+
+        totals = {e.category_id: [e.total, e.count] for e in expenses}
+        boundary = archive.archive_boundary(db_session, user_id)
+        if boundary and start_date < boundary:
+            for category, (cents, count) in archive.archived_totals(
+                db_session, user_id, start_date, end_date - timedelta(days=1)
+            ).items():
+                totals.setdefault(category, [0, 0])
+                totals[category][0] += cents
+                totals[category][1] += count
+
+        spending_dict = {
+            category_name(db_session, category): {'total': from_cents(cents), 'count': count}
+            for category, (cents, count) in totals.items()
+        }
 
         # Get savings for the month
         savings = db_session.query(
-            func.sum(Saving.amount).label('total')
+            func.sum(Saving.amount_cents).label('total')
         ).filter(
             Saving.user_id == user_id,
             Saving.date >= start_date,
             Saving.date < end_date
         ).first()
 
-        total_saved = float(savings.total) if savings.total else 0
+        total_saved = from_cents(savings.total) if savings.total else 0
 
         # Build category details
         categories = []
@@ -818,14 +1329,7 @@ def monthly_report(year_month):
 
             difference = prorated_budget - spent
             percentage = (spent / prorated_budget * 100) if prorated_budget > 0 else 0
-
-            status = 'under'
-            if prorated_budget == 0:
-                status = 'no_budget'
-            elif spent > prorated_budget:
-                status = 'over'
-            elif percentage >= 80:
-                status = 'warning'
+            status = alerts.REPORT_STATUSES[alerts.status_for(to_cents(spent), to_cents(prorated_budget))]
 
             categories.append({
                 'category': category,
@@ -842,21 +1346,90 @@ def monthly_report(year_month):
 
         return jsonify({
             'month': year_month,
-            'total_budget': total_budget,
-            'total_spent': total_spent,
+            'total_budget': round(total_budget, 2),
+            'total_spent': round(total_spent, 2),
             'total_saved': total_saved,
-            'total_difference': total_budget - total_spent,
+            'total_difference': round(total_budget - total_spent, 2),
             'categories': sorted(categories, key=lambda x: x['spent'], reverse=True)
         })
     finally:
         db_session.close()
 
+@app.route('/api/household')
+@login_required
+def household():
+    """The household the user is linked into and its members."""
+    found = households.household_of(session['user_id'])
+    if found is None:
+        return jsonify({'success': False, 'error': 'You are not in a household'}), 404
+    return jsonify(households.serialize_household(*found))
+
+@app.route('/api/household/dashboard')
+@login_required
+def household_dashboard():
+    """This month's spending of all household members against their combined budgets."""
+    found = households.household_of(session['user_id'])
+    if found is None:
+        return jsonify({'success': False, 'error': 'You are not in a household'}), 404
+    return jsonify(households.dashboard(found[1], datetime.now().date()))
+
+@app.route('/api/household/category-breakdown')
+@login_required
+def household_category_breakdown():
+    """Household spending per category for ?start_month=YYYY-MM through ?end_month=YYYY-MM (default: all)."""
+    try:
+        start = datetime.strptime(request.args['start_month'], '%Y-%m').date() if request.args.get('start_month') else None
+        end = datetime.strptime(request.args['end_month'], '%Y-%m').date() if request.args.get('end_month') else None
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid month, expected YYYY-MM'}), 400
+
+    found = households.household_of(session['user_id'])
+    if found is None:
+        return jsonify({'success': False, 'error': 'You are not in a household'}), 404
+    return jsonify(households.category_breakdown(found[1], start, households.next_month(end) if end else None))
+
+@app.route('/api/household/reports/monthly/<year_month>')
+@login_required
+def household_monthly_report(year_month):
+    """The monthly report (format: YYYY-MM) of the whole household, with each member's part."""
+    try:
+        month = datetime.strptime(year_month, '%Y-%m').date()
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid month, expected YYYY-MM'}), 400
+
+    found = households.household_of(session['user_id'])
+    if found is None:
+        return jsonify({'success': False, 'error': 'You are not in a household'}), 404
+    return jsonify(households.monthly_report(found[1], month))
+
+@app.route('/api/reports/compare')
+@login_required
+def compare_report():
+    """Compare spending across periods (e.g. ?periods=2026-10,2026-09,2025-10)."""
+    user_id = session['user_id']
+    labels = [p for p in request.args.get('periods', '').split(',') if p.strip()]
+    if not labels:
+        return jsonify({'success': False, 'error': 'At least one period is required'}), 400
+    if len(labels) > reports.MAX_PERIODS:
+        return jsonify({'success': False, 'error': f'At most {reports.MAX_PERIODS} periods can be compared'}), 400
+
+    try:
+        periods = [(label.strip(), *reports.parse_period(label)) for label in labels]
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    db_session = get_read_session(user_id)
+    try:
+        return jsonify({'periods': reports.compare_periods(db_session, user_id, periods)})
+    finally:
+        db_session.close()
+
 @app.route('/api/reports/available-months')
 @login_required
 def available_months():
     """Get list of months that have expense data."""
     user_id = session['user_id']
-    db_session = get_session()
+    db_session = get_read_session(user_id)
     try:
         months = db_session.query(
             extract('year', Expense.date).label('year'),
@@ -865,18 +1438,17 @@ def available_months():
             Expense.user_id == user_id
         ).distinct().order_by('year', 'month').all()
 
-        return jsonify([
-            f"{int(m.year)}-{int(m.month):02d}"
-            for m in months
-        ])
+        labels = {f"{int(m.year)}-{int(m.month):02d}" for m in months}
+        labels.update(m.strftime('%Y-%m') for m in archive.archived_months(db_session, user_id))
+        return jsonify(sorted(labels))
     finally:
         db_session.close()
 
 if __name__ == '__main__':
     import os
-    # Ensure required accounts exist on startup
-    from init_accounts import ensure_accounts_exist
-    ensure_accounts_exist()
+    # Create tables and ensure required accounts exist on startup
+    from init_db import setup_database
+    setup_database()
 
     port = int(os.environ.get('PORT', 5000))
     app.run(debug=False, host='0.0.0.0', port=port)
@@ -0,0 +1,229 @@
+"""
+Cold storage for old expenses.
+
+archive_expenses.py moves expenses dated before the hot window (the last
+ARCHIVE_AFTER_MONTHS months) out of the expenses table into one partition per
+user and year, and leaves monthly per-category rollups behind. A partition
+stores each column as its own zlib-compressed blob, rows in date order, so a
+reader fetches only the partitions a date range reaches into, decodes only the
+columns it asks for and binary-searches the dates. Categories are stored by
+name so partitions stay valid when a user moves to another shard.
+"""
+
+import bisect
+import itertools
+import json
+import os
+import sys
+import zlib
+from array import array
+from collections import defaultdict
+from datetime import date, timedelta
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import func
+
+from database import Expense, ExpenseArchive, ExpenseArchiveColumn, ExpenseRollup, category_id, category_name, from_cents
+
+ARCHIVE_AFTER_MONTHS = int(os.environ.get('ARCHIVE_AFTER_MONTHS', 24))
+# The dashboard, trends and budget views look back at most 12 months; keep those hot
+MIN_ARCHIVE_AFTER_MONTHS = 13
+
+COLUMNS = ['id', 'date', 'category', 'amount_cents', 'description', 'created_at']
+# Stored as delta-encoded int64s; the rest are JSON lists
+NUMERIC_COLUMNS = {'id', 'date', 'amount_cents'}
+DELTA_COLUMNS = {'id', 'date'}
+
+
+def encode_column(name, values):
+    if name in NUMERIC_COLUMNS:
+        if name in DELTA_COLUMNS:
+            values = [b - a for a, b in zip([0] + values, values)]
+        packed = array('q', values)
+        if sys.byteorder == 'big':
+            packed.byteswap()
+        raw = packed.tobytes()
+    else:
+        raw = json.dumps(values, separators=(',', ':')).encode()
+    return zlib.compress(raw, 9)
+
+
+def decode_column(name, data):
+    raw = zlib.decompress(data)
+    if name not in NUMERIC_COLUMNS:
+        return json.loads(raw)
+    packed = array('q')
+    packed.frombytes(raw)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return list(itertools.accumulate(packed)) if name in DELTA_COLUMNS else packed.tolist()
+
+
+def archive_cutoff(today=None, months=ARCHIVE_AFTER_MONTHS):
+    """First day of the oldest hot month; expenses dated before it get archived."""
+    today = today or date.today()
+    return today.replace(day=1) - relativedelta(months=max(months, MIN_ARCHIVE_AFTER_MONTHS) - 1)
+
+
+def archive_boundary(db_session, user_id):
+    """Day after the user's last archived expense, or None if nothing is archived."""
+    last = db_session.query(func.max(ExpenseArchive.last_date)).filter(ExpenseArchive.user_id == user_id).scalar()
+    return last + timedelta(days=1) if last else None
+
+
+def _load(db_session, archive, names):
+    blobs = dict(db_session.query(ExpenseArchiveColumn.name, ExpenseArchiveColumn.data).filter(
+        ExpenseArchiveColumn.archive_id == archive.id,
+        ExpenseArchiveColumn.name.in_(names)
+    ))
+    return {name: decode_column(name, blobs[name]) for name in names}
+
+
+def read_archived(db_session, user_id, start=None, end=None, columns=COLUMNS, newest_first=False):
+    """Archived expenses dated start through end (inclusive; None is open), by date and id.
+
+    Yields dicts holding just the requested columns, with 'date' as a date.
+    Partitions are decoded as the generator reaches them, so a caller that
+    stops early (e.g. after one page, newest first) skips the older ones.
+    """
+    query = db_session.query(ExpenseArchive).filter(ExpenseArchive.user_id == user_id)
+    if start:
+        query = query.filter(ExpenseArchive.last_date >= start)
+    if end:
+        query = query.filter(ExpenseArchive.first_date <= end)
+
+    order = ExpenseArchive.year.desc() if newest_first else ExpenseArchive.year
+    for archive in query.order_by(order).all():
+        data = _load(db_session, archive, set(columns) | {'date'})
+        dates = data['date']
+        lo = bisect.bisect_left(dates, start.toordinal()) if start else 0
+        hi = bisect.bisect_right(dates, end.toordinal()) if end else len(dates)
+        for i in (range(hi - 1, lo - 1, -1) if newest_first else range(lo, hi)):
+            row = {name: data[name][i] for name in columns}
+            if 'date' in row:
+                row['date'] = date.fromordinal(row['date'])
+            yield row
+
+
+def archived_totals(db_session, user_id, start=None, end=None):
+    """{category_id: [cents, count]} of archived expenses dated start through end.
+
+    Whole months come from the rollups; only a partially covered month at
+    either end of the range decodes partition columns.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    boundary = archive_boundary(db_session, user_id)
+    if boundary is None or (start and start >= boundary):
+        return totals
+
+    # [full_from, full_to) is the run of whole months inside the range
+    full_from = start if start is None or start.day == 1 else start.replace(day=1) + relativedelta(months=1)
+    after_end = end + timedelta(days=1) if end else None
+    full_to = after_end if after_end is None or after_end.day == 1 else after_end.replace(day=1)
+
+    edges = []
+    if full_from is not None and full_to is not None and full_from >= full_to:
+        edges.append((start, end))  # the range sits inside a single month
+    else:
+        query = db_session.query(ExpenseRollup).filter(ExpenseRollup.user_id == user_id)
+        if full_from:
+            query = query.filter(ExpenseRollup.month >= full_from)
+        if full_to:
+            query = query.filter(ExpenseRollup.month < full_to)
+        for rollup in query:
+            totals[rollup.category_id][0] += rollup.total_cents
+            totals[rollup.category_id][1] += rollup.count
+        if start and start < full_from:
+            edges.append((start, full_from - timedelta(days=1)))
+        if end and full_to <= end:
+            edges.append((full_to, end))
+
+    for edge_start, edge_end in edges:
+        for row in read_archived(db_session, user_id, edge_start, edge_end, columns=['category', 'amount_cents']):
+            category = category_id(db_session, row['category'])
+            totals[category][0] += row['amount_cents']
+            totals[category][1] += 1
+    return totals
+
+
+def archived_months(db_session, user_id):
+    """Month starts that have archived expenses."""
+    return [m for (m,) in db_session.query(ExpenseRollup.month).filter(
+        ExpenseRollup.user_id == user_id
+    ).distinct()]
+
+
+def archive_user(db_session, user_id, before):
+    """Move the user's expenses dated before `before` into the archive; returns how many moved.
+
+    The caller commits. Everything happens in its transaction, so a failure
+    leaves the expenses where they were.
+    """
+    expenses = db_session.query(
+        Expense.id, Expense.date, Expense.category_id, Expense.amount_cents, Expense.description, Expense.created_at
+    ).filter(Expense.user_id == user_id, Expense.date < before).all()
+    if not expenses:
+        return 0
+
+    by_year = defaultdict(list)
+    rollups = defaultdict(lambda: [0, 0])
+    for e in expenses:
+        by_year[e.date.year].append({
+            'id': e.id,
+            'date': e.date.toordinal(),
+            'category': category_name(db_session, e.category_id),
+            'amount_cents': e.amount_cents,
+            'description': e.description,
+            'created_at': e.created_at.isoformat() if e.created_at else None
+        })
+        totals = rollups[(e.date.replace(day=1), e.category_id)]
+        totals[0] += e.amount_cents
+        totals[1] += 1
+
+    for year, rows in by_year.items():
+        archive = db_session.query(ExpenseArchive).filter_by(user_id=user_id, year=year).first()
+        if archive is None:
+            archive = ExpenseArchive(user_id=user_id, year=year)
+            db_session.add(archive)
+        else:
+            # Backdated expenses added since the last run join the existing partition
+            old = _load(db_session, archive, COLUMNS)
+            rows += [{name: old[name][i] for name in COLUMNS} for i in range(archive.row_count)]
+        rows.sort(key=lambda row: (row['date'], row['id']))
+
+        archive.first_date = date.fromordinal(rows[0]['date'])
+        archive.last_date = date.fromordinal(rows[-1]['date'])
+        archive.row_count = len(rows)
+        encoded = {name: encode_column(name, [row[name] for row in rows]) for name in COLUMNS}
+        existing = {column.name: column for column in archive.columns}
+        for name, data in encoded.items():
+            if name in existing:
+                existing[name].data = data
+            else:
+                archive.columns.append(ExpenseArchiveColumn(user_id=user_id, name=name, data=data))
+
+    for (month, category), (cents, count) in rollups.items():
+        rollup = db_session.query(ExpenseRollup).filter_by(user_id=user_id, month=month, category_id=category).first()
+        if rollup is None:
+            db_session.add(ExpenseRollup(user_id=user_id, month=month, category_id=category, total_cents=cents, count=count))
+        else:
+            rollup.total_cents += cents
+            rollup.count += count
+
+    # Delete exactly what was read; expenses backdated meanwhile wait for the next run
+    ids = [e.id for e in expenses]
+    for i in range(0, len(ids), 500):
+        db_session.query(Expense).filter(Expense.id.in_(ids[i:i + 500])).delete(synchronize_session=False)
+    return len(ids)
+
+
+def serialize_archived(row):
+    """An archived row in the shape of app.serialize_expense(), flagged read-only."""
+    return {
+        'id': row['id'],
+        'date': row['date'].strftime('%Y-%m-%d'),
+        'category': row['category'],
+        'amount': from_cents(row['amount_cents']),
+        'description': row['description'],
+        'archived': True
+    }
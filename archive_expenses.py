@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Month-close archival: move expenses older than the hot window into cold storage.
+
+Expenses dated before the last ARCHIVE_AFTER_MONTHS months (default 24, never
+fewer than 13) are packed into per-user, per-year compressed partitions with
+monthly rollups left behind (see archive.py). Reports, the expense list and
+backups keep seeing them. Each user is archived in one transaction, so the
+job can be stopped and rerun at any time. Run it after each month closes,
+e.g. from a cron job on the 1st.
+
+Usage:
+    python archive_expenses.py                # archive with ARCHIVE_AFTER_MONTHS
+    python archive_expenses.py --months 36    # keep 36 months hot instead
+    python archive_expenses.py --dry-run      # only report what would move
+"""
+
+import sys
+import time
+
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+
+from archive import ARCHIVE_AFTER_MONTHS, archive_cutoff, archive_user
+from database import get_session, get_user_session, User, Expense
+
+RETRIES = 3  # a busy shard (e.g. locked by a long write) gets a few more tries
+
+def archive_one(user, before, dry_run=False):
+    for attempt in range(RETRIES):
+        db_session = get_user_session(user.id)
+        try:
+            if dry_run:
+                return db_session.query(func.count(Expense.id)).filter(
+                    Expense.user_id == user.id, Expense.date < before
+                ).scalar()
+            moved = archive_user(db_session, user.id, before)
+            db_session.commit()
+            return moved
+        except OperationalError:
+            db_session.rollback()
+            if attempt == RETRIES - 1:
+                raise
+            time.sleep(2 ** attempt)
+        finally:
+            db_session.close()
+
+def main(argv):
+    months = ARCHIVE_AFTER_MONTHS
+    dry_run = '--dry-run' in argv
+    if '--months' in argv:
+        months = int(argv[argv.index('--months') + 1])
+    before = archive_cutoff(months=months)
+
+    db_session = get_session()
+    try:
+        users = db_session.query(User.id, User.username, User.is_moving).all()
+    finally:
+        db_session.close()
+
+    print(f"Archiving expenses dated before {before}{' (dry run)' if dry_run else ''}")
+    total = 0
+    for user in users:
+        if user.is_moving:
+            print(f"  - {user.username}: being moved between shards, skipped")
+            continue
+        moved = archive_one(user, before, dry_run)
+        if moved:
+            print(f"  ✓ {user.username}: {moved} expense(s){' would be' if dry_run else ''} archived")
+        total += moved
+    print(f"Done: {total} expense(s){' would be' if dry_run else ''} archived for {len(users)} user(s)")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,73 @@
+"""
+Manifest-aware static asset URLs and long-lived caching for built assets.
+Run `python build_assets.py` to produce static/dist/; without a manifest the
+templates fall back to the plain files in static/.
+"""
+
+import json
+import mimetypes
+import os
+
+from flask import request, send_from_directory, url_for as flask_url_for
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+# Hashed filenames never change content, so browsers may cache them forever
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+_manifest = None
+
+
+def get_manifest():
+    """Load the asset manifest once per process (empty if assets aren't built)."""
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(MANIFEST_PATH, 'r') as f:
+                _manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            _manifest = {}
+    return _manifest
+
+
+def has_asset(filename):
+    """Check whether a built variant (e.g. 'logo.webp') exists in the manifest."""
+    return filename in get_manifest()
+
+
+def manifest_url_for(endpoint, **values):
+    """Drop-in url_for that rewrites static files to their hashed dist copies."""
+    if endpoint == 'static':
+        hashed = get_manifest().get(values.get('filename'))
+        if hashed:
+            values['filename'] = hashed
+            return flask_url_for('dist_asset', **values)
+    return flask_url_for(endpoint, **values)
+
+
+def serve_dist_asset(filename):
+    """Serve a hashed asset, preferring a precompressed sibling the client accepts."""
+    mimetype = mimetypes.guess_type(filename)[0]
+    response = None
+
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[encoding] and os.path.isfile(os.path.join(DIST_DIR, filename + suffix)):
+            response = send_from_directory(DIST_DIR, filename + suffix, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            break
+
+    if response is None:
+        response = send_from_directory(DIST_DIR, filename, mimetype=mimetype)
+
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_app(app):
+    """Register the dist route and template helpers on the Flask app."""
+    app.add_url_rule('/assets/<path:filename>', 'dist_asset', serve_dist_asset)
+    app.jinja_env.globals['url_for'] = manifest_url_for
+    app.jinja_env.globals['has_asset'] = has_asset
@@ -0,0 +1,143 @@
+"""
+Login admission control: password hashes are verified in a small process pool
+instead of on the request thread, with a hard limit on queued verifications
+and throttling with exponential backoff: by IP, by username from that IP, and
+by username alone. The last catches guessing spread over many addresses, but
+with more free attempts and a short cap on the delay, so failing on purpose
+can slow an account's owner down, never lock them out.
+
+Throttle state lives in each worker process, so with several gunicorn workers
+an attacker gets at most one allowance per worker.
+"""
+
+import math
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash
+
+# 0 disables the pool and verifies inline (handy for local development)
+HASH_WORKERS = int(os.environ.get('LOGIN_HASH_WORKERS', 2))
+MAX_PENDING = int(os.environ.get('LOGIN_MAX_PENDING', max(1, HASH_WORKERS) * 4))
+VERIFY_TIMEOUT = 10  # seconds
+BUSY_RETRY_AFTER = 2  # seconds suggested to clients when the queue is full
+
+FREE_ATTEMPTS = 5  # failures allowed before backoff starts
+BASE_DELAY = 1  # seconds, doubled for every further failure
+MAX_DELAY = 15 * 60
+ATTEMPT_TTL = 60 * 60  # forget keys idle for this long
+# For ('account', username), counted from every client
+ACCOUNT_FREE_ATTEMPTS = 20
+ACCOUNT_MAX_DELAY = 60
+
+
+class LoginBusy(Exception):
+    """Raised when the verification queue is full."""
+
+    def __init__(self, retry_after=BUSY_RETRY_AFTER):
+        super().__init__('Login service busy')
+        self.retry_after = retry_after
+
+
+class AttemptThrottle:
+    """Exponential backoff on repeated login failures, per key (e.g. IP, or username and IP)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> [failures, blocked_until, last_seen]
+        self._last_prune = time.monotonic()
+
+    def retry_after(self, *keys):
+        """Seconds until any of the keys may try again (0 if allowed now)."""
+        now = time.monotonic()
+        with self._lock:
+            wait = 0
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry:
+                    wait = max(wait, entry[1] - now)
+            return math.ceil(wait) if wait > 0 else 0
+
+    def record_failure(self, *keys):
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = self._entries.setdefault(key, [0, 0, now])
+                entry[0] += 1
+                entry[2] = now
+                free_attempts, max_delay = _limits(key)
+                if entry[0] >= free_attempts:
+                    delay = min(max_delay, BASE_DELAY * 2 ** (entry[0] - free_attempts))
+                    entry[1] = now + delay
+            self._prune(now)
+
+    def reset(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def _prune(self, now):
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        stale = [k for k, e in self._entries.items() if now - e[2] > ATTEMPT_TTL and e[1] < now]
+        for key in stale:
+            del self._entries[key]
+
+
+def _limits(key):
+    """(free attempts, longest delay) for a throttle key."""
+    if key[0] == 'account':
+        return ACCOUNT_FREE_ATTEMPTS, ACCOUNT_MAX_DELAY
+    return FREE_ATTEMPTS, MAX_DELAY
+
+
+login_throttle = AttemptThrottle()
+
+_slots = threading.BoundedSemaphore(MAX_PENDING)
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Create the pool lazily in the current process (never inherit one across fork)."""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _discard_executor(executor):
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+
+
+def verify_password(password_hash, password):
+    """Check a password hash off the request thread, or raise LoginBusy."""
+    if HASH_WORKERS <= 0:
+        return check_password_hash(password_hash, password)
+
+    # Reject immediately instead of letting a flood queue up behind the pool
+    if not _slots.acquire(blocking=False):
+        raise LoginBusy()
+    executor = None
+    try:
+        executor = _get_executor()
+        future = executor.submit(check_password_hash, password_hash, password)
+        return future.result(timeout=VERIFY_TIMEOUT)
+    except FutureTimeoutError:
+        raise LoginBusy()
+    except BrokenProcessPool:
+        # A hash process died; start a fresh pool on the next attempt
+        _discard_executor(executor)
+        raise LoginBusy()
+    finally:
+        _slots.release()
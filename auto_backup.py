@@ -2,14 +2,19 @@
 """
 Automatic backup script that creates a backup before any deployment.
 Run this manually or integrate it into your deployment process.
+
+Usage:
+    python auto_backup.py           # back up now
+    python auto_backup.py --queue   # run it as a background job (see job_worker.py)
 """
 
 import os
+import sys
 from datetime import datetime
 from backup import export_backup
 
-def create_auto_backup():
-    """Create an automatic backup with timestamp."""
+def create_auto_backup(progress=None):
+    """Create an automatic backup with timestamp; returns its filename, or None if it failed."""
     try:
         # Create backups directory if it doesn't exist
         backup_dir = 'backups'
@@ -20,11 +25,12 @@ def create_auto_backup():
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = os.path.join(backup_dir, f'auto_backup_{timestamp}.json')
 
-        export_backup(filename)
+        export_backup(filename, progress=progress)
         print(f"\n✓ Automatic backup created: {filename}")
 
         # Keep only last 10 backups
         cleanup_old_backups(backup_dir)
+        return filename
 
     except Exception as e:
         print(f"✗ Backup failed: {e}")
@@ -43,4 +49,9 @@ def cleanup_old_backups(backup_dir, keep_count=10):
         print(f"Warning: Could not cleanup old backups: {e}")
 
 if __name__ == '__main__':
-    create_auto_backup()
+    if '--queue' in sys.argv:
+        from jobs import enqueue
+        job_id = enqueue('auto_backup')
+        print(f"✓ Queued backup as job {job_id}; check it with: python job_worker.py --status {job_id}")
+    else:
+        create_auto_backup()
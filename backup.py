@@ -4,18 +4,30 @@ Database backup and restore script for Budget Tracker
 Usage:
     python backup.py export          # Create backup
     python backup.py import <file>   # Restore from backup
+
+Add --queue to either to run it as a background job (see job_worker.py).
 """
 
+import os
 import sys
 import json
 from datetime import datetime
-from database import get_session, User, Expense, Budget, Settings, Saving, SavingsGoal
+from archive import read_archived
+from database import (
+    BUDGET_EPOCH, get_session, get_user_session, shard_for, fan_out, category_id, from_cents,
+    User, Expense, ExpenseArchive, Budget, Settings, Saving, SavingsGoal, GoalContribution
+)
+
+def export_backup(filename=None, user_id=None, progress=None):
+    """Export all data (or one user's) to JSON file.
 
-def export_backup(filename=None):
-    """Export all data to JSON file."""
+    progress, if given, is called as progress(fraction, message) along the way
+    (jobs.py passes one to report on background exports).
+    """
     if not filename:
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f'backup_{timestamp}.json'
+    progress = progress or (lambda fraction, message=None: None)
 
     db_session = get_session()
     try:
@@ -26,11 +38,15 @@ def export_backup(filename=None):
             'budgets': [],
             'settings': [],
             'savings': [],
-            'savings_goals': []
+            'savings_goals': [],
+            'goal_contributions': []
         }
 
         # Export users (without password hashes for security)
-        users = db_session.query(User).all()
+        progress(0.05, 'Exporting users')
+        users = db_session.query(User)
+        if user_id is not None:
+            users = users.filter_by(id=user_id)
         for user in users:
             data['users'].append({
                 'id': user.id,
@@ -38,64 +54,78 @@ def export_backup(filename=None):
                 'created_at': user.created_at.isoformat() if user.created_at else None
             })
 
-        # Export expenses
-        expenses = db_session.query(Expense).all()
-        for expense in expenses:
-            data['expenses'].append({
-                'id': expense.id,
-                'user_id': expense.user_id,
-                'date': expense.date.isoformat(),
-                'category': expense.category,
-                'amount': expense.amount,
-                'description': expense.description
-            })
+        # Export the per-user tables from every shard
+        def export_shard(shard_session):
+            def rows(model):
+                query = shard_session.query(model)
+                return query.filter_by(user_id=user_id) if user_id is not None else query
 
-        # Export budgets
-        budgets = db_session.query(Budget).all()
-        for budget in budgets:
-            data['budgets'].append({
-                'id': budget.id,
-                'user_id': budget.user_id,
-                'category': budget.category,
-                'monthly_limit': budget.monthly_limit
-            })
+            return {
+                'expenses': [{
+                    'id': expense.id,
+                    'user_id': expense.user_id,
+                    'date': expense.date.isoformat(),
+                    'category': expense.category,
+                    'amount': expense.amount,
+                    'description': expense.description
+                } for expense in rows(Expense)] + [{
+                    # Archived expenses are restored as ordinary ones; the next archive run moves them back
+                    'id': row['id'],
+                    'user_id': archived_user_id,
+                    'date': row['date'].isoformat(),
+                    'category': row['category'],
+                    'amount': from_cents(row['amount_cents']),
+                    'description': row['description']
+                } for (archived_user_id,) in rows(ExpenseArchive).with_entities(ExpenseArchive.user_id).distinct()
+                  for row in read_archived(shard_session, archived_user_id)],
+                'budgets': [{
+                    'id': budget.id,
+                    'user_id': budget.user_id,
+                    'category': budget.category,
+                    'monthly_limit': budget.monthly_limit,
+                    'effective_from': budget.effective_from.isoformat(),
+                    'effective_to': budget.effective_to.isoformat() if budget.effective_to else None
+                } for budget in rows(Budget)],
+                'settings': [{
+                    'id': setting.id,
+                    'user_id': setting.user_id,
+                    'key': setting.key,
+                    'value': setting.value
+                } for setting in rows(Settings)],
+                'savings': [{
+                    'id': saving.id,
+                    'user_id': saving.user_id,
+                    'date': saving.date.isoformat(),
+                    'amount': saving.amount,
+                    'description': saving.description
+                } for saving in rows(Saving)],
+                'savings_goals': [{
+                    'id': goal.id,
+                    'user_id': goal.user_id,
+                    'name': goal.name,
+                    'target_amount': goal.target_amount,
+                    'current_amount': goal.current_amount,
+                    'is_archived': goal.is_archived,
+                    'created_at': goal.created_at.isoformat() if goal.created_at else None,
+                    'completed_at': goal.completed_at.isoformat() if goal.completed_at else None
+                } for goal in rows(SavingsGoal)],
+                'goal_contributions': [{
+                    'id': contribution.id,
+                    'user_id': contribution.user_id,
+                    'goal_id': contribution.goal_id,
+                    'amount': contribution.amount,
+                    'created_at': contribution.created_at.isoformat()
+                } for contribution in rows(GoalContribution)]
+            }
 
-        # Export settings
-        settings = db_session.query(Settings).all()
-        for setting in settings:
-            data['settings'].append({
-                'id': setting.id,
-                'user_id': setting.user_id,
-                'key': setting.key,
-                'value': setting.value
-            })
-
-        # Export savings
-        savings = db_session.query(Saving).all()
-        for saving in savings:
-            data['savings'].append({
-                'id': saving.id,
-                'user_id': saving.user_id,
-                'date': saving.date.isoformat(),
-                'amount': saving.amount,
-                'description': saving.description
-            })
-
-        # Export savings goals
-        goals = db_session.query(SavingsGoal).all()
-        for goal in goals:
-            data['savings_goals'].append({
-                'id': goal.id,
-                'user_id': goal.user_id,
-                'name': goal.name,
-                'target_amount': goal.target_amount,
-                'current_amount': goal.current_amount,
-                'is_archived': goal.is_archived,
-                'created_at': goal.created_at.isoformat() if goal.created_at else None,
-                'completed_at': goal.completed_at.isoformat() if goal.completed_at else None
-            })
+        progress(0.1, 'Exporting expenses, budgets and savings')
+        shards = [shard_for(user_id)] if user_id is not None else None
+        for shard_data in fan_out(export_shard, shards).values():
+            for key, rows in shard_data.items():
+                data[key].extend(rows)
 
         # Write to file
+        progress(0.9, 'Writing file')
         with open(filename, 'w') as f:
             json.dump(data, f, indent=2)
 
@@ -105,6 +135,7 @@ def export_backup(filename=None):
         print(f"  Budgets: {len(data['budgets'])}")
         print(f"  Savings: {len(data['savings'])}")
         print(f"  Savings Goals: {len(data['savings_goals'])}")
+        print(f"  Goal Contributions: {len(data['goal_contributions'])}")
         print(f"  Settings: {len(data['settings'])}")
 
         return filename
@@ -112,8 +143,9 @@ def export_backup(filename=None):
     finally:
         db_session.close()
 
-def import_backup(filename):
+def import_backup(filename, progress=None):
     """Restore data from JSON backup file."""
+    progress = progress or (lambda fraction, message=None: None)
     try:
         with open(filename, 'r') as f:
             data = json.load(f)
@@ -125,6 +157,7 @@ def import_backup(filename):
         return False
 
     db_session = get_session()
+    shard_sessions = {}
     try:
         print(f"Restoring from backup: {filename}")
         print(f"Backup date: {data.get('export_date', 'Unknown')}")
@@ -141,30 +174,41 @@ def import_backup(filename):
             else:
                 print(f"  ⚠ Warning: User '{user_data['username']}' not found. Create account first.")
 
+        # Each user's rows go to the shard that holds that user
+        def shard_session(user_id):
+            if user_id not in shard_sessions:
+                shard_sessions[user_id] = get_user_session(user_id)
+            return shard_sessions[user_id]
+
         # Restore expenses
+        progress(0.1, 'Restoring expenses')
         expense_count = 0
         for expense_data in data['expenses']:
             if expense_data['user_id'] in user_map:
                 expense = Expense(
                     user_id=user_map[expense_data['user_id']],
                     date=datetime.fromisoformat(expense_data['date']).date(),
-                    category=expense_data['category'],
+                    category_id=category_id(shard_session(user_map[expense_data['user_id']]), expense_data['category']),
                     amount=expense_data['amount'],
                     description=expense_data.get('description', '')
                 )
-                db_session.add(expense)
+                shard_session(expense.user_id).add(expense)
                 expense_count += 1
 
         # Restore budgets
+        progress(0.6, 'Restoring budgets, settings and savings')
         budget_count = 0
         for budget_data in data['budgets']:
             if budget_data['user_id'] in user_map:
                 budget = Budget(
                     user_id=user_map[budget_data['user_id']],
-                    category=budget_data['category'],
-                    monthly_limit=budget_data['monthly_limit']
+                    category_id=category_id(shard_session(user_map[budget_data['user_id']]), budget_data['category']),
+                    monthly_limit=budget_data['monthly_limit'],
+                    # Backups from before budget versioning hold only current limits
+                    effective_from=datetime.fromisoformat(budget_data['effective_from']).date() if budget_data.get('effective_from') else BUDGET_EPOCH,
+                    effective_to=datetime.fromisoformat(budget_data['effective_to']).date() if budget_data.get('effective_to') else None
                 )
-                db_session.add(budget)
+                shard_session(budget.user_id).add(budget)
                 budget_count += 1
 
         # Restore settings
@@ -176,7 +220,7 @@ def import_backup(filename):
                     key=setting_data['key'],
                     value=setting_data['value']
                 )
-                db_session.add(setting)
+                shard_session(setting.user_id).add(setting)
                 setting_count += 1
 
         # Restore savings
@@ -189,11 +233,12 @@ def import_backup(filename):
                     amount=saving_data['amount'],
                     description=saving_data.get('description', '')
                 )
-                db_session.add(saving)
+                shard_session(saving.user_id).add(saving)
                 saving_count += 1
 
         # Restore savings goals
         goal_count = 0
+        goal_map = {}
         for goal_data in data.get('savings_goals', []):
             if goal_data['user_id'] in user_map:
                 goal = SavingsGoal(
@@ -205,26 +250,44 @@ def import_backup(filename):
                     created_at=datetime.fromisoformat(goal_data['created_at']) if goal_data.get('created_at') else None,
                     completed_at=datetime.fromisoformat(goal_data['completed_at']) if goal_data.get('completed_at') else None
                 )
-                db_session.add(goal)
+                shard_session(goal.user_id).add(goal)
+                goal_map[goal_data['id']] = goal
                 goal_count += 1
 
-        db_session.commit()
+        # Restore goal contributions into the restored goals (their ids are new)
+        contribution_count = 0
+        for contribution_data in data.get('goal_contributions', []):
+            if contribution_data['goal_id'] in goal_map:
+                goal_map[contribution_data['goal_id']].contributions.append(GoalContribution(
+                    user_id=user_map[contribution_data['user_id']],
+                    amount=contribution_data['amount'],
+                    created_at=datetime.fromisoformat(contribution_data['created_at'])
+                ))
+                contribution_count += 1
+
+        progress(0.9, 'Committing')
+        for user_session in shard_sessions.values():
+            user_session.commit()
 
         print(f"✓ Restore completed successfully!")
         print(f"  Expenses restored: {expense_count}")
         print(f"  Budgets restored: {budget_count}")
         print(f"  Savings restored: {saving_count}")
         print(f"  Savings Goals restored: {goal_count}")
+        print(f"  Goal Contributions restored: {contribution_count}")
         print(f"  Settings restored: {setting_count}")
 
         return True
 
     except Exception as e:
-        db_session.rollback()
+        for user_session in shard_sessions.values():
+            user_session.rollback()
         print(f"✗ Error during restore: {str(e)}")
         return False
 
     finally:
+        for user_session in shard_sessions.values():
+            user_session.close()
         db_session.close()
 
 if __name__ == '__main__':
@@ -232,18 +295,32 @@ if __name__ == '__main__':
         print("Usage:")
         print("  python backup.py export              # Create backup")
         print("  python backup.py import <file>       # Restore from backup")
+        print("  add --queue to run either as a background job")
         sys.exit(1)
 
-    command = sys.argv[1].lower()
+    queued = '--queue' in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != '--queue']
+    command = args[0].lower()
 
     if command == 'export':
-        export_backup()
+        if queued:
+            from jobs import enqueue
+            job_id = enqueue('export_backup')
+            print(f"✓ Queued export as job {job_id}; check it with: python job_worker.py --status {job_id}")
+        else:
+            export_backup()
     elif command == 'import':
-        if len(sys.argv) < 3:
+        if len(args) < 2:
             print("Error: Please specify backup file to import")
             print("Usage: python backup.py import <backup_file.json>")
             sys.exit(1)
-        import_backup(sys.argv[2])
+        if queued:
+            from jobs import enqueue
+            # The worker may run from another directory
+            job_id = enqueue('import_backup', {'filename': os.path.abspath(args[1])})
+            print(f"✓ Queued restore as job {job_id}; check it with: python job_worker.py --status {job_id}")
+        else:
+            import_backup(args[1])
     else:
         print(f"Unknown command: {command}")
         print("Use 'export' or 'import'")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Measure cold-storage archiving of old expenses. Seeds a throwaway database
+with five years of expenses for a few users, records the expense list,
+monthly reports, comparisons, range totals and available months, archives
+everything older than the hot window, then checks every response is
+unchanged and compares database size and response times before and after.
+
+Usage:
+    python bench_archive.py [expense_count]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# database.py opens budget.db in the working directory
+os.chdir(tempfile.mkdtemp(prefix='budget-bench-'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dateutil.relativedelta import relativedelta  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from app import app, CATEGORIES  # noqa: E402
+from archive import archive_cutoff, archive_user  # noqa: E402
+from database import get_session, init_db, category_id, to_cents, User  # noqa: E402
+
+USERS = 3
+ROUNDS = 10
+DAYS = 1825
+WORDS = ['coffee', 'groceries', 'fuel', 'lunch', 'rent', 'gift', 'tickets', 'pharmacy', 'hardware', 'books']
+
+
+def seed(expense_count):
+    init_db()
+    db_session = get_session()
+    try:
+        for i in range(USERS):
+            db_session.add(User(username=f'user{i}', password_hash='x'))
+        db_session.commit()
+        user_ids = [u.id for u in db_session.query(User).all()]
+        category_ids = [category_id(db_session, c) for c in CATEGORIES]
+
+        today = date.today()
+        batch = []
+        for n in range(expense_count):
+            batch.append({
+                'user_id': random.choice(user_ids),
+                'date': str(today - timedelta(days=random.randint(0, DAYS))),
+                'category_id': random.choice(category_ids),
+                'amount_cents': to_cents(round(random.uniform(1, 200), 2)),
+                'description': ' '.join(random.sample(WORDS, 2)),
+            })
+            if len(batch) == 50000 or n == expense_count - 1:
+                db_session.execute(text(
+                    "INSERT INTO expenses (user_id, date, category_id, amount_cents, description) "
+                    "VALUES (:user_id, :date, :category_id, :amount_cents, :description)"
+                ), batch)
+                db_session.commit()
+                batch = []
+        db_session.execute(text("ANALYZE"))
+        db_session.commit()
+        return user_ids
+    finally:
+        db_session.close()
+
+
+def requests_to_check():
+    today = date.today()
+    cutoff = archive_cutoff()
+    old_month = (cutoff - relativedelta(months=6)).strftime('%Y-%m')
+    straddle = f'{cutoff - timedelta(days=40)}..{cutoff + timedelta(days=40)}'
+    return {
+        'recent list': ('/api/expenses', {'limit': 50}),
+        'old list page': ('/api/expenses', {'start_date': str(cutoff - relativedelta(years=2)),
+                                            'end_date': str(cutoff - relativedelta(years=1)),
+                                            'limit': 50, 'offset': 100}),
+        'full list': ('/api/expenses', {}),
+        'monthly report (hot)': (f"/api/reports/monthly/{today.strftime('%Y-%m')}", {}),
+        'monthly report (archived)': (f'/api/reports/monthly/{old_month}', {}),
+        'compare 5 years': ('/api/reports/compare', {
+            'periods': ','.join(str(today.year - i) for i in range(5, -1, -1)) + ',' + straddle}),
+        'category breakdown': ('/api/visualizations/category-breakdown', {
+            'start_date': str(cutoff - timedelta(days=100)), 'end_date': str(today)}),
+        'range totals': ('/api/visualizations/range-totals', {'ranges': straddle}),
+        'available months': ('/api/reports/available-months', {}),
+    }
+
+
+def snapshot(client, checks):
+    results = {}
+    for name, (path, params) in checks.items():
+        response = client.get(path, query_string=params)
+        assert response.status_code == 200, (name, response.json)
+        data = response.json
+        if isinstance(data, list):
+            data = [{k: v for k, v in row.items() if k != 'archived'} if isinstance(row, dict) else row for row in data]
+        results[name] = data
+    return results
+
+
+def median_ms(client, path, params):
+    samples = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        client.get(path, query_string=params)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def database_size():
+    db_session = get_session()
+    try:
+        db_session.execute(text("VACUUM"))
+        expense_rows = db_session.execute(text("SELECT COUNT(*) FROM expenses")).scalar()
+    finally:
+        db_session.close()
+    return os.path.getsize('budget.db'), expense_rows
+
+
+def main():
+    expense_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    user_ids = seed(expense_count)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_ids[0]
+
+    checks = requests_to_check()
+    before = snapshot(client, checks)
+    before_ms = {name: median_ms(client, path, params) for name, (path, params) in checks.items()}
+    before_size, before_rows = database_size()
+
+    start = time.perf_counter()
+    cutoff = archive_cutoff()
+    moved = 0
+    for user_id in user_ids:
+        db_session = get_session()
+        try:
+            moved += archive_user(db_session, user_id, cutoff)
+            db_session.commit()
+        finally:
+            db_session.close()
+    print(f"Archived {moved} of {expense_count} expenses (before {cutoff}) in {time.perf_counter() - start:.1f}s")
+
+    after = snapshot(client, checks)
+    for name in checks:
+        assert after[name] == before[name], f'{name} changed after archiving'
+    print(f"✓ All {len(checks)} responses identical before and after archiving")
+
+    after_size, after_rows = database_size()
+    print(f"Database: {before_size / 1024 / 1024:.1f}MB -> {after_size / 1024 / 1024:.1f}MB; "
+          f"expenses table: {before_rows} -> {after_rows} rows")
+    print(f"Response times (median of {ROUNDS}):")
+    for name, (path, params) in checks.items():
+        print(f"  {name:28} {before_ms[name]:8.1f}ms -> {median_ms(client, path, params):8.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark /api/reports/compare against calling /api/reports/monthly once per
+month. Seeds a throwaway database with several years of expenses spread over
+a few users, checks that both give the same totals, then times growing lists
+of periods (recent months, quarters and year-over-year mixes).
+
+Usage:
+    python bench_compare.py [expense_count]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# database.py opens budget.db in the working directory
+os.chdir(tempfile.mkdtemp(prefix='budget-bench-'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text  # noqa: E402
+
+from app import app, CATEGORIES  # noqa: E402
+from database import get_session, init_db, category_id, to_cents, User  # noqa: E402
+
+USERS = 5
+ROUNDS = 10
+
+
+def seed(expense_count):
+    init_db()
+    db_session = get_session()
+    try:
+        for i in range(USERS):
+            db_session.add(User(username=f'user{i}', password_hash='x'))
+        db_session.commit()
+        user_ids = [u.id for u in db_session.query(User).all()]
+        category_ids = [category_id(db_session, c) for c in CATEGORIES]
+
+        start = time.perf_counter()
+        today = date.today()
+        batch = []
+        for n in range(expense_count):
+            batch.append({
+                'user_id': random.choice(user_ids),
+                'date': str(today - timedelta(days=random.randint(0, 1095))),
+                'category_id': random.choice(category_ids),
+                'amount_cents': to_cents(round(random.uniform(1, 200), 2)),
+            })
+            if len(batch) == 50000 or n == expense_count - 1:
+                db_session.execute(text(
+                    "INSERT INTO expenses (user_id, date, category_id, amount_cents) "
+                    "VALUES (:user_id, :date, :category_id, :amount_cents)"
+                ), batch)
+                db_session.commit()
+                batch = []
+        db_session.execute(text("ANALYZE"))
+        db_session.commit()
+        print(f"Seeded {expense_count} expenses for {USERS} users in {time.perf_counter() - start:.1f}s")
+        return user_ids[0]
+    finally:
+        db_session.close()
+
+
+def recent_months(count):
+    month = date.today().replace(day=1)
+    months = []
+    for _ in range(count):
+        months.append(f'{month.year}-{month.month:02d}')
+        month = (month - timedelta(days=1)).replace(day=1)
+    return months
+
+
+def timed(fn):
+    samples = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main():
+    expense_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    user_id = seed(expense_count)
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+
+    def compare(periods):
+        response = client.get('/api/reports/compare', query_string={'periods': ','.join(periods)})
+        assert response.status_code == 200, response.json
+        return response.json['periods']
+
+    def monthly(months):
+        return [client.get(f'/api/reports/monthly/{m}').json for m in months]
+
+    months = recent_months(12)
+    for result, report in zip(compare(months), monthly(months)):
+        assert round(result['total'], 2) == report['total_spent'], (result['period'], result['total'], report['total_spent'])
+    print("✓ Compare totals match the monthly reports")
+
+    year = date.today().year
+    scenarios = [
+        ('1 month', recent_months(1)),
+        ('3 months', recent_months(3)),
+        ('12 months', recent_months(12)),
+        ('36 months', recent_months(36)),
+        ('4 quarters + 2 years', [f'{year - 1}-Q{q}' for q in range(1, 5)] + [str(year - 1), str(year)]),
+        ('month vs same month last year', [recent_months(1)[0], f'{year - 1}-{date.today().month:02d}']),
+    ]
+    print(f"{'periods':32s} {'compare':>10s} {'monthly x N':>12s}  (median of {ROUNDS})")
+    for label, periods in scenarios:
+        compare_ms = timed(lambda: compare(periods))
+        months_only = all(len(p) == 7 for p in periods)
+        monthly_ms = f"{timed(lambda: monthly(periods)):10.1f}ms" if months_only else f"{'-':>12s}"
+        print(f"  {label:30s} {compare_ms:8.1f}ms {monthly_ms}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Time the month-end forecast at its largest trial count.
+Seeds a user with HISTORY_DAYS of spending in every category (plus budgets and
+a few recurring templates) in a throwaway database, then reports the median
+time of forecast.month_end() and of the simulation alone, on the first day of
+a 31-day month so the most days are left to draw.
+
+Usage:
+    python bench_forecast.py [trials]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# database.py opens budget.db in the working directory
+os.chdir(tempfile.mkdtemp(prefix='budget-bench-'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np  # noqa: E402
+
+import forecast  # noqa: E402
+from database import (  # noqa: E402
+    get_session, init_db, category_id, CATEGORIES, BUDGET_EPOCH, User, Budget, Expense, RecurringExpense
+)
+
+ROUNDS = 5
+TODAY = date(2026, 10, 1)
+
+
+def seed():
+    rng = random.Random(7)
+    db_session = get_session()
+    try:
+        user = User(username='bench')
+        user.set_password('bench')
+        db_session.add(user)
+        db_session.flush()
+        category_ids = [category_id(db_session, c) for c in CATEGORIES]
+        for category in category_ids:
+            db_session.add(Budget(user_id=user.id, category_id=category, monthly_limit_cents=rng.randint(100, 800) * 100,
+                                  effective_from=BUDGET_EPOCH))
+        for day in range(1, forecast.HISTORY_DAYS + 1):
+            for category in category_ids:
+                if rng.random() < 0.3:
+                    db_session.add(Expense(user_id=user.id, date=TODAY - timedelta(days=day), category_id=category,
+                                           amount_cents=rng.randint(100, 10000)))
+        for category in category_ids[:3]:
+            db_session.add(RecurringExpense(user_id=user.id, name='Bill', category_id=category, amount_cents=5000,
+                                            frequency='monthly', day_of_month=15, start_date=date(2025, 1, 15),
+                                            is_active=True))
+        db_session.commit()
+        return user.id
+    finally:
+        db_session.close()
+
+
+def median_ms(fn):
+    samples = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return sorted(samples)[len(samples) // 2]
+
+
+def main():
+    trials = int(sys.argv[1]) if len(sys.argv) > 1 else forecast.MAX_TRIALS
+    init_db()
+    user_id = seed()
+
+    db_session = get_session()
+    try:
+        columns, days, today_cents = forecast.daily_history(db_session, user_id, TODAY)
+        days_left = 30
+        print(f"{len(columns)} categories, {days} days of history, {days_left} days left, {trials} trials")
+        print(f"  simulate()   {median_ms(lambda: forecast.simulate(columns, days, days_left, trials, np.random.default_rng(1), today_cents)):8.1f}ms")
+        print(f"  month_end()  {median_ms(lambda: forecast.month_end(db_session, user_id, TODAY, trials, 1)):8.1f}ms")
+    finally:
+        db_session.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Measure expense insert throughput with and without group commit. Concurrent
+clients POST /api/expenses against a throwaway database, first with every
+request committing its own row, then through the write buffer
+(write_buffer.py), and the script checks every acknowledged id was stored.
+
+Usage:
+    python bench_group_commit.py [clients] [inserts_per_client] [window_ms]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+# database.py opens budget.db in the working directory
+os.chdir(tempfile.mkdtemp(prefix='budget-bench-'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import write_buffer  # noqa: E402
+from app import app  # noqa: E402
+from database import get_session, init_db, User, Expense  # noqa: E402
+
+
+def seed():
+    init_db()
+    db_session = get_session()
+    try:
+        user = User(username='bench', password_hash='x')
+        db_session.add(user)
+        db_session.commit()
+        return user.id
+    finally:
+        db_session.close()
+
+
+def run(user_id, clients, per_client):
+    ids, errors = [], []
+    lock = threading.Lock()
+    barrier = threading.Barrier(clients + 1)
+
+    def client_loop():
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+        barrier.wait()
+        for i in range(per_client):
+            response = client.post('/api/expenses', json={
+                'date': str(date.today()), 'category': 'Groceries', 'amount': 1 + i % 50, 'description': 'bench'
+            })
+            with lock:
+                if response.status_code == 200:
+                    ids.append(response.json['id'])
+                else:
+                    errors.append(response.status_code)
+
+    threads = [threading.Thread(target=client_loop) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    db_session = get_session()
+    try:
+        stored = {e.id for e in db_session.query(Expense.id).filter(Expense.id.in_(ids))}
+    finally:
+        db_session.close()
+    assert stored == set(ids) and len(ids) == len(set(ids)), 'an acknowledged insert is missing'
+    return len(ids) / elapsed, len(errors)
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    window_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 2
+    user_id = seed()
+
+    print(f"{clients} concurrent clients x {per_client} inserts:")
+    write_buffer.GROUP_COMMIT_MS = 0
+    rate, errors = run(user_id, clients, per_client)
+    print(f"  commit per request        {rate:8.0f} inserts/s  ({errors} failed)")
+    write_buffer.GROUP_COMMIT_MS = window_ms
+    rate, errors = run(user_id, clients, per_client)
+    print(f"  group commit ({window_ms:g}ms)      {rate:8.0f} inserts/s  ({errors} failed)")
+    print("✓ Every acknowledged id was stored")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Compare the household views with the single-user endpoints they combine.
+Seeds two linked users in a throwaway database and reports the median
+server time of each single-user endpoint next to its household counterpart,
+which reads both members' per-month aggregates in one grouped query.
+
+Usage:
+    python bench_household.py [expenses_per_user]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# database.py opens budget.db in the working directory
+os.chdir(tempfile.mkdtemp(prefix='budget-bench-'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text  # noqa: E402
+
+import households  # noqa: E402
+from app import app, CATEGORIES  # noqa: E402
+from database import get_session, init_db, category_id, to_cents, User, Budget  # noqa: E402
+
+ROUNDS = 30
+
+
+def seed(username, expense_count):
+    db_session = get_session()
+    try:
+        user = User(username=username)
+        user.set_password('bench')
+        db_session.add(user)
+        db_session.flush()
+        category_ids = [category_id(db_session, c) for c in CATEGORIES]
+        for category in category_ids:
+            db_session.add(Budget(user_id=user.id, category_id=category, monthly_limit=500))
+        today = date.today()
+        db_session.execute(text(
+            "INSERT INTO expenses (user_id, date, category_id, amount_cents, description) "
+            "VALUES (:user_id, :date, :category_id, :amount_cents, 'bench')"
+        ), [{
+            'user_id': user.id,
+            'date': str(today - timedelta(days=random.randint(0, 730))),
+            'category_id': random.choice(category_ids),
+            'amount_cents': to_cents(round(random.uniform(1, 200), 2)),
+        } for _ in range(expense_count)])
+        db_session.commit()
+        return user.id
+    finally:
+        db_session.close()
+
+
+def median_time(client, path):
+    client.get(path)  # warm up
+    samples = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        response = client.get(path)
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == 200, (path, response.status_code)
+    return sorted(samples)[len(samples) // 2]
+
+
+def main():
+    expense_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    init_db()
+    user_id = seed('bench1', expense_count)
+    seed('bench2', expense_count)
+    db_session = get_session()
+    try:
+        households.link(db_session, 'bench', ['bench1', 'bench2'])
+    finally:
+        db_session.close()
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['username'] = 'bench1'
+
+    month = date.today().strftime('%Y-%m')
+    year_ago = (date.today() - timedelta(days=365)).replace(day=1)
+    pairs = [
+        ('dashboard', '/api/dashboard', '/api/household/dashboard'),
+        ('category breakdown (12 months)',
+         f'/api/visualizations/category-breakdown?start_date={year_ago}',
+         f'/api/household/category-breakdown?start_month={year_ago:%Y-%m}'),
+        ('monthly report', f'/api/reports/monthly/{month}', f'/api/household/reports/monthly/{month}'),
+    ]
+
+    print(f"Two members with {expense_count} expenses each, median of {ROUNDS}:")
+    for name, single, household in pairs:
+        print(f"  {name:32s} one user {median_time(client, single) * 1000:6.2f}ms  "
+              f"household {median_time(client, household) * 1000:6.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Headless benchmark for the first page load of the main app.
+Replays the browser's critical path against a throwaway database with the
+Flask test client and adds a simulated network round trip per request wave.
+
+Before: GET /  ->  GET /api/auth/me + GET /api/expenses (in parallel)
+After:  GET /  (auth, budgets, dashboard and first expense page embedded)
+
+Usage:
+    python bench_initial_load.py [expense_count] [rtt_ms]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+# database.py opens budget.db in the working directory
+os.chdir(tempfile.mkdtemp(prefix='budget-bench-'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, CATEGORIES  # noqa: E402
+from database import get_session, init_db, category_id, User, Expense, Budget  # noqa: E402
+
+ROUNDS = 20
+
+
+def seed(expense_count):
+    init_db()
+    db_session = get_session()
+    try:
+        user = User(username='bench')
+        user.set_password('bench')
+        db_session.add(user)
+        db_session.flush()
+
+        category_ids = [category_id(db_session, c) for c in CATEGORIES]
+        for category in category_ids:
+            db_session.add(Budget(user_id=user.id, category_id=category, monthly_limit=500))
+
+        today = date.today()
+        db_session.bulk_save_objects([
+            Expense(
+                user_id=user.id,
+                date=today - timedelta(days=random.randint(0, 730)),
+                category_id=random.choice(category_ids),
+                amount=round(random.uniform(1, 200), 2),
+                description='bench'
+            )
+            for _ in range(expense_count)
+        ])
+        db_session.commit()
+        return user.id, user.username
+    finally:
+        db_session.close()
+
+
+def timed_get(client, path):
+    start = time.perf_counter()
+    response = client.get(path)
+    assert response.status_code == 200, (path, response.status_code)
+    return time.perf_counter() - start
+
+
+def run_waves(client, waves, rtt):
+    """Each wave's requests run in parallel; the page is interactive after the last wave."""
+    total = 0
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        for wave in waves:
+            server_times = list(pool.map(lambda path: timed_get(client, path), wave))
+            total += rtt + max(server_times)
+    return total
+
+
+def main():
+    expense_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rtt = (float(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+
+    user_id, username = seed(expense_count)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['username'] = username
+
+    scenarios = {
+        'before (fetch after load)': [['/'], ['/api/auth/me', '/api/expenses']],
+        'after (embedded state)': [['/']]
+    }
+
+    print(f"Expenses: {expense_count}, simulated RTT: {rtt * 1000:.0f}ms, rounds: {ROUNDS}")
+    for name, waves in scenarios.items():
+        run_waves(client, waves, rtt)  # warm up
+        samples = sorted(run_waves(client, waves, rtt) for _ in range(ROUNDS))
+        median = samples[len(samples) // 2]
+        print(f"  {name:28s} round trips: {len(waves)}  median time-to-interactive: {median * 1000:.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
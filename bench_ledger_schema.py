@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Benchmark the integer-cents / category-id ledger schema against the old one.
+Builds a throwaway database with the old float-amount, category-string tables,
+times the app's aggregate queries and measures table sizes, then runs the
+migration (init_db) and repeats the same measurements on the new schema.
+
+Usage:
+    python bench_ledger_schema.py [expense_count]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# database.py opens budget.db in the working directory
+os.chdir(tempfile.mkdtemp(prefix='budget-bench-'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database import CATEGORIES, SEARCH_DDL, dispose_engine, init_db  # noqa: E402
+
+USERS = 10
+ROUNDS = 10
+WORDS = ['coffee', 'groceries', 'gas', 'lunch', 'rent', 'movie', 'pharmacy', 'uber', 'books', 'gym']
+
+# Schema as created by earlier versions of database.py
+OLD_SCHEMA = """
+CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(50) NOT NULL UNIQUE,
+    password_hash VARCHAR(200) NOT NULL, created_at DATETIME);
+CREATE TABLE expenses (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users (id),
+    date DATE NOT NULL, category VARCHAR(100) NOT NULL, amount FLOAT NOT NULL,
+    description VARCHAR(500), created_at DATETIME);
+CREATE TABLE budgets (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users (id),
+    category VARCHAR(100) NOT NULL, monthly_limit FLOAT NOT NULL, created_at DATETIME, updated_at DATETIME);
+CREATE TABLE savings (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users (id),
+    date DATE NOT NULL, amount FLOAT NOT NULL, description VARCHAR(500), created_at DATETIME);
+CREATE TABLE savings_goals (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users (id),
+    name VARCHAR(200) NOT NULL, target_amount FLOAT NOT NULL, current_amount FLOAT, is_archived BOOLEAN,
+    created_at DATETIME, completed_at DATETIME);
+CREATE TABLE recurring_expenses (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users (id),
+    name VARCHAR(200) NOT NULL, category VARCHAR(100) NOT NULL, amount FLOAT NOT NULL,
+    frequency VARCHAR(20) NOT NULL, start_date DATE NOT NULL, end_date DATE, day_of_month INTEGER,
+    day_of_week INTEGER, last_generated DATE, is_active BOOLEAN, created_at DATETIME);
+"""
+
+# The aggregates behind the dashboard, monthly trends and category breakdown
+QUERIES = {
+    'dashboard (month by category)': (
+        "SELECT {category}, sum({amount}) FROM expenses WHERE user_id = :user_id "
+        "AND date >= :month_start GROUP BY {category}"
+    ),
+    'monthly trends (12 months)': (
+        "SELECT strftime('%Y', date), strftime('%m', date), sum({amount}) FROM expenses "
+        "WHERE user_id = :user_id AND date >= :year_start GROUP BY 1, 2"
+    ),
+    'category breakdown (all)': (
+        "SELECT {category}, sum({amount}) FROM expenses WHERE user_id = :user_id GROUP BY {category}"
+    ),
+    'all users by category': (
+        "SELECT {category}, sum({amount}) FROM expenses GROUP BY {category}"
+    ),
+}
+
+
+def seed_old_schema(expense_count):
+    connection = sqlite3.connect('budget.db')
+    connection.executescript(OLD_SCHEMA)
+    for statement in SEARCH_DDL:
+        connection.execute(statement)
+    connection.executemany(
+        "INSERT INTO users (id, username, password_hash) VALUES (?, ?, 'x')",
+        [(i, f'user{i}') for i in range(1, USERS + 1)]
+    )
+    today = date.today()
+    connection.executemany(
+        "INSERT INTO expenses (user_id, date, category, amount, description) VALUES (?, ?, ?, ?, ?)",
+        ((random.randint(1, USERS),
+          str(today - timedelta(days=random.randint(0, 1825))),
+          random.choice(CATEGORIES),
+          round(random.uniform(1, 200), 2),
+          random.choice(WORDS))
+         for _ in range(expense_count))
+    )
+    connection.executemany(
+        "INSERT INTO budgets (user_id, category, monthly_limit) VALUES (?, ?, 500.0)",
+        [(u, c) for u in range(1, USERS + 1) for c in CATEGORIES]
+    )
+    connection.commit()
+    connection.execute("ANALYZE")
+    connection.close()
+
+
+def measure(label, category, amount, to_dollars):
+    connection = sqlite3.connect('budget.db')
+    connection.execute("ANALYZE")
+    today = date.today()
+    params = {
+        'user_id': 1,
+        'month_start': str(today.replace(day=1)),
+        'year_start': str(today - timedelta(days=365))
+    }
+
+    print(label)
+    sizes = dict(connection.execute(
+        "SELECT name, sum(pgsize) FROM dbstat WHERE name IN ('expenses', 'budgets') GROUP BY name"
+    ).fetchall())
+    print(f"  file: {os.path.getsize('budget.db') / 1e6:6.1f}MB   expenses table: {sizes['expenses'] / 1e6:6.1f}MB")
+
+    for name, sql in QUERIES.items():
+        sql = sql.format(category=category, amount=amount)
+        connection.execute(sql, params).fetchall()  # warm the page cache
+        samples = []
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            connection.execute(sql, params).fetchall()
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        print(f"  {name:30s} {samples[len(samples) // 2]:7.1f}ms")
+
+    total = connection.execute(f"SELECT sum({amount}) FROM expenses").fetchone()[0]
+    print(f"  grand total: {to_dollars(total)!r}")
+    connection.close()
+
+
+def main():
+    expense_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    seed_old_schema(expense_count)
+    print(f"Expenses: {expense_count}, users: {USERS}, median of {ROUNDS}")
+
+    measure('before (float amount, category string)', 'category', 'amount', lambda total: total)
+
+    start = time.perf_counter()
+    init_db()
+    dispose_engine()
+    print(f"migration: {time.perf_counter() - start:.1f}s")
+
+    measure('after (integer cents, category id)', 'category_id', 'amount_cents', lambda total: total / 100)
+
+
+if __name__ == '__main__':
+    main()
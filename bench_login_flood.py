@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark API latency while the login endpoint is being flooded.
+Requests are served by a fixed set of threads, like a gthread gunicorn worker,
+so a login that hogs a thread delays every request queued behind it.
+Measures /api/dashboard latency idle, then during a flood of wrong-password
+logins (with throttling disabled, so only admission control limits the cost),
+once with inline hashing and once through the bounded hash pool.
+
+Usage:
+    python bench_login_flood.py [flood_clients] [seconds]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# database.py opens budget.db in the working directory
+os.chdir(tempfile.mkdtemp(prefix='budget-bench-'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import auth_pool  # noqa: E402
+from app import app  # noqa: E402
+from database import get_session, init_db, User  # noqa: E402
+
+SERVER_THREADS = 16  # matches threads in gunicorn.conf.py
+FLOOD_CLIENT_RTT = 0.005  # seconds each flooding client spends on the network per attempt
+
+
+def seed():
+    init_db()
+    db_session = get_session()
+    try:
+        for i in range(50):
+            user = User(username=f'user{i}')
+            user.set_password('correct-horse')
+            db_session.add(user)
+        db_session.commit()
+        return db_session.query(User).filter_by(username='user0').first().id
+    finally:
+        db_session.close()
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def measure_api(server, user_id, duration):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['username'] = 'user0'
+
+    samples = []
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        server.submit(client.get, '/api/dashboard').result()
+        samples.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.01)
+    return samples
+
+
+def flood(server, stop, counts, index):
+    client = app.test_client()
+    attempt = 0
+    while not stop.is_set():
+        attempt += 1
+        response = server.submit(
+            client.post,
+            '/api/auth/login',
+            json={'username': f'user{(index + attempt) % 50}', 'password': 'wrong'},
+            environ_base={'REMOTE_ADDR': f'10.{index}.{attempt // 250 % 250}.{attempt % 250}'}
+        ).result()
+        counts[response.status_code] = counts.get(response.status_code, 0) + 1
+        time.sleep(FLOOD_CLIENT_RTT)
+
+
+def report(label, samples, counts=None):
+    line = f"  {label:22s} p50: {percentile(samples, 50):7.1f}ms  p95: {percentile(samples, 95):7.1f}ms"
+    if counts is not None:
+        line += f"  login responses: {dict(sorted(counts.items()))}"
+    print(line)
+
+
+def run(label, user_id, flood_clients, duration):
+    with ThreadPoolExecutor(max_workers=SERVER_THREADS) as server:
+        stop = threading.Event()
+        counts = {}
+        clients = [threading.Thread(target=flood, args=(server, stop, counts, i)) for i in range(flood_clients)]
+        for t in clients:
+            t.start()
+        time.sleep(0.5)
+
+        samples = measure_api(server, user_id, duration)
+
+        stop.set()
+        for t in clients:
+            t.join()
+    report(label, samples, counts)
+
+
+def main():
+    flood_clients = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    user_id = seed()
+    # Measure the hashing cost itself; throttling would otherwise reject most of the flood
+    auth_pool.FREE_ATTEMPTS = float('inf')
+    auth_pool.ACCOUNT_FREE_ATTEMPTS = float('inf')
+    print(f"Flood clients: {flood_clients}, server threads: {SERVER_THREADS}, {duration}s per scenario")
+
+    with ThreadPoolExecutor(max_workers=SERVER_THREADS) as server:
+        report('idle', measure_api(server, user_id, duration))
+
+    workers = auth_pool.HASH_WORKERS or 2
+    auth_pool.HASH_WORKERS = 0
+    run('flood, inline hashing', user_id, flood_clients, duration)
+
+    auth_pool.HASH_WORKERS = workers
+    auth_pool.verify_password('scrypt:32768:8:1$x$00', 'warm-up')  # start the pool
+    run(f'flood, pool of {workers}', user_id, flood_clients, duration)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Compare deleting a heavy user through the ORM cascade (db_session.delete(user),
+which loads every child row first) with purge_users()' batched set-based
+DELETEs. Seeds two identical users in a throwaway database, deletes one each
+way, and reports time and peak Python memory, then checks nothing of either
+user is left.
+
+Usage:
+    python bench_purge.py [expenses_per_user]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+# database.py opens budget.db in the working directory
+os.chdir(tempfile.mkdtemp(prefix='budget-bench-'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import func, text  # noqa: E402
+
+from app import CATEGORIES  # noqa: E402
+from database import get_session, init_db, category_id, purge_users, to_cents, user_tables, User  # noqa: E402
+
+
+def seed(username, expense_count):
+    db_session = get_session()
+    try:
+        user = User(username=username, password_hash='x')
+        db_session.add(user)
+        db_session.commit()
+        category_ids = [category_id(db_session, c) for c in CATEGORIES]
+        today = date.today()
+        for start in range(0, expense_count, 50000):
+            db_session.execute(text(
+                "INSERT INTO expenses (user_id, date, category_id, amount_cents, description) "
+                "VALUES (:user_id, :date, :category_id, :amount_cents, 'bench')"
+            ), [{
+                'user_id': user.id,
+                'date': str(today - timedelta(days=random.randint(0, 1825))),
+                'category_id': random.choice(category_ids),
+                'amount_cents': to_cents(round(random.uniform(1, 200), 2)),
+            } for _ in range(min(50000, expense_count - start))])
+            db_session.execute(text(
+                "INSERT INTO savings (user_id, date, amount_cents) VALUES (:user_id, :date, 10000)"
+            ), [{'user_id': user.id, 'date': str(today - timedelta(days=i))} for i in range(100)])
+            db_session.commit()
+        return user.id
+    finally:
+        db_session.close()
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def orm_cascade(user_id):
+    db_session = get_session()
+    try:
+        db_session.delete(db_session.get(User, user_id))
+        db_session.commit()
+    finally:
+        db_session.close()
+
+
+def remaining(user_id):
+    db_session = get_session()
+    try:
+        return sum(
+            db_session.query(func.count()).select_from(table).filter(table.c.user_id == user_id).scalar()
+            for table in user_tables()
+        ) + db_session.query(User).filter_by(id=user_id).count()
+    finally:
+        db_session.close()
+
+
+def main():
+    expense_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    init_db()
+    cascade_user = seed('cascade', expense_count)
+    purge_user = seed('purge', expense_count)
+    print(f"Deleting a user with {expense_count} expenses:")
+
+    elapsed, peak = measure(lambda: orm_cascade(cascade_user))
+    print(f"  ORM cascade delete     {elapsed:6.1f}s  peak {peak / 1024 / 1024:7.1f}MB")
+    elapsed, peak = measure(lambda: purge_users([purge_user]))
+    print(f"  set-based purge        {elapsed:6.1f}s  peak {peak / 1024 / 1024:7.1f}MB")
+
+    # The cascade leaves rows of tables it has no relationship for (e.g. sync tombstones)
+    print(f"Rows left behind: cascade {remaining(cascade_user)}, purge {remaining(purge_user)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark date-range category totals from the prefix-sum index against
+re-aggregating expenses for every range, as the category breakdown used to.
+Seeds a throwaway database with several years of expenses spread over a few
+users, checks both give the same totals for random ranges, then times
+batches of ranges like those a range slider produces, cold (index rebuilt
+after a write) and warm.
+
+Usage:
+    python bench_range_totals.py [expense_count] [ranges_per_request]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# database.py opens budget.db in the working directory
+os.chdir(tempfile.mkdtemp(prefix='budget-bench-'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import func, text  # noqa: E402
+
+from app import app, CATEGORIES  # noqa: E402
+from database import get_session, init_db, category_id, category_name, from_cents, to_cents, User, Expense  # noqa: E402
+
+USERS = 5
+ROUNDS = 10
+DAYS = 1095
+
+
+def seed(expense_count):
+    init_db()
+    db_session = get_session()
+    try:
+        for i in range(USERS):
+            db_session.add(User(username=f'user{i}', password_hash='x'))
+        db_session.commit()
+        user_ids = [u.id for u in db_session.query(User).all()]
+        category_ids = [category_id(db_session, c) for c in CATEGORIES]
+
+        start = time.perf_counter()
+        today = date.today()
+        batch = []
+        for n in range(expense_count):
+            batch.append({
+                'user_id': random.choice(user_ids),
+                'date': str(today - timedelta(days=random.randint(0, DAYS))),
+                'category_id': random.choice(category_ids),
+                'amount_cents': to_cents(round(random.uniform(1, 200), 2)),
+            })
+            if len(batch) == 50000 or n == expense_count - 1:
+                db_session.execute(text(
+                    "INSERT INTO expenses (user_id, date, category_id, amount_cents) "
+                    "VALUES (:user_id, :date, :category_id, :amount_cents)"
+                ), batch)
+                db_session.commit()
+                batch = []
+        db_session.execute(text("ANALYZE"))
+        db_session.commit()
+        print(f"Seeded {expense_count} expenses for {USERS} users in {time.perf_counter() - start:.1f}s")
+        return user_ids[0]
+    finally:
+        db_session.close()
+
+
+def random_ranges(count):
+    today = date.today()
+    ranges = []
+    for _ in range(count):
+        start = today - timedelta(days=random.randint(0, DAYS))
+        end = min(today, start + timedelta(days=random.randint(0, 365)))
+        ranges.append((start, end))
+    return ranges
+
+
+def scan_totals(user_id, ranges):
+    """The previous approach: one grouped query per range."""
+    db_session = get_session()
+    try:
+        results = []
+        for start, end in ranges:
+            rows = db_session.query(Expense.category_id, func.sum(Expense.amount_cents)).filter(
+                Expense.user_id == user_id, Expense.date >= start, Expense.date <= end
+            ).group_by(Expense.category_id).all()
+            results.append({category_name(db_session, c): from_cents(cents) for c, cents in rows})
+        return results
+    finally:
+        db_session.close()
+
+
+def median_ms(fn, before=None):
+    samples = []
+    for _ in range(ROUNDS):
+        if before:
+            before()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main():
+    expense_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    range_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    user_id = seed(expense_count)
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+
+    ranges = random_ranges(range_count)
+    query = ','.join(f'{start}..{end}' for start, end in ranges)
+
+    def indexed():
+        response = client.get('/api/visualizations/range-totals', query_string={'ranges': query})
+        assert response.status_code == 200, response.json
+        return [r['categories'] for r in response.json['ranges']]
+
+    assert indexed() == scan_totals(user_id, ranges)
+    print(f"✓ Index totals match grouped scans for {range_count} random ranges")
+
+    def touch():
+        # Any expense write bumps the user's version, so the next read rebuilds
+        client.post('/api/expenses', json={'date': str(date.today()), 'category': 'Groceries', 'amount': 1})
+
+    print(f"{range_count} ranges per request (median of {ROUNDS}):")
+    print(f"  grouped scan per range    {median_ms(lambda: scan_totals(user_id, ranges)):8.1f}ms")
+    print(f"  prefix sums, after write  {median_ms(indexed, before=touch):8.1f}ms")
+    print(f"  prefix sums, cached       {median_ms(indexed):8.1f}ms")
+    one = f'{ranges[0][0]}..{ranges[0][1]}'
+    print(f"  one range, cached         "
+          f"{median_ms(lambda: client.get('/api/visualizations/range-totals', query_string={'ranges': one})):8.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark /api/expenses/search against a LIKE '%...%' scan.
+Seeds a throwaway database with many expenses spread over several users
+(the FTS5 triggers index them as they are inserted), then times ranked
+search pages for prefix and phrase queries with and without filters.
+
+Usage:
+    python bench_search.py [expense_count]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# database.py opens budget.db in the working directory
+os.chdir(tempfile.mkdtemp(prefix='budget-bench-'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text  # noqa: E402
+
+from app import app, CATEGORIES  # noqa: E402
+from database import get_session, init_db, category_id, to_cents, User  # noqa: E402
+
+USERS = 10
+ROUNDS = 20
+WORDS = ['coffee', 'whole', 'foods', 'market', 'uber', 'lyft', 'gas', 'station', 'netflix', 'spotify',
+         'pharmacy', 'rent', 'dinner', 'lunch', 'pizza', 'sushi', 'target', 'costco', 'amazon', 'movie',
+         'tickets', 'electric', 'water', 'insurance', 'doctor', 'gym', 'haircut', 'books', 'parking', 'toll']
+# A few thousand merchant-like tokens so the vocabulary resembles real descriptions
+SYLLABLES = ['ba', 'ko', 'ri', 'mel', 'dan', 'tor', 'ski', 'vue', 'lan', 'po', 'zen', 'quo', 'fi', 'ra', 'nu']
+MERCHANTS = sorted({''.join(random.sample(SYLLABLES, 3)) for _ in range(5000)})
+
+
+def seed(expense_count):
+    init_db()
+    db_session = get_session()
+    try:
+        for i in range(USERS):
+            user = User(username=f'user{i}')
+            user.password_hash = 'x'
+            db_session.add(user)
+        db_session.commit()
+        user_ids = [u.id for u in db_session.query(User).all()]
+        category_ids = [category_id(db_session, c) for c in CATEGORIES]
+
+        start = time.perf_counter()
+        today = date.today()
+        batch = []
+        for n in range(expense_count):
+            batch.append({
+                'user_id': random.choice(user_ids),
+                'date': str(today - timedelta(days=random.randint(0, 1825))),
+                'category_id': random.choice(category_ids),
+                'amount_cents': to_cents(round(random.uniform(1, 200), 2)),
+                'description': ' '.join(random.sample(WORDS, random.randint(1, 2)) + random.sample(MERCHANTS, random.randint(0, 2)))
+            })
+            if len(batch) == 50000 or n == expense_count - 1:
+                db_session.execute(text(
+                    "INSERT INTO expenses (user_id, date, category_id, amount_cents, description) "
+                    "VALUES (:user_id, :date, :category_id, :amount_cents, :description)"
+                ), batch)
+                db_session.commit()
+                batch = []
+        db_session.execute(text("ANALYZE"))
+        db_session.commit()
+        print(f"Seeded {expense_count} expenses for {USERS} users in {time.perf_counter() - start:.1f}s")
+        return user_ids[0]
+    finally:
+        db_session.close()
+
+
+def time_request(client, query_string):
+    samples = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        response = client.get('/api/expenses/search', query_string=query_string)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200
+    samples.sort()
+    return samples[len(samples) // 2], len(response.json['results'])
+
+
+def time_like(user_id, needle):
+    db_session = get_session()
+    try:
+        samples = []
+        for _ in range(ROUNDS // 4):
+            start = time.perf_counter()
+            db_session.execute(text(
+                "SELECT id FROM expenses WHERE user_id = :user_id AND description LIKE :pattern "
+                "ORDER BY date DESC LIMIT 25"
+            ), {'user_id': user_id, 'pattern': f'%{needle}%'}).all()
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        return samples[len(samples) // 2]
+    finally:
+        db_session.close()
+
+
+def main():
+    expense_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    user_id = seed(expense_count)
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['username'] = 'user0'
+
+    cases = {
+        'prefix "cof"': {'q': 'cof'},
+        'phrase "whole foods"': {'q': '"whole foods"'},
+        'prefix + date range': {'q': 'pizz', 'start_date': '2024-01-01', 'end_date': '2024-12-31'},
+        'two terms + category': {'q': 'gas station', 'category': 'Gas'},
+        'page 3': {'q': 'coffee', 'offset': 50},
+        'merchant prefix': {'q': MERCHANTS[0][:5]}
+    }
+    for label, query_string in cases.items():
+        median, count = time_request(client, query_string)
+        print(f"  {label:24s} {median:7.1f}ms  ({count} hits on page)")
+
+    print(f"  {'LIKE %coffee% (baseline)':24s} {time_like(user_id, 'coffee'):7.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
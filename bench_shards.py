@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent expense writes with one database versus several shards.
+Each scenario runs in a fresh process (shards are configured at import) with a
+throwaway set of SQLite files. Writer threads each act as a different user
+and POST expenses as fast as they can; SQLite allows one writer per file, so
+with a single file every commit waits behind every other one.
+
+Usage:
+    python bench_shards.py [writers] [seconds]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+SHARD_COUNTS = [1, 2, 4]
+
+
+def run_scenario(shard_count, writers, duration):
+    # database.py reads DATABASE_SHARDS at import, so configure before importing the app
+    os.chdir(tempfile.mkdtemp(prefix='budget-bench-'))
+    os.environ['DATABASE_SHARDS'] = ','.join(f's{i}=sqlite:///shard{i}.db' for i in range(1, shard_count))
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    from app import app
+    from database import MAIN_SHARD, get_session, init_db, User
+
+    init_db()
+    db_session = get_session()
+    try:
+        users = []
+        for i in range(writers):
+            user = User(username=f'user{i}', password_hash='x')
+            db_session.add(user)
+            users.append(user)
+        db_session.commit()
+        # Spread writers evenly so the comparison isn't at the mercy of the hash ring
+        shards = [MAIN_SHARD] + [f's{i}' for i in range(1, shard_count)]
+        for i, user in enumerate(users):
+            user.shard = shards[i % shard_count]
+        db_session.commit()
+        user_ids = [u.id for u in users]
+    finally:
+        db_session.close()
+
+    latencies = []
+    errors = [0]
+    deadline = time.monotonic() + duration
+
+    def writer(user_id):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            response = client.post('/api/expenses', json={
+                'date': '2026-01-15', 'category': 'Groceries', 'amount': 12.5, 'description': 'bench'
+            })
+            if response.status_code == 200:
+                latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                errors[0] += 1
+
+    threads = [threading.Thread(target=writer, args=(user_id,)) for user_id in user_ids]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0
+    print(f"  {shard_count} shard(s): {len(latencies) / duration:7.0f} writes/s  "
+          f"p95: {p95:6.1f}ms  errors: {errors[0]}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--scenario':
+        run_scenario(int(sys.argv[2]), int(sys.argv[3]), float(sys.argv[4]))
+        return
+
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    print(f"Writers: {writers}, {duration}s per scenario")
+    for shard_count in SHARD_COUNTS:
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--scenario',
+                        str(shard_count), str(writers), str(duration)], check=True)
+
+
+if __name__ == '__main__':
+    main()
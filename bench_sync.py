@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Compare what a returning client downloads with and without delta sync.
+Seeds a throwaway database with years of expenses, savings, goals and
+recurring templates for one user, takes a full copy through /api/sync, makes
+a few edits (adds, an update and deletes), then measures the bytes and time of:
+
+Before: GET /api/expenses, /api/savings, /api/savings-goals, /api/recurring-expenses
+After:  GET /api/sync?since=<version from the previous visit>&epoch=<its epoch>
+
+Usage:
+    python bench_sync.py [expense_count]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# database.py opens budget.db in the working directory
+os.chdir(tempfile.mkdtemp(prefix='budget-bench-'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, CATEGORIES  # noqa: E402
+from database import get_session, init_db, category_id, User, Expense, Saving, SavingsGoal, RecurringExpense  # noqa: E402
+
+ROUNDS = 10
+FULL_LISTS = ['/api/expenses', '/api/savings', '/api/savings-goals', '/api/recurring-expenses']
+
+
+def seed(expense_count):
+    init_db()
+    db_session = get_session()
+    try:
+        user = User(username='bench', password_hash='x')
+        db_session.add(user)
+        db_session.flush()
+
+        category_ids = [category_id(db_session, c) for c in CATEGORIES]
+        today = date.today()
+        db_session.bulk_save_objects([
+            Expense(
+                user_id=user.id,
+                date=today - timedelta(days=random.randint(0, 1825)),
+                category_id=random.choice(category_ids),
+                amount=round(random.uniform(1, 200), 2),
+                description='bench'
+            )
+            for _ in range(expense_count)
+        ] + [
+            Saving(user_id=user.id, date=today - timedelta(days=30 * i), amount=100, description='monthly')
+            for i in range(60)
+        ] + [
+            SavingsGoal(user_id=user.id, name=f'Goal {i}', target_amount=1000, current_amount=0)
+            for i in range(5)
+        ] + [
+            RecurringExpense(user_id=user.id, name=f'Subscription {i}', category_id=category_ids[0], amount=9.99,
+                             frequency='monthly', start_date=today, day_of_month=1)
+            for i in range(10)
+        ])
+        db_session.commit()
+        return user.id
+    finally:
+        db_session.close()
+
+
+def fetch(client, path):
+    response = client.get(path)
+    assert response.status_code == 200, (path, response.status_code)
+    return response
+
+
+def median_ms(fn):
+    samples = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main():
+    expense_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    user_id = seed(expense_count)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+
+    # First visit: page through a full copy, as app.js does into IndexedDB
+    start = time.perf_counter()
+    version, epoch, first_bytes, has_more = 0, '', 0, True
+    while has_more:
+        data = fetch(client, f'/api/sync?since={version}&epoch={epoch}')
+        first_bytes += len(data.data)
+        version, epoch, has_more = data.json['version'], data.json['epoch'], data.json['has_more']
+    print(f"Expenses: {expense_count}; first sync: {first_bytes / 1024:.0f}KB in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    # Changes between visits
+    expenses = fetch(client, '/api/expenses?limit=3').json
+    for i in range(5):
+        client.post('/api/expenses', json={'date': str(date.today()), 'category': 'Groceries', 'amount': 5 + i})
+    for expense in expenses[:2]:
+        client.delete(f"/api/expenses/{expense['id']}")
+    goal_id = fetch(client, '/api/savings-goals').json[0]['id']
+    client.post(f'/api/savings-goals/{goal_id}/add', json={'amount': 25})
+
+    full_bytes = sum(len(fetch(client, path).data) for path in FULL_LISTS)
+    delta = fetch(client, f'/api/sync?since={version}&epoch={epoch}')
+    changed = sum(len(rows) for rows in delta.json['changes'].values())
+    deleted = sum(len(ids) for ids in delta.json['deleted'].values())
+
+    print(f"Repeat visit after 8 edits ({changed} changed rows, {deleted} deletions), median of {ROUNDS}:")
+    print(f"  before (full lists)   {full_bytes / 1024:9.1f}KB  "
+          f"{median_ms(lambda: [fetch(client, path) for path in FULL_LISTS]):7.1f}ms")
+    print(f"  after (delta sync)    {len(delta.data) / 1024:9.1f}KB  "
+          f"{median_ms(lambda: fetch(client, f'/api/sync?since={version}&epoch={epoch}')):7.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
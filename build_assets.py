@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Build fingerprinted static assets for production.
+Strips whitespace and comments from JS, minifies CSS, recompresses and
+resizes images (with WebP/AVIF variants, which templates offer through
+<picture> where they show an image: the login logo),
+writes content-hashed copies to static/dist/ with precompressed .gz/.br
+siblings, and records everything in static/dist/manifest.json.
+
+Usage:
+    python build_assets.py                 # Build static/dist/
+    python build_assets.py --max-size 256  # Cap image dimensions (default 512)
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import sys
+
+from assets import DIST_DIR, MANIFEST_PATH, STATIC_DIR
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+
+SCRIPTS = ['js/app.js']
+STYLESHEETS = ['css/style.css']
+IMAGES = [
+    'favicon.png',
+    'logo.png',
+    'logo-old.png',
+    'logonobackground.png',
+    'Gemini_Generated_Image_ogci5rogci5rogci.png'
+]
+PRECOMPRESS_EXTENSIONS = ('.js', '.css', '.json', '.svg')
+DEFAULT_MAX_IMAGE_SIZE = 512
+
+
+# A '/' after one of these (or at the start of a line) opens a regex literal, not a division
+_REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+
+
+def _line_states(source):
+    """For each line of source, whether it starts in plain code.
+
+    A scan that follows strings, template literals (with ${} nesting), block
+    comments and regex literals, so that a line continuing one of them is
+    recognised.
+    """
+    states = []
+    stack = ['code']  # 'code', 'template', or '${' (code inside a template)
+    in_block_comment = False
+    for line in source.split('\n'):
+        states.append(not in_block_comment and stack[-1] != 'template')
+        i, previous = 0, ''
+        while i < len(line):
+            c = line[i]
+            if in_block_comment:
+                if line.startswith('*/', i):
+                    in_block_comment = False
+                    i += 1
+            elif stack[-1] == 'template':
+                if c == '\\':
+                    i += 1
+                elif c == '`':
+                    stack.pop()
+                    previous = '`'
+                elif line.startswith('${', i):
+                    stack.append('${')
+                    i += 1
+            elif c in '\'"':
+                i += 1
+                while i < len(line) and line[i] != c:
+                    i += 2 if line[i] == '\\' else 1
+                previous = c
+            elif c == '`':
+                stack.append('template')
+            elif line.startswith('//', i):
+                break
+            elif line.startswith('/*', i):
+                in_block_comment = True
+                i += 1
+            elif c == '/' and (not previous or previous in _REGEX_PRECEDERS):
+                i += 1
+                in_class = False
+                while i < len(line) and (line[i] != '/' or in_class):
+                    if line[i] == '\\':
+                        i += 1
+                    elif line[i] in '[]':
+                        in_class = line[i] == '['
+                    i += 1
+                previous = '/'
+            elif c == '}' and stack[-1] == '${':
+                stack.pop()
+            elif not c.isspace():
+                if c == '{' and stack[-1] == '${':
+                    stack.append('${')  # an object or block inside the placeholder
+                previous = c
+            i += 1
+    return states
+
+
+def strip_js(source):
+    """Whitespace and comment stripping (not minification): drops indentation,
+    blank lines and full-line // comments, except inside multi-line strings,
+    template literals and block comments."""
+    lines = []
+    for line, in_code in zip(source.split('\n'), _line_states(source)):
+        if not in_code:
+            lines.append(line)
+            continue
+        stripped = line.strip()
+        if not stripped or stripped.startswith('//'):
+            continue
+        lines.append(stripped)
+    return '\n'.join(lines) + '\n'
+
+
+def minify_css(source):
+    """Strip comments and collapse whitespace around CSS punctuation."""
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{}:;,>])\s*', r'\1', source)
+    return source.replace(';}', '}').strip() + '\n'
+
+
+def optimize_image(path, max_size):
+    """Return {extension: bytes} for a resized PNG plus WebP/AVIF variants."""
+    with Image.open(path) as image:
+        image.load()
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+
+        variants = {}
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG', optimize=True)
+        variants['.png'] = buffer.getvalue()
+
+        buffer = io.BytesIO()
+        image.save(buffer, format='WEBP', quality=80, method=6)
+        variants['.webp'] = buffer.getvalue()
+
+        if features.check('avif'):
+            buffer = io.BytesIO()
+            image.save(buffer, format='AVIF', quality=60)
+            variants['.avif'] = buffer.getvalue()
+
+    # Never ship a "recompressed" PNG that is bigger than the original
+    with open(path, 'rb') as f:
+        original = f.read()
+    if len(variants['.png']) >= len(original):
+        variants['.png'] = original
+    return variants
+
+
+def write_hashed(logical_name, content, manifest):
+    """Write content under a content-hashed name and record it in the manifest."""
+    digest = hashlib.sha256(content).hexdigest()[:10]
+    stem, ext = os.path.splitext(logical_name)
+    hashed_name = f'{stem}.{digest}{ext}'
+    target = os.path.join(DIST_DIR, hashed_name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+    with open(target, 'wb') as f:
+        f.write(content)
+
+    if ext in PRECOMPRESS_EXTENSIONS:
+        with open(target + '.gz', 'wb') as f:
+            f.write(gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli:
+            with open(target + '.br', 'wb') as f:
+                f.write(brotli.compress(content, quality=11))
+
+    manifest[logical_name] = hashed_name
+    return len(content)
+
+
+def build(max_size=DEFAULT_MAX_IMAGE_SIZE):
+    """Rebuild static/dist/ from scratch and write the manifest."""
+    if os.path.exists(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    os.makedirs(DIST_DIR)
+
+    manifest = {}
+
+    for name in SCRIPTS + STYLESHEETS:
+        with open(os.path.join(STATIC_DIR, name), 'r', encoding='utf-8') as f:
+            source = f.read()
+        minified = strip_js(source) if name in SCRIPTS else minify_css(source)
+        size = write_hashed(name, minified.encode('utf-8'), manifest)
+        print(f"  {name}: {len(source.encode('utf-8'))} -> {size} bytes")
+
+    if Image is None:
+        print("⚠ Pillow not installed; copying images without recompression")
+
+    for name in IMAGES:
+        path = os.path.join(STATIC_DIR, name)
+        if not os.path.exists(path):
+            continue
+        original_size = os.path.getsize(path)
+
+        if Image is None:
+            with open(path, 'rb') as f:
+                write_hashed(name, f.read(), manifest)
+            continue
+
+        stem = os.path.splitext(name)[0]
+        for ext, content in optimize_image(path, max_size).items():
+            size = write_hashed(stem + ext, content, manifest)
+            print(f"  {stem + ext}: {original_size} -> {size} bytes")
+
+    with open(MANIFEST_PATH, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    print(f"✓ Built {len(manifest)} assets into {DIST_DIR}")
+    if not brotli:
+        print("⚠ brotli not installed; only .gz siblings were written")
+    return manifest
+
+
+if __name__ == '__main__':
+    max_size = DEFAULT_MAX_IMAGE_SIZE
+    if len(sys.argv) > 1:
+        if sys.argv[1] != '--max-size' or len(sys.argv) < 3:
+            print("Usage: python build_assets.py [--max-size <pixels>]")
+            sys.exit(1)
+        max_size = int(sys.argv[2])
+    build(max_size)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Check the login throttle's keys against the attacks they are meant to stop.
+Drives /api/auth/login in a throwaway database under a fake clock (advanced
+past each delay, so every attempt is counted) and checks that:
+
+- failures spread over many addresses still throttle the one username they
+  target, while its owner is only ever delayed up to ACCOUNT_MAX_DELAY;
+- one address guessing at one account is blocked far longer than that;
+- logging in clears the account's counts but not the address's.
+
+Exits non-zero if any check fails.
+
+Usage:
+    python check_login_throttle.py [addresses]
+"""
+
+import os
+import sys
+import tempfile
+
+# database.py opens budget.db in the working directory
+os.chdir(tempfile.mkdtemp(prefix='budget-check-'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import auth_pool  # noqa: E402
+from app import app  # noqa: E402
+from database import get_session, init_db, User  # noqa: E402
+
+USERNAME = 'owner'
+PASSWORD = 'correct-horse'
+OWNER_ADDRESS = '192.0.2.1'
+
+
+class FakeClock:
+    """Stands in for the time module in auth_pool."""
+    now = 1000.0
+
+    @classmethod
+    def monotonic(cls):
+        return cls.now
+
+
+def seed():
+    init_db()
+    db_session = get_session()
+    try:
+        user = User(username=USERNAME)
+        user.set_password(PASSWORD)
+        db_session.add(user)
+        db_session.commit()
+    finally:
+        db_session.close()
+
+
+def login(client, address, password='wrong'):
+    response = client.post('/api/auth/login', json={'username': USERNAME, 'password': password},
+                           environ_base={'REMOTE_ADDR': address})
+    return response.status_code, int(response.headers.get('Retry-After', 0))
+
+
+def wait(address):
+    """Seconds the login route would make this address wait."""
+    return auth_pool.login_throttle.retry_after(('user', USERNAME, address), ('account', USERNAME), ('ip', address))
+
+
+def spread_attack(client, addresses):
+    """Two failures from each address; returns the longest wait the owner was then given."""
+    longest = 0
+    for n in range(addresses):
+        for _ in range(2):
+            status, retry_after = login(client, f'10.{n // 250}.{n % 250}.1')
+            if status == 429:
+                FakeClock.now += retry_after
+        longest = max(longest, wait(OWNER_ADDRESS))
+    return longest
+
+
+def main():
+    addresses = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    auth_pool.HASH_WORKERS = 0  # verify inline; the pool isn't what's being checked
+    auth_pool.time = FakeClock
+    seed()
+    client = app.test_client()
+    failures = []
+
+    longest = spread_attack(client, addresses)
+    print(f"  {addresses} addresses, 2 failures each: owner waits at most {longest}s")
+    if not longest:
+        failures.append('failures spread over many addresses never throttled the username')
+    if longest > auth_pool.ACCOUNT_MAX_DELAY:
+        failures.append(f'the owner was locked out for {longest}s (ACCOUNT_MAX_DELAY is {auth_pool.ACCOUNT_MAX_DELAY}s)')
+
+    FakeClock.now += auth_pool.ACCOUNT_MAX_DELAY
+    status, _ = login(client, OWNER_ADDRESS, PASSWORD)
+    print(f"  owner logs in after waiting: {status}")
+    if status != 200:
+        failures.append(f'the owner could not log in after waiting ACCOUNT_MAX_DELAY (status {status})')
+    if auth_pool.login_throttle.retry_after(('account', USERNAME)):
+        failures.append("logging in didn't clear the username's count")
+
+    guesser = '198.51.100.7'
+    for _ in range(auth_pool.FREE_ATTEMPTS + 8):
+        FakeClock.now += wait(guesser)
+        login(client, guesser)
+    status, retry_after = login(client, guesser)
+    print(f"  one address, {auth_pool.FREE_ATTEMPTS + 8} failures: {status}, Retry-After {retry_after}s")
+    if status != 429 or retry_after <= auth_pool.ACCOUNT_MAX_DELAY:
+        failures.append(f'a single guesser was only delayed {retry_after}s')
+
+    FakeClock.now += retry_after
+    status, _ = login(client, guesser, PASSWORD)
+    if status != 200:
+        failures.append(f'the right password from the guessing address was refused (status {status})')
+    if auth_pool.login_throttle.retry_after(('user', USERNAME, guesser), ('account', USERNAME)):
+        failures.append("logging in didn't clear the account's counts")
+    if not auth_pool.login_throttle._entries.get(('ip', guesser)):
+        failures.append("logging in cleared the address's count")
+
+    for failure in failures:
+        print(f"✗ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✓ The login throttle holds")
+
+
+if __name__ == '__main__':
+    main()
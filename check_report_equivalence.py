@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Differential check of the report paths: the straightforward ORM
+implementations are the reference, and every alternative engine registered
+for a report in ENGINES must give identical output on randomized ledgers.
+
+Each case seeds one user in a throwaway database with random budgets (some
+with an older version still in effect last month), expenses around a target
+month (month edges, December/January rollover, spending landing exactly on
+80%/100% of a limit, categories with spending but no budget) and an optional
+tracking start date (mid-month, first of the month, a later or earlier
+month), then compares every engine with the reference under a clock frozen
+inside the target month. Timings are reported side by side. Exits non-zero
+on any mismatch, printing the case seed so it can be replayed. The cases are
+the same on every run (DEFAULT_SEED) unless --random-seed asks for new ones.
+
+Usage:
+    python check_report_equivalence.py [cases] [--seed N | --random-seed] [--report NAME]
+"""
+
+import calendar
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+# database.py opens budget.db in the working directory
+os.chdir(tempfile.mkdtemp(prefix='budget-check-'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import func  # noqa: E402
+
+import alerts  # noqa: E402
+import app as app_module  # noqa: E402
+import reports  # noqa: E402
+from app import app, CATEGORIES  # noqa: E402
+from database import (  # noqa: E402
+    get_session, init_db, category_id, category_name, from_cents, to_cents,
+    Budget, Expense, Saving, Settings, User
+)
+
+MAX_MISMATCHES_SHOWN = 5
+DEFAULT_SEED = 20260901  # fixed so CI runs are reproducible
+
+
+class FrozenDatetime(datetime):
+    """datetime whose now() is the case's clock (app.py reads the month from it)."""
+    frozen = None
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.frozen
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def last_day(month):
+    return month.replace(day=calendar.monthrange(month.year, month.month)[1])
+
+
+# --- Ledgers -----------------------------------------------------------------
+
+def random_case(rng):
+    """A target month, a clock inside it and a random ledger around it."""
+    year = rng.randint(2020, 2030)
+    month = date(year, rng.choice([1, 2, 12, 12, rng.randint(1, 12)]), 1)
+    today = month.replace(day=rng.choice([1, last_day(month).day, rng.randint(1, last_day(month).day)]))
+
+    categories = rng.sample(CATEGORIES, rng.randint(1, len(CATEGORIES)))
+    budgeted = {c: round(rng.choice([rng.uniform(20, 800), rng.randint(1, 40) * 25]), 2)
+                for c in rng.sample(categories, rng.randint(0, len(categories)))}
+    # Some limits changed this month, so last month still has an older version
+    older = {c: round(rng.uniform(20, 800), 2) for c in budgeted if rng.random() < 0.3}
+
+    tracking = rng.choice([
+        None,
+        month.replace(day=rng.randint(2, last_day(month).day)),  # mid-month
+        month,
+        add_months(month, 1).replace(day=rng.randint(1, 28)),  # starts after this month
+        add_months(month, -rng.randint(1, 3)).replace(day=rng.randint(1, 28)),
+    ])
+
+    edges = [month, last_day(month), month - timedelta(days=1), add_months(month, 1)]
+    expenses = []
+    for category in categories:
+        for _ in range(rng.randint(0, 12)):
+            day = rng.choice(edges) if rng.random() < 0.2 else month.replace(day=rng.randint(1, last_day(month).day))
+            expenses.append((day, category, round(rng.uniform(0.01, 150), 2)))
+        limit = budgeted.get(category)
+        if limit and rng.random() < 0.3:
+            # Land exactly on a threshold of the full limit
+            spent = sum(amount for day, c, amount in expenses if c == category and month_start(day) == month)
+            target = limit * rng.choice([0.8, 1.0])
+            if target > spent:
+                expenses.append((month, category, round(target - spent, 2)))
+    savings = [(month.replace(day=rng.randint(1, last_day(month).day)), round(rng.uniform(1, 300), 2))
+               for _ in range(rng.randint(0, 3))]
+    return {
+        'month': month, 'today': today, 'budgets': budgeted, 'older_budgets': older,
+        'tracking_start': tracking, 'expenses': expenses, 'savings': savings,
+    }
+
+
+def seed_case(db_session, username, case):
+    user = User(username=username, password_hash='x')
+    db_session.add(user)
+    db_session.commit()
+    month = case['month']
+    for category, limit in case['budgets'].items():
+        effective_from = month
+        if category in case['older_budgets']:
+            db_session.add(Budget(user_id=user.id, category_id=category_id(db_session, category),
+                                  monthly_limit=case['older_budgets'][category],
+                                  effective_from=add_months(month, -6), effective_to=month))
+        else:
+            effective_from = add_months(month, -6)
+        db_session.add(Budget(user_id=user.id, category_id=category_id(db_session, category),
+                              monthly_limit=limit, effective_from=effective_from))
+    for day, category, amount in case['expenses']:
+        db_session.add(Expense(user_id=user.id, date=day, category_id=category_id(db_session, category), amount=amount))
+    for day, amount in case['savings']:
+        db_session.add(Saving(user_id=user.id, date=day, amount=amount))
+    if case['tracking_start']:
+        db_session.add(Settings(user_id=user.id, key='tracking_start_date', value=case['tracking_start'].isoformat()))
+    db_session.commit()
+    return user.id
+
+
+# --- Reference implementations (ORM) ------------------------------------------
+
+def reference_prorated_budget(user_id, year, month, monthly_budget, db_session):
+    """get_prorated_budget() as first written, in float dollars."""
+    tracking_setting = db_session.query(Settings).filter_by(user_id=user_id, key='tracking_start_date').first()
+    if not tracking_setting or not tracking_setting.value:
+        return monthly_budget
+    tracking_start = datetime.strptime(tracking_setting.value, '%Y-%m-%d').date()
+    if tracking_start.year != year or tracking_start.month != month:
+        if tracking_start < datetime(year, month, 1).date():
+            return monthly_budget
+        return 0
+    days_in_month = calendar.monthrange(year, month)[1]
+    days_tracked = days_in_month - tracking_start.day + 1
+    return round((monthly_budget / days_in_month) * days_tracked, 2)
+
+
+def reference_category_breakdown(ctx, start, end):
+    """The grouped ORM query /api/visualizations/category-breakdown used before prefix sums."""
+    query = ctx['db_session'].query(Expense.category_id, func.sum(Expense.amount_cents).label('total')).filter(
+        Expense.user_id == ctx['user_id']
+    )
+    if start:
+        query = query.filter(Expense.date >= start)
+    if end:
+        query = query.filter(Expense.date <= end)
+    return [{'category': category_name(ctx['db_session'], e.category_id), 'total': from_cents(e.total)}
+            for e in query.group_by(Expense.category_id).all()]
+
+
+# --- Alternative engines -------------------------------------------------------
+
+def dashboard_from_month_totals(ctx):
+    """Dashboard from the trigger-kept month totals and prorated limits in cents."""
+    db_session, user_id = ctx['db_session'], ctx['user_id']
+    month = month_start(ctx['case']['today'])
+    limits = alerts.month_limits(db_session, user_id, month)
+    totals = alerts.month_totals(db_session, user_id, month)
+    categories = []
+    total_budget = total_spent = 0
+    for category, limit_cents in limits.items():
+        budget, spent = from_cents(limit_cents), from_cents(totals.get(category, 0))
+        percentage = (spent / budget * 100) if budget > 0 else 0
+        categories.append({
+            'category': category_name(db_session, category),
+            'budget': budget,
+            'spent': spent,
+            'remaining': max(0, budget - spent),
+            'percentage': round(percentage, 1),
+            'status': alerts.status_for(totals.get(category, 0), limit_cents) if limit_cents > 0 else 'safe'
+        })
+        total_budget += budget
+        total_spent += spent
+    for category, cents in totals.items():
+        if category not in limits:
+            categories.append({'category': category_name(db_session, category), 'budget': 0, 'spent': from_cents(cents),
+                               'remaining': 0, 'percentage': 0, 'status': 'no_budget'})
+            total_spent += from_cents(cents)
+    return {
+        'categories': categories,
+        'total_budget': round(total_budget, 2),
+        'total_spent': round(total_spent, 2),
+        'total_remaining': round(max(0, total_budget - total_spent), 2)
+    }
+
+
+def monthly_report_from_compare(ctx, month):
+    """Monthly report from the single-statement compare SQL and prorated limits in cents."""
+    db_session, user_id = ctx['db_session'], ctx['user_id']
+    label = month.strftime('%Y-%m')
+    [period] = reports.compare_periods(db_session, user_id, [(label, *reports.parse_period(label))])
+    limits = {category_name(db_session, c): from_cents(cents)
+              for c, cents in alerts.month_limits(db_session, user_id, month).items()}
+    spending = {c['category']: c for c in period['categories']}
+    saved = db_session.query(func.sum(Saving.amount_cents)).filter(
+        Saving.user_id == user_id, Saving.date >= month, Saving.date < add_months(month, 1)
+    ).scalar()
+
+    categories = []
+    total_budget = total_spent = 0
+    for category in set(limits) | set(spending):
+        budget = limits.get(category, 0)
+        spent = spending[category]['total'] if category in spending else 0
+        percentage = (spent / budget * 100) if budget > 0 else 0
+        status = alerts.REPORT_STATUSES[alerts.status_for(to_cents(spent), to_cents(budget))]
+        categories.append({
+            'category': category,
+            'budget': budget,
+            'spent': spent,
+            'difference': budget - spent,
+            'percentage': round(percentage, 1),
+            'transaction_count': spending[category]['count'] if category in spending else 0,
+            'status': status
+        })
+        total_budget += budget
+        total_spent += spent
+    return {
+        'month': label,
+        'total_budget': round(total_budget, 2),
+        'total_spent': round(total_spent, 2),
+        'total_saved': from_cents(saved) if saved else 0,
+        'total_difference': round(total_budget - total_spent, 2),
+        'categories': sorted(categories, key=lambda x: x['spent'], reverse=True)
+    }
+
+
+def prefix_sums_breakdown(ctx, start, end):
+    """The category-breakdown route as served (prefix sums)."""
+    query = {k: v.isoformat() for k, v in (('start_date', start), ('end_date', end)) if v}
+    response = ctx['client'].get('/api/visualizations/category-breakdown', query_string=query)
+    assert response.status_code == 200, response.json
+    return response.json
+
+
+def breakdown_ranges(case):
+    month = case['month']
+    return [(None, None), (month, last_day(month)), (month, None), (None, month - timedelta(days=1)),
+            (add_months(month, -1), month), (last_day(month), add_months(month, 1))]
+
+
+def prorated_inputs(case):
+    month = case['month']
+    limits = list(case['budgets'].values()) + [0, 0.01, 1234.56]
+    return [(m.year, m.month, limit) for m in (month, add_months(month, -1), add_months(month, 1)) for limit in limits]
+
+
+# --- Normalization -------------------------------------------------------------
+
+def normalize(value):
+    """JSON-comparable form: floats to 6 places (summation-order noise is far below a cent)."""
+    if isinstance(value, float):
+        return round(value, 6) + 0.0
+    if isinstance(value, dict):
+        return {k: normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    return value
+
+
+def by_category(rows, key=lambda c: c['category']):
+    # Rows with equal sort keys come out in set or query order, which carries no meaning
+    return sorted(rows, key=key)
+
+
+def normalize_dashboard(data):
+    return normalize({**data, 'categories': by_category(data['categories'])})
+
+
+def normalize_report(data):
+    return normalize({**data, 'categories': by_category(data['categories'], key=lambda c: (-c['spent'], c['category']))})
+
+
+# Each report: how to run the reference for a case (one result per input) and
+# the alternative engines that must match it
+ENGINES = {
+    'dashboard': {
+        'inputs': lambda case: [None],
+        'reference': lambda ctx, _: app_module.get_dashboard_data(ctx['user_id'], ctx['db_session']),
+        'alternatives': {'month totals': lambda ctx, _: dashboard_from_month_totals(ctx)},
+        'normalize': normalize_dashboard,
+    },
+    'monthly_report': {
+        'inputs': lambda case: [case['month'], add_months(case['month'], -1)],
+        'reference': lambda ctx, month: ctx['client'].get(f"/api/reports/monthly/{month.strftime('%Y-%m')}").json,
+        'alternatives': {'compare SQL': monthly_report_from_compare},
+        'normalize': normalize_report,
+    },
+    'category_breakdown': {
+        'inputs': breakdown_ranges,
+        'reference': lambda ctx, bounds: reference_category_breakdown(ctx, *bounds),
+        'alternatives': {'prefix sums': lambda ctx, bounds: prefix_sums_breakdown(ctx, *bounds)},
+        'normalize': normalize,
+    },
+    'get_prorated_budget': {
+        'inputs': prorated_inputs,
+        'reference': lambda ctx, args: reference_prorated_budget(ctx['user_id'], *args, ctx['db_session']),
+        'alternatives': {'cents': lambda ctx, args: app_module.get_prorated_budget(ctx['user_id'], *args, ctx['db_session'])},
+        'normalize': normalize,
+    },
+}
+
+
+def timed(timings, key, fn):
+    start = time.perf_counter()
+    result = fn()
+    timings.setdefault(key, []).append((time.perf_counter() - start) * 1000)
+    return result
+
+
+def median(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2] if samples else 0
+
+
+def parse_args(argv):
+    cases, seed, only = 200, DEFAULT_SEED, None
+    args = iter(argv)
+    for arg in args:
+        if arg == '--seed':
+            seed = int(next(args))
+        elif arg == '--random-seed':
+            seed = random.randrange(1 << 30)
+        elif arg == '--report':
+            only = next(args)
+        else:
+            cases = int(arg)
+    if only and only not in ENGINES:
+        sys.exit(f"Unknown report '{only}'; one of {', '.join(ENGINES)}")
+    return cases, seed, only
+
+
+def main():
+    cases, seed, only = parse_args(sys.argv[1:])
+    engines = {name: spec for name, spec in ENGINES.items() if not only or name == only}
+    init_db()
+    app_module.datetime = FrozenDatetime
+    client = app.test_client()
+
+    print(f"Checking {cases} random ledgers (--seed {seed})")
+    timings = {}
+    checked = {}
+    mismatches = []
+    for n in range(cases):
+        case_seed = seed + n
+        case = random_case(random.Random(case_seed))
+        FrozenDatetime.frozen = datetime.combine(case['today'], datetime.min.time()).replace(hour=12)
+        db_session = get_session()
+        try:
+            user_id = seed_case(db_session, f'case{case_seed}', case)
+            with client.session_transaction() as sess:
+                sess['user_id'] = user_id
+            ctx = {'db_session': db_session, 'client': client, 'user_id': user_id, 'case': case}
+            for name, spec in engines.items():
+                for arg in spec['inputs'](case):
+                    expected = spec['normalize'](timed(timings, (name, 'reference'), lambda: spec['reference'](ctx, arg)))
+                    for engine, fn in spec['alternatives'].items():
+                        actual = spec['normalize'](timed(timings, (name, engine), lambda: fn(ctx, arg)))
+                        checked[(name, engine)] = checked.get((name, engine), 0) + 1
+                        if actual != expected:
+                            mismatches.append((name, engine, case_seed, arg, expected, actual))
+        finally:
+            db_session.close()
+
+    print(f"  {'report':22} {'engine':14} {'checks':>7} {'diffs':>6} {'reference':>11} {'engine':>9}  (median)")
+    for name, spec in engines.items():
+        for engine in spec['alternatives']:
+            diffs = sum(1 for m in mismatches if m[:2] == (name, engine))
+            print(f"  {name:22} {engine:14} {checked.get((name, engine), 0):>7} {diffs:>6} "
+                  f"{median(timings.get((name, 'reference'), [])):9.2f}ms {median(timings.get((name, engine), [])):7.2f}ms")
+
+    for name, engine, case_seed, arg, expected, actual in mismatches[:MAX_MISMATCHES_SHOWN]:
+        print(f"\n✗ {name} / {engine}, case seed {case_seed}, input {arg}:")
+        print(f"  reference: {expected}")
+        print(f"  engine:    {actual}")
+    if mismatches:
+        print(f"\n{len(mismatches)} mismatch(es); replay one with --seed <case seed> 1")
+        sys.exit(1)
+    print("✓ Every engine matches the reference")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """Check and clean up users in the database."""
 
-from database import get_session, User
+from database import get_session, purge_users, User
 
 ALLOWED_USERS = ['cole', 'natalie']
 
@@ -19,8 +19,7 @@ try:
             print(f"  ⚠️  WARNING: User '{user.username}' is not in allowed list!")
             response = input(f"  Delete user '{user.username}'? (yes/no): ")
             if response.lower() == 'yes':
-                db_session.delete(user)
-                db_session.commit()
+                purge_users([user.id])
                 print(f"  ✓ Deleted user '{user.username}'")
             else:
                 print(f"  Skipped deletion")
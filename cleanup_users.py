@@ -6,7 +6,7 @@ Run this on Render shell to clean up any unauthorized accounts.
 WARNING: This will permanently delete users and all their data!
 """
 
-from database import get_session, User
+from database import get_session, purge_users, User
 
 ALLOWED_USERS = ['cole', 'natalie']
 
@@ -17,7 +17,7 @@ try:
     print(f"Found {len(all_users)} user(s) in database")
     print("=" * 60)
 
-    deleted_count = 0
+    deleted_ids = []
     kept_count = 0
 
     for user in all_users:
@@ -26,11 +26,12 @@ try:
             kept_count += 1
         else:
             print(f"✗ DELETING: {user.username} (ID: {user.id})")
-            db_session.delete(user)
-            deleted_count += 1
+            deleted_ids.append(user.id)
 
+    deleted_count = len(deleted_ids)
     if deleted_count > 0:
-        db_session.commit()
+        # Set-based deletes in batches; nothing is loaded into the session
+        purge_users(deleted_ids)
         print("=" * 60)
         print(f"Deleted {deleted_count} unauthorized user(s)")
         print(f"Kept {kept_count} authorized user(s)")
@@ -1,13 +1,14 @@
 #!/usr/bin/env python3
 """Create the two allowed user accounts."""
 
-from database import get_session, User
+from database import get_session, init_db, User
 
 ACCOUNTS = {
     'cole': 'yarmoshuk',
     'natalie': 'pinto'
 }
 
+init_db()
 db_session = get_session()
 try:
     for username, password in ACCOUNTS.items():
@@ -1,26 +1,135 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, Date, Boolean, DateTime, ForeignKey
+from sqlalchemy import create_engine, event, func, select, Index, UniqueConstraint, Column, Integer, SmallInteger, String, Float, Date, Boolean, DateTime, ForeignKey, Text, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
-from datetime import datetime
+from sqlalchemy.orm import sessionmaker, relationship, object_session
+from sqlalchemy.orm.attributes import set_committed_value
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
 from werkzeug.security import generate_password_hash, check_password_hash
+from concurrent.futures import ThreadPoolExecutor
+import bisect
+import hashlib
+import os
+import random
+import threading
+import time
 
 Base = declarative_base()
 
+# Predefined categories, seeded into the categories table
+CATEGORIES = [
+    'Groceries',
+    'Dining Out',
+    'Transportation',
+    'Gas',
+    'Entertainment',
+    'Utilities',
+    'Shopping',
+    'Healthcare',
+    'Housing',
+    'Insurance',
+    'Subscriptions',
+    'Other'
+]
+
+# Money is stored as integer cents so sums are exact; the API still speaks decimals
+def to_cents(amount):
+    return int((Decimal(str(amount)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+def from_cents(cents):
+    return cents / 100 if cents is not None else None
+
+def cents_property(column):
+    """Decimal-amount view of an integer-cents column, e.g. amount <-> amount_cents."""
+    def fget(self):
+        return from_cents(getattr(self, column))
+
+    def fset(self, amount):
+        setattr(self, column, to_cents(amount) if amount is not None else None)
+
+    return property(fget, fset)
+
+def category_property():
+    """Category name for a row's category_id."""
+    def fget(self):
+        return category_name(object_session(self), self.category_id)
+
+    return property(fget)
+
+class Category(Base):
+    """Dictionary of category names; rows reference them by small-int id."""
+    __tablename__ = 'categories'
+
+    # SQLite only autoincrements a column declared exactly INTEGER PRIMARY KEY
+    id = Column(SmallInteger().with_variant(Integer, 'sqlite'), primary_key=True)
+    name = Column(String(100), nullable=False, unique=True)
+
+@event.listens_for(Category.__table__, 'after_create')
+def seed_categories(target, connection, **kw):
+    connection.execute(target.insert(), [{'name': name} for name in CATEGORIES])
+
+# Category ids never change once assigned, so every process can cache the
+# mapping. Each shard has its own categories table, so the cache is per database.
+_category_cache = {}
+_category_lock = threading.Lock()
+
+def _categories(db_session, reload=False):
+    key = str(db_session.get_bind().url)
+    if reload or key not in _category_cache:
+        with _category_lock:
+            ids = {c.name: c.id for c in db_session.query(Category)}
+            _category_cache[key] = (ids, {id: name for name, id in ids.items()})
+    return _category_cache[key]
+
+def category_id(db_session, name):
+    """Id for a category name, adding the name to the dictionary if it is new."""
+    ids, _ = _categories(db_session)
+    if name not in ids:
+        ids, _ = _categories(db_session, reload=True)
+    if name not in ids:
+        # Not cached until committed; a rollback would otherwise leave a dangling id
+        category = Category(name=name)
+        db_session.add(category)
+        db_session.flush()
+        return category.id
+    return ids[name]
+
+def category_name(db_session, id):
+    _, names = _categories(db_session)
+    if id not in names:
+        _, names = _categories(db_session, reload=True)
+    return names[id]
+
+class Household(Base):
+    """Linked accounts that share a budget, viewed together (see households.py)."""
+    __tablename__ = 'households'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    members = relationship('User', back_populates='household')
+
 class User(Base):
     __tablename__ = 'users'
 
     id = Column(Integer, primary_key=True)
     username = Column(String(50), nullable=False, unique=True)
     password_hash = Column(String(200), nullable=False)
+    shard = Column(String(50))  # where the user's data lives; NULL means MAIN_SHARD
+    is_moving = Column(Boolean, default=False)  # set by rebalance_shards.py during a move
+    sync_epoch = Column(Integer, default=0)  # bumped by each move, which gives the user's rows new ids
+    household_id = Column(Integer, ForeignKey('households.id'))
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
+    household = relationship('Household', back_populates='members')
     expenses = relationship('Expense', back_populates='user', cascade='all, delete-orphan')
     budgets = relationship('Budget', back_populates='user', cascade='all, delete-orphan')
     settings = relationship('Settings', back_populates='user', cascade='all, delete-orphan')
     savings = relationship('Saving', back_populates='user', cascade='all, delete-orphan')
     savings_goals = relationship('SavingsGoal', back_populates='user', cascade='all, delete-orphan')
     recurring_expenses = relationship('RecurringExpense', back_populates='user', cascade='all, delete-orphan')
+    change_events = relationship('ChangeEvent', back_populates='user', cascade='all, delete-orphan')
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -30,28 +139,50 @@ class User(Base):
 
 class Expense(Base):
     __tablename__ = 'expenses'
+    __table_args__ = (
+        # Covers the per-user date-range sums behind the dashboard and reports
+        Index('ix_expenses_user_date', 'user_id', 'date', 'category_id', 'amount_cents'),
+        Index('ix_expenses_user_version', 'user_id', 'row_version'),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     date = Column(Date, nullable=False)
-    category = Column(String(100), nullable=False)
-    amount = Column(Float, nullable=False)
+    category_id = Column(SmallInteger, ForeignKey('categories.id'), nullable=False)
+    amount_cents = Column(Integer, nullable=False)
     description = Column(String(500))
     created_at = Column(DateTime, default=datetime.utcnow)
+    row_version = Column(Integer)  # set by the sync triggers
+
+    category = category_property()
+    amount = cents_property('amount_cents')
 
     # Relationship
     user = relationship('User', back_populates='expenses')
 
+# Budgets from before versioning are treated as in effect since this date
+BUDGET_EPOCH = date(1970, 1, 1)
+
 class Budget(Base):
+    """One version of a category's monthly limit, in effect from effective_from
+    (a month start) up to but excluding effective_to; NULL means still current."""
     __tablename__ = 'budgets'
+    __table_args__ = (
+        Index('ix_budgets_user_effective', 'user_id', 'effective_from', 'effective_to'),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
-    category = Column(String(100), nullable=False)
-    monthly_limit = Column(Float, nullable=False)
+    category_id = Column(SmallInteger, ForeignKey('categories.id'), nullable=False)
+    monthly_limit_cents = Column(Integer, nullable=False)
+    effective_from = Column(Date, nullable=False, default=BUDGET_EPOCH, server_default=str(BUDGET_EPOCH))
+    effective_to = Column(Date)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    category = category_property()
+    monthly_limit = cents_property('monthly_limit_cents')
+
     # Relationship
     user = relationship('User', back_populates='budgets')
 
@@ -70,40 +201,72 @@ class Settings(Base):
 
 class Saving(Base):
     __tablename__ = 'savings'
+    __table_args__ = (
+        Index('ix_savings_user_version', 'user_id', 'row_version'),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     date = Column(Date, nullable=False)
-    amount = Column(Float, nullable=False)
+    amount_cents = Column(Integer, nullable=False)
     description = Column(String(500))
     created_at = Column(DateTime, default=datetime.utcnow)
+    row_version = Column(Integer)  # set by the sync triggers
+
+    amount = cents_property('amount_cents')
 
     # Relationship
     user = relationship('User', back_populates='savings')
 
 class SavingsGoal(Base):
     __tablename__ = 'savings_goals'
+    __table_args__ = (
+        Index('ix_savings_goals_user_version', 'user_id', 'row_version'),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     name = Column(String(200), nullable=False)
-    target_amount = Column(Float, nullable=False)
-    current_amount = Column(Float, default=0)
+    target_amount_cents = Column(Integer, nullable=False)
+    current_amount_cents = Column(Integer, default=0)
     is_archived = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime)
+    row_version = Column(Integer)  # set by the sync triggers
 
-    # Relationship
+    target_amount = cents_property('target_amount_cents')
+    current_amount = cents_property('current_amount_cents')
+
+    # Relationships
     user = relationship('User', back_populates='savings_goals')
+    contributions = relationship('GoalContribution', back_populates='goal', cascade='all, delete-orphan')
+
+class GoalContribution(Base):
+    """Append-only ledger of deposits into a savings goal."""
+    __tablename__ = 'goal_contributions'
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    goal_id = Column(Integer, ForeignKey('savings_goals.id'), nullable=False, index=True)
+    amount_cents = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    amount = cents_property('amount_cents')
+
+    # Relationship
+    goal = relationship('SavingsGoal', back_populates='contributions')
 
 class RecurringExpense(Base):
     __tablename__ = 'recurring_expenses'
+    __table_args__ = (
+        Index('ix_recurring_expenses_user_version', 'user_id', 'row_version'),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     name = Column(String(200), nullable=False)
-    category = Column(String(100), nullable=False)
-    amount = Column(Float, nullable=False)
+    category_id = Column(SmallInteger, ForeignKey('categories.id'), nullable=False)
+    amount_cents = Column(Integer, nullable=False)
     frequency = Column(String(20), nullable=False)  # 'daily', 'weekly', 'monthly', 'yearly'
     start_date = Column(Date, nullable=False)
     end_date = Column(Date)  # Optional, for subscriptions that will end
@@ -112,14 +275,584 @@ class RecurringExpense(Base):
     last_generated = Column(Date)  # Track when we last created an expense from this
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    row_version = Column(Integer)  # set by the sync triggers
+
+    category = category_property()
+    amount = cents_property('amount_cents')
 
     # Relationship
     user = relationship('User', back_populates='recurring_expenses')
 
+class ChangeEvent(Base):
+    """Compact change notification for live updates (see events.py)."""
+    __tablename__ = 'change_events'
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    entity = Column(String(50), nullable=False)  # 'expense', 'saving', 'savings_goal', ...
+    entity_id = Column(Integer)
+    op = Column(String(20), nullable=False)  # 'create', 'update', 'delete', 'replace'
+    payload = Column(Text)  # JSON snapshot of the row, if any
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relationship
+    user = relationship('User', back_populates='change_events')
+
+class ExpenseIndexVersion(Base):
+    """Per-user counter bumped by triggers on every expense write (see range_totals.py)."""
+    __tablename__ = 'expense_index_versions'
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class ExpenseArchive(Base):
+    """One user's archived expenses for one year, stored column by column (see archive.py)."""
+    __tablename__ = 'expense_archives'
+    __table_args__ = (
+        UniqueConstraint('user_id', 'year', name='uq_expense_archives_user_year'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    year = Column(Integer, nullable=False)
+    first_date = Column(Date, nullable=False)
+    last_date = Column(Date, nullable=False)
+    row_count = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    columns = relationship('ExpenseArchiveColumn', back_populates='archive', cascade='all, delete-orphan')
+
+class ExpenseArchiveColumn(Base):
+    """One compressed column of an archive partition, so readers load only the columns they use."""
+    __tablename__ = 'expense_archive_columns'
+    __table_args__ = (
+        UniqueConstraint('archive_id', 'name', name='uq_expense_archive_columns_archive_name'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    archive_id = Column(Integer, ForeignKey('expense_archives.id'), nullable=False)
+    name = Column(String(50), nullable=False)
+    data = Column(LargeBinary, nullable=False)
+
+    archive = relationship('ExpenseArchive', back_populates='columns')
+
+class ExpenseRollup(Base):
+    """Monthly per-category totals of archived expenses."""
+    __tablename__ = 'expense_rollups'
+    __table_args__ = (
+        UniqueConstraint('user_id', 'month', 'category_id', name='uq_expense_rollups_user_month_category'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    month = Column(Date, nullable=False)  # first day of the month
+    category_id = Column(SmallInteger, ForeignKey('categories.id'), nullable=False)
+    total_cents = Column(Integer, nullable=False)
+    count = Column(Integer, nullable=False)
+
+class ExpenseMonthTotal(Base):
+    """Running per-category totals of each month's expenses, kept by triggers (see alerts.py)."""
+    __tablename__ = 'expense_month_totals'
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    month = Column(Date, primary_key=True)  # first day of the month
+    category_id = Column(SmallInteger, ForeignKey('categories.id'), primary_key=True)
+    total_cents = Column(Integer, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+class BudgetAlert(Base):
+    """A category's spending reaching a share of its limit, recorded once per month (see alerts.py)."""
+    __tablename__ = 'budget_alerts'
+    __table_args__ = (
+        UniqueConstraint('user_id', 'month', 'category_id', 'threshold', name='uq_budget_alerts_user_month_category_threshold'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    month = Column(Date, nullable=False)  # first day of the month
+    category_id = Column(SmallInteger, ForeignKey('categories.id'), nullable=False)
+    threshold = Column(Integer, nullable=False)  # percent of the (prorated) limit
+    spent_cents = Column(Integer, nullable=False)
+    limit_cents = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    category = category_property()
+
+class SyncClock(Base):
+    """Single row holding the shard's latest sync version (see SYNC_TABLES)."""
+    __tablename__ = 'sync_clock'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    pruned_through = Column(Integer, nullable=False, default=0)  # tombstones up to here are gone
+
+class SyncTombstone(Base):
+    """Record of a deleted synced row, so clients can drop their copy."""
+    __tablename__ = 'sync_tombstones'
+    __table_args__ = (
+        Index('ix_sync_tombstones_user_version', 'user_id', 'row_version'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    entity = Column(String(50), nullable=False)  # table name
+    entity_id = Column(Integer, nullable=False)
+    row_version = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ReplicationHeartbeat(Base):
+    """Single row rewritten on a primary by replicate.py; its age on a replica is the replica's lag."""
+    __tablename__ = 'replication_heartbeat'
+
+    id = Column(Integer, primary_key=True)
+    written_at = Column(Float, nullable=False)  # time.time() when written on the primary
+
+class Job(Base):
+    """A queued background job (see jobs.py); lives in the directory database."""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        Index('ix_jobs_status_run_after', 'status', 'run_after'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'))  # owner; NULL for admin jobs
+    kind = Column(String(50), nullable=False)
+    params = Column(Text)  # JSON
+    status = Column(String(20), nullable=False, default='queued')  # 'queued', 'running', 'succeeded', 'failed'
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)
+    progress = Column(Float, nullable=False, default=0)  # 0 to 1
+    message = Column(String(200))
+    result = Column(Text)  # JSON
+    error = Column(Text)
+    locked_by = Column(String(100))  # worker running it
+    heartbeat_at = Column(DateTime)  # refreshed while running; stale means the worker died
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
+
+# Full-text search (SQLite FTS5) over expense descriptions and recurring names.
+# External-content indexes read from views that add an 'owner' token per user,
+# so a search can be scoped to one user inside the index itself. Triggers keep
+# them in sync with every write, including bulk and raw-SQL ones.
+SEARCH_DDL = [
+    """CREATE VIEW IF NOT EXISTS expense_search_source AS
+       SELECT id, description, 'u' || user_id AS owner FROM expenses""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS expense_fts USING fts5(
+       description, owner, content='expense_search_source', content_rowid='id',
+       tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS expenses_fts_insert AFTER INSERT ON expenses BEGIN
+       INSERT INTO expense_fts(rowid, description, owner) VALUES (new.id, new.description, 'u' || new.user_id);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS expenses_fts_delete AFTER DELETE ON expenses BEGIN
+       INSERT INTO expense_fts(expense_fts, rowid, description, owner) VALUES ('delete', old.id, old.description, 'u' || old.user_id);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS expenses_fts_update AFTER UPDATE OF description, user_id ON expenses BEGIN
+       INSERT INTO expense_fts(expense_fts, rowid, description, owner) VALUES ('delete', old.id, old.description, 'u' || old.user_id);
+       INSERT INTO expense_fts(rowid, description, owner) VALUES (new.id, new.description, 'u' || new.user_id);
+       END""",
+    """CREATE VIEW IF NOT EXISTS recurring_search_source AS
+       SELECT id, name, 'u' || user_id AS owner FROM recurring_expenses""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS recurring_fts USING fts5(
+       name, owner, content='recurring_search_source', content_rowid='id',
+       tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS recurring_fts_insert AFTER INSERT ON recurring_expenses BEGIN
+       INSERT INTO recurring_fts(rowid, name, owner) VALUES (new.id, new.name, 'u' || new.user_id);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS recurring_fts_delete AFTER DELETE ON recurring_expenses BEGIN
+       INSERT INTO recurring_fts(recurring_fts, rowid, name, owner) VALUES ('delete', old.id, old.name, 'u' || old.user_id);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS recurring_fts_update AFTER UPDATE OF name, user_id ON recurring_expenses BEGIN
+       INSERT INTO recurring_fts(recurring_fts, rowid, name, owner) VALUES ('delete', old.id, old.name, 'u' || old.user_id);
+       INSERT INTO recurring_fts(rowid, name, owner) VALUES (new.id, new.name, 'u' || new.user_id);
+       END""",
+]
+
+@event.listens_for(Base.metadata, 'after_create')
+def create_search_index(target, connection, **kw):
+    if connection.dialect.name != 'sqlite':
+        return
+    existing = connection.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE name IN ('expense_fts', 'recurring_fts')"
+    ).scalars().all()
+    for statement in SEARCH_DDL:
+        connection.exec_driver_sql(statement)
+    # Backfill indexes created on a database that already has rows
+    for table in ('expense_fts', 'recurring_fts'):
+        if table not in existing:
+            connection.exec_driver_sql(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+
+# Triggers that invalidate cached range-total indexes whenever a user's expenses
+# change, however they are written. Deletes only bump an existing counter so
+# purging a user leaves nothing behind whichever table goes first.
+EXPENSE_VERSION_DDL = [
+    """CREATE TRIGGER IF NOT EXISTS expenses_version_insert AFTER INSERT ON expenses BEGIN
+       INSERT INTO expense_index_versions (user_id, version) VALUES (new.user_id, 1)
+       ON CONFLICT (user_id) DO UPDATE SET version = version + 1;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS expenses_version_delete AFTER DELETE ON expenses BEGIN
+       UPDATE expense_index_versions SET version = version + 1 WHERE user_id = old.user_id;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS expenses_version_update AFTER UPDATE OF user_id, date, category_id, amount_cents ON expenses BEGIN
+       UPDATE expense_index_versions SET version = version + 1 WHERE user_id = old.user_id;
+       INSERT INTO expense_index_versions (user_id, version) VALUES (new.user_id, 1)
+       ON CONFLICT (user_id) DO UPDATE SET version = version + 1;
+       END""",
+]
+
+@event.listens_for(Base.metadata, 'after_create')
+def create_expense_version_triggers(target, connection, **kw):
+    if connection.dialect.name != 'sqlite':
+        return
+    for statement in EXPENSE_VERSION_DDL:
+        connection.exec_driver_sql(statement)
+    # Users with expenses from before the triggers existed
+    connection.exec_driver_sql(
+        "INSERT OR IGNORE INTO expense_index_versions (user_id, version) SELECT DISTINCT user_id, 1 FROM expenses"
+    )
+
+# Triggers that keep expense_month_totals current on every expense write, so a
+# category's spending for a month is one primary-key lookup. Rows whose count
+# drops to zero are removed.
+EXPENSE_TOTALS_DDL = [
+    """CREATE TRIGGER IF NOT EXISTS expenses_totals_insert AFTER INSERT ON expenses BEGIN
+       INSERT INTO expense_month_totals (user_id, month, category_id, total_cents, count)
+       VALUES (new.user_id, date(new.date, 'start of month'), new.category_id, new.amount_cents, 1)
+       ON CONFLICT (user_id, month, category_id) DO UPDATE SET total_cents = total_cents + excluded.total_cents, count = count + 1;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS expenses_totals_delete AFTER DELETE ON expenses BEGIN
+       UPDATE expense_month_totals SET total_cents = total_cents - old.amount_cents, count = count - 1
+       WHERE user_id = old.user_id AND month = date(old.date, 'start of month') AND category_id = old.category_id;
+       DELETE FROM expense_month_totals
+       WHERE user_id = old.user_id AND month = date(old.date, 'start of month') AND category_id = old.category_id AND count <= 0;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS expenses_totals_update AFTER UPDATE OF user_id, date, category_id, amount_cents ON expenses BEGIN
+       UPDATE expense_month_totals SET total_cents = total_cents - old.amount_cents, count = count - 1
+       WHERE user_id = old.user_id AND month = date(old.date, 'start of month') AND category_id = old.category_id;
+       DELETE FROM expense_month_totals
+       WHERE user_id = old.user_id AND month = date(old.date, 'start of month') AND category_id = old.category_id AND count <= 0;
+       INSERT INTO expense_month_totals (user_id, month, category_id, total_cents, count)
+       VALUES (new.user_id, date(new.date, 'start of month'), new.category_id, new.amount_cents, 1)
+       ON CONFLICT (user_id, month, category_id) DO UPDATE SET total_cents = total_cents + excluded.total_cents, count = count + 1;
+       END""",
+]
+
+@event.listens_for(Base.metadata, 'after_create')
+def create_expense_totals_triggers(target, connection, **kw):
+    if connection.dialect.name != 'sqlite':
+        return
+    existing = connection.exec_driver_sql(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name = 'expenses_totals_insert'"
+    ).scalar()
+    for statement in EXPENSE_TOTALS_DDL:
+        connection.exec_driver_sql(statement)
+    # Expenses from before the triggers existed
+    if not existing:
+        connection.exec_driver_sql(
+            "INSERT OR REPLACE INTO expense_month_totals (user_id, month, category_id, total_cents, count) "
+            "SELECT user_id, date(date, 'start of month'), category_id, SUM(amount_cents), COUNT(*) "
+            "FROM expenses GROUP BY user_id, date(date, 'start of month'), category_id"
+        )
+
+# Change journal for /api/sync. Every write to a synced table takes the next
+# version from sync_clock: inserts and updates stamp it on the row, deletes
+# leave a tombstone carrying it. SQLite runs one writer at a time, so versions
+# become visible in order and a client that has seen version N has seen
+# everything before it. As with the other triggers, raw-SQL writes count too.
+SYNC_TABLES = ['expenses', 'savings', 'savings_goals', 'recurring_expenses']
+
+def _sync_ddl(table):
+    tick = "UPDATE sync_clock SET version = version + 1 WHERE id = 1;"
+    now = "(SELECT version FROM sync_clock WHERE id = 1)"
+    # Stamping row_version must not count as an update, so list the other columns
+    columns = ', '.join(c.name for c in table.c if c.name not in ('id', 'row_version'))
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS {table.name}_sync_insert AFTER INSERT ON {table.name} BEGIN
+           {tick}
+           UPDATE {table.name} SET row_version = {now} WHERE id = new.id;
+           END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {table.name}_sync_update AFTER UPDATE OF {columns} ON {table.name} BEGIN
+           {tick}
+           UPDATE {table.name} SET row_version = {now} WHERE id = new.id;
+           END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {table.name}_sync_delete AFTER DELETE ON {table.name} BEGIN
+           {tick}
+           INSERT INTO sync_tombstones (user_id, entity, entity_id, row_version, created_at)
+           VALUES (old.user_id, '{table.name}', old.id, {now}, CURRENT_TIMESTAMP);
+           END""",
+    ]
+
+@event.listens_for(Base.metadata, 'after_create')
+def create_sync_triggers(target, connection, **kw):
+    if connection.dialect.name != 'sqlite':
+        return
+    connection.exec_driver_sql("INSERT OR IGNORE INTO sync_clock (id, version, pruned_through) VALUES (1, 0, 0)")
+    for name in SYNC_TABLES:
+        # Number rows from before the journal existed; versions must be unique for paging
+        connection.exec_driver_sql(
+            f"UPDATE {name} SET row_version = (SELECT version FROM sync_clock WHERE id = 1) + id WHERE row_version IS NULL"
+        )
+        connection.exec_driver_sql(
+            f"UPDATE sync_clock SET version = MAX(version, (SELECT COALESCE(MAX(row_version), 0) FROM {name})) WHERE id = 1"
+        )
+        for statement in _sync_ddl(Base.metadata.tables[name]):
+            connection.exec_driver_sql(statement)
+
 # Database initialization
-engine = create_engine('sqlite:///budget.db')
-Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
+# Engines are created lazily on first use so importing this module (admin
+# scripts, the gunicorn master with --preload) stays cheap and nothing holds
+# connections across fork. Schema setup is a separate one-shot step: init_db().
+DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///budget.db')
+
+# Sharding
+# DATABASE_URL is the directory: it holds the users table and is also the
+# 'main' shard. DATABASE_SHARDS adds more, e.g. "s1=sqlite:///budget-s1.db,s2=...".
+# All of one user's rows live on a single shard, recorded in users.shard when
+# the account is created. New users are placed by a consistent-hash ring over
+# the shard names, so adding a shard only changes where a small share of users
+# belong; rebalance_shards.py then moves exactly those users.
+MAIN_SHARD = 'main'
+PLACEMENT_TTL = 1.0  # seconds a process may route with a cached users.shard
+
+def _parse_shards(value):
+    shards = {}
+    for entry in filter(None, (e.strip() for e in value.split(','))):
+        name, sep, url = entry.partition('=')
+        if not sep or not name.strip() or not url.strip():
+            raise ValueError(f"DATABASE_SHARDS entries must look like name=url, got {entry!r}")
+        shards[name.strip()] = url.strip()
+    return shards
+
+SHARD_URLS = {MAIN_SHARD: DATABASE_URL, **_parse_shards(os.environ.get('DATABASE_SHARDS', ''))}
+
+# Read replicas
+# DATABASE_REPLICAS lists read-only copies of shards as shard=url entries, and a
+# shard may have several: "main=sqlite:///budget-replica.db,main=postgresql://...".
+# Read-only routes use a replica once it has caught up with the user's last
+# write; everything else goes to the shard's primary. replicate.py refreshes
+# SQLite replicas as snapshots and writes the heartbeat that lag is measured by.
+MAX_REPLICA_LAG = float(os.environ.get('MAX_REPLICA_LAG', 30))  # seconds before a replica is skipped
+HEARTBEAT_TTL = 0.5  # seconds a process reuses a replica's heartbeat reading
+
+def _parse_replicas(value):
+    replicas = {}
+    for entry in filter(None, (e.strip() for e in value.split(','))):
+        shard, sep, url = entry.partition('=')
+        if not sep or shard.strip() not in SHARD_URLS or not url.strip():
+            raise ValueError(f"DATABASE_REPLICAS entries must look like shard=url for a configured shard, got {entry!r}")
+        replicas.setdefault(shard.strip(), []).append(url.strip())
+    return replicas
+
+REPLICA_URLS = _parse_replicas(os.environ.get('DATABASE_REPLICAS', ''))
+
+def _hash(key):
+    return int.from_bytes(hashlib.md5(str(key).encode()).digest()[:8], 'big')
+
+class HashRing:
+    """Consistent-hash ring over shard names, with virtual nodes to even out load."""
+
+    def __init__(self, nodes, replicas=100):
+        points = sorted((_hash(f'{node}#{i}'), node) for node in nodes for i in range(replicas))
+        self._keys = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key):
+        return self._nodes[bisect.bisect(self._keys, _hash(key)) % len(self._keys)]
+
+shard_ring = HashRing(SHARD_URLS)
+
+_engines = {}
+_engine_lock = threading.Lock()
+Session = sessionmaker()
+
+def _engine_for(url):
+    engine = _engines.get(url)
+    if engine is None:
+        with _engine_lock:
+            engine = _engines.get(url)
+            if engine is None:
+                engine = _engines[url] = create_engine(url)
+    return engine
+
+def get_engine(shard=MAIN_SHARD):
+    if shard not in SHARD_URLS:
+        raise KeyError(f"Unknown shard {shard!r}; configured shards: {', '.join(SHARD_URLS)}")
+    return _engine_for(SHARD_URLS[shard])
+
+def init_db():
+    """Create any missing tables on every shard. Run once at deploy/startup, not per worker."""
+    from migrations import migrate
+    for shard in SHARD_URLS:
+        migrate(get_engine(shard))
+        Base.metadata.create_all(get_engine(shard))
+
+def dispose_engine(close=True):
+    """Drop pooled connections; call with close=False in a freshly forked worker."""
+    for engine in list(_engines.values()):
+        engine.dispose(close=close)
+
+def get_session(shard=MAIN_SHARD):
+    """Session on one shard; the default is the directory (users live there)."""
+    return Session(bind=get_engine(shard))
+
+@event.listens_for(User, 'after_insert')
+def place_new_user(mapper, connection, user):
+    if user.shard is None:
+        shard = shard_ring.node_for(user.id)
+        connection.execute(User.__table__.update().where(User.__table__.c.id == user.id).values(shard=shard))
+        set_committed_value(user, 'shard', shard)
+
+_placements = {}
+
+def user_placement(user_id):
+    """(shard, is_moving, sync_epoch) for a user, from the directory, cached for PLACEMENT_TTL."""
+    cached = _placements.get(user_id)
+    if cached and cached[3] > time.monotonic():
+        return cached[:3]
+
+    db_session = get_session()
+    try:
+        row = db_session.query(User.shard, User.is_moving, User.sync_epoch).filter_by(id=user_id).first()
+    finally:
+        db_session.close()
+    placement = (row.shard or MAIN_SHARD, bool(row.is_moving), row.sync_epoch or 0) if row else (MAIN_SHARD, False, 0)
+    _placements[user_id] = placement + (time.monotonic() + PLACEMENT_TTL,)
+    return placement
+
+def shard_for(user_id):
+    return user_placement(user_id)[0]
+
+_heartbeats = {}
+
+def replica_heartbeat(url):
+    """Primary clock time of the newest heartbeat a replica has; None if it can't be read."""
+    cached = _heartbeats.get(url)
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+
+    try:
+        with _engine_for(url).connect() as connection:
+            written_at = connection.execute(select(ReplicationHeartbeat.written_at)).scalar()
+    except Exception:
+        written_at = None
+    _heartbeats[url] = (written_at, time.monotonic() + HEARTBEAT_TTL)
+    return written_at
+
+def replica_lag(url):
+    """Seconds the replica is behind its primary, or None if unknown."""
+    written_at = replica_heartbeat(url)
+    return max(0.0, time.time() - written_at) if written_at is not None else None
+
+def get_user_session(user_id, read_only=False, fresh_after=None):
+    """Session on the shard that holds this user's data.
+
+    With read_only=True the session may be bound to one of the shard's replicas,
+    but only one whose heartbeat is newer than fresh_after (the time of the
+    user's last write), so users always read their own writes.
+    """
+    shard = shard_for(user_id)
+    if read_only and shard in REPLICA_URLS:
+        for url in random.sample(REPLICA_URLS[shard], len(REPLICA_URLS[shard])):
+            written_at = replica_heartbeat(url)
+            if (written_at is not None
+                    and written_at >= (fresh_after or 0)
+                    and time.time() - written_at <= MAX_REPLICA_LAG):
+                return Session(bind=_engine_for(url))
+    return get_session(shard)
+
+def fan_out(query, shards=None):
+    """Run query(db_session) on every shard in parallel; returns {shard: result}."""
+    shards = list(shards or SHARD_URLS)
+
+    def run(shard):
+        db_session = get_session(shard)
+        try:
+            return query(db_session)
+        finally:
+            db_session.close()
+
+    with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+        return dict(zip(shards, pool.map(run, shards)))
+
+def user_tables():
+    """Tables holding per-user rows, parents before children."""
+    return [t for t in Base.metadata.sorted_tables if 'user_id' in t.c and t.name != 'users']
+
+PURGE_BATCH_SIZE = 5000  # rows deleted per transaction
+# Filled in by triggers as other tables' rows are deleted, so purged after them
+TRIGGER_WRITTEN_TABLES = ['sync_tombstones', 'expense_index_versions', 'expense_month_totals']
+
+def _purge_rows(db_session, user_ids, batch_size=PURGE_BATCH_SIZE, progress=None):
+    """Delete the users' rows from every per-user table with set-based DELETEs.
+
+    Children go before parents. Each batch is one DELETE over the next id range
+    and is committed on its own, so no rows are loaded and locks are held only briefly.
+    Returns {table name: rows deleted}.
+    """
+    deleted = {}
+    tables = sorted(reversed(user_tables()), key=lambda t: TRIGGER_WRITTEN_TABLES.index(t.name) + 1
+                    if t.name in TRIGGER_WRITTEN_TABLES else 0)
+    for table in tables:
+        owned = table.c.user_id.in_(user_ids)
+        count = 0
+        if 'id' not in table.c:
+            count = db_session.execute(table.delete().where(owned)).rowcount
+            db_session.commit()
+        else:
+            after = 0
+            while True:
+                # Walk the primary key so each batch scans only its own range
+                batch = select(table.c.id).where(owned, table.c.id > after).order_by(table.c.id).limit(batch_size).subquery()
+                upto = db_session.execute(select(func.max(batch.c.id))).scalar()
+                if upto is None:
+                    break
+                count += db_session.execute(table.delete().where(owned, table.c.id > after, table.c.id <= upto)).rowcount
+                db_session.commit()
+                after = upto
+                if progress:
+                    progress(table.name, count)
+        deleted[table.name] = count
+    return deleted
+
+def purge_user_data(user_id, shard=None):
+    """Delete a user's rows from their shard (or the given one); the caller deletes the users row."""
+    db_session = get_session(shard) if shard else get_user_session(user_id)
+    try:
+        return _purge_rows(db_session, [user_id])
+    finally:
+        db_session.close()
+
+def purge_users(user_ids, batch_size=PURGE_BATCH_SIZE, progress=None):
+    """Delete users and all their data, in batches, without loading any of it.
+
+    progress(table, rows_deleted_so_far) is called after each batch. Returns
+    {table name: rows deleted} across all shards, including 'users'.
+    """
+    user_ids = list(user_ids)
+    totals = {}
+    for start in range(0, len(user_ids), 500):
+        chunk = user_ids[start:start + 500]
+        by_shard = {}
+        for user_id in chunk:
+            by_shard.setdefault(shard_for(user_id), []).append(user_id)
+        for shard, shard_user_ids in by_shard.items():
+            db_session = get_session(shard)
+            try:
+                for name, count in _purge_rows(db_session, shard_user_ids, batch_size, progress).items():
+                    totals[name] = totals.get(name, 0) + count
+            finally:
+                db_session.close()
 
-def get_session():
-    return Session()
+        # Then the directory: queued jobs and the users rows themselves
+        db_session = get_session()
+        try:
+            db_session.execute(Job.__table__.delete().where(Job.user_id.in_(chunk)))
+            count = db_session.execute(User.__table__.delete().where(User.id.in_(chunk))).rowcount
+            db_session.commit()
+            totals['users'] = totals.get('users', 0) + count
+        finally:
+            db_session.close()
+        for user_id in chunk:
+            _placements.pop(user_id, None)
+    return totals
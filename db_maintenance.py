@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Storage statistics and routine maintenance for the SQLite shards.
+
+stats shows, per shard, the file size, free pages, and each table's rows and
+bytes (from the dbstat virtual table), split into table and index pages.
+users estimates each user's share of that storage. indexes runs EXPLAIN QUERY
+PLAN on the app's hot queries and shows which index each uses, plus any index
+none of them use.
+
+maintain prunes sync tombstones older than TOMBSTONE_RETENTION_DAYS and runs
+PRAGMA optimize (or a full ANALYZE) and an incremental VACUUM. It times the
+hot queries and the file stats before and after. It only runs while a shard
+is quiet (no writes in the last few minutes) unless --force is given.
+schedule repeats it in a loop, running ANALYZE once a day. Incremental
+VACUUM needs auto_vacuum=INCREMENTAL, which enable-incremental-vacuum
+switches on once with a full VACUUM (best run during downtime).
+
+Usage:
+    python db_maintenance.py stats [shard]
+    python db_maintenance.py users [count]               # heaviest users (default 20)
+    python db_maintenance.py indexes [shard]
+    python db_maintenance.py maintain [--analyze] [--force] [--pages N]
+    python db_maintenance.py schedule [interval_minutes]  # default 15
+    python db_maintenance.py enable-incremental-vacuum [shard]
+"""
+
+import os
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from database import SHARD_URLS, get_engine, get_session, user_tables, User
+
+TOMBSTONE_RETENTION_DAYS = int(os.environ.get('TOMBSTONE_RETENTION_DAYS', 90))
+QUIET_WINDOW = timedelta(minutes=5)  # no change events for this long means the shard is quiet
+VACUUM_PAGES = 2000  # pages an incremental vacuum frees per run (8MB at 4KB pages)
+ANALYZE_INTERVAL = 24 * 3600
+TIMING_ROUNDS = 5
+
+# The app's hot queries, for index checks and before/after timings
+HOT_QUERIES = [
+    ('expense list page', "SELECT * FROM expenses WHERE user_id = :user_id ORDER BY date DESC, id DESC LIMIT 50"),
+    ('month totals by category', "SELECT category_id, SUM(amount_cents), COUNT(*) FROM expenses "
+                                 "WHERE user_id = :user_id AND date >= :month_start AND date < :month_end GROUP BY category_id"),
+    ('range totals index build', "SELECT date, category_id, SUM(amount_cents) FROM expenses "
+                                 "WHERE user_id = :user_id GROUP BY date, category_id ORDER BY date"),
+    ('sync page (expenses)', "SELECT * FROM expenses WHERE user_id = :user_id AND row_version > 0 ORDER BY row_version LIMIT 2001"),
+    ('sync page (tombstones)', "SELECT * FROM sync_tombstones WHERE user_id = :user_id AND row_version > 0 ORDER BY row_version LIMIT 2001"),
+    ('current budgets', "SELECT * FROM budgets WHERE user_id = :user_id AND effective_to IS NULL"),
+    ('savings list', "SELECT * FROM savings WHERE user_id = :user_id ORDER BY date DESC"),
+    ('goal contributions', "SELECT * FROM goal_contributions WHERE goal_id = 1 ORDER BY created_at DESC"),
+    ('job claim', "SELECT id FROM jobs WHERE status = 'queued' AND run_after <= :now ORDER BY run_after, id LIMIT 1"),
+]
+
+def sqlite_shards(only=None):
+    shards = [only] if only else list(SHARD_URLS)
+    result = []
+    for shard in shards:
+        engine = get_engine(shard)
+        if engine.dialect.name == 'sqlite':
+            result.append((shard, engine))
+        else:
+            print(f"[{shard}] not SQLite; skipped")
+    return result
+
+def human(size):
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if abs(size) < 1024 or unit == 'GB':
+            return f"{size:.0f}{unit}" if unit == 'B' else f"{size:.1f}{unit}"
+        size /= 1024
+
+def file_stats(connection):
+    page_size = connection.execute(text("PRAGMA page_size")).scalar()
+    pages = connection.execute(text("PRAGMA page_count")).scalar()
+    free = connection.execute(text("PRAGMA freelist_count")).scalar()
+    auto_vacuum = {0: 'none', 1: 'full', 2: 'incremental'}[connection.execute(text("PRAGMA auto_vacuum")).scalar()]
+    return {'bytes': page_size * pages, 'pages': pages, 'free_pages': free, 'page_size': page_size, 'auto_vacuum': auto_vacuum}
+
+def table_sizes(connection):
+    """{table: {'rows', 'table_bytes', 'index_bytes', 'unused_bytes'}}, indexes counted with their table."""
+    owner = dict(connection.execute(text("SELECT name, tbl_name FROM sqlite_schema WHERE type IN ('table', 'index')")).all())
+    sizes = {}
+    for name, pgsize, unused in connection.execute(text("SELECT name, SUM(pgsize), SUM(unused) FROM dbstat GROUP BY name")):
+        table = owner.get(name, name)
+        entry = sizes.setdefault(table, {'rows': 0, 'table_bytes': 0, 'index_bytes': 0, 'unused_bytes': 0})
+        entry['table_bytes' if name == table else 'index_bytes'] += pgsize
+        entry['unused_bytes'] += unused
+    for table in sizes:
+        if table in owner.values() and not table.startswith('sqlite_'):
+            sizes[table]['rows'] = connection.execute(text(f'SELECT COUNT(*) FROM "{table}"')).scalar()
+    return sizes
+
+def show_stats(only=None):
+    for shard, engine in sqlite_shards(only):
+        with engine.connect() as connection:
+            stats = file_stats(connection)
+            print(f"[{shard}] {human(stats['bytes'])} in {stats['pages']} pages of {stats['page_size']}B; "
+                  f"{stats['free_pages']} free ({stats['free_pages'] / max(1, stats['pages']):.1%}); "
+                  f"auto_vacuum={stats['auto_vacuum']}")
+            sizes = table_sizes(connection)
+        print(f"  {'table':32} {'rows':>10} {'table':>10} {'indexes':>10} {'slack':>10}")
+        for table, entry in sorted(sizes.items(), key=lambda item: -(item[1]['table_bytes'] + item[1]['index_bytes'])):
+            print(f"  {table:32} {entry['rows']:>10} {human(entry['table_bytes']):>10} "
+                  f"{human(entry['index_bytes']):>10} {human(entry['unused_bytes']):>10}")
+
+def show_users(count=20):
+    """Each user's estimated bytes: their share of rows times each table's bytes per row."""
+    usage = {}
+    for shard, engine in sqlite_shards():
+        with engine.connect() as connection:
+            sizes = table_sizes(connection)
+            for table in user_tables():
+                entry = sizes.get(table.name)
+                if not entry or not entry['rows']:
+                    continue
+                per_row = (entry['table_bytes'] + entry['index_bytes']) / entry['rows']
+                for user_id, rows in connection.execute(text(f"SELECT user_id, COUNT(*) FROM {table.name} GROUP BY user_id")):
+                    user = usage.setdefault(user_id, {'shard': shard, 'rows': 0, 'bytes': 0, 'tables': {}})
+                    user['rows'] += rows
+                    user['bytes'] += rows * per_row
+                    user['tables'][table.name] = rows
+
+    db_session = get_session()
+    try:
+        names = dict(db_session.query(User.id, User.username))
+    finally:
+        db_session.close()
+
+    print(f"{'user':24} {'shard':8} {'rows':>10} {'~bytes':>10}  largest tables")
+    for user_id, user in sorted(usage.items(), key=lambda item: -item[1]['bytes'])[:count]:
+        largest = ', '.join(f"{name} {rows}" for name, rows in sorted(user['tables'].items(), key=lambda t: -t[1])[:3])
+        print(f"{names.get(user_id, f'#{user_id} (deleted)'):24} {user['shard']:8} {user['rows']:>10} {human(user['bytes']):>10}  {largest}")
+
+def query_params(connection):
+    """Parameters for HOT_QUERIES, using the user with the most expenses."""
+    user_id = connection.execute(text(
+        "SELECT user_id FROM expenses GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1"
+    )).scalar() or 0
+    month_start = datetime.utcnow().date().replace(day=1)
+    return {'user_id': user_id, 'month_start': str(month_start),
+            'month_end': str((month_start + timedelta(days=32)).replace(day=1)), 'now': datetime.utcnow()}
+
+def query_indexes(connection):
+    """{label: [index names the plan uses, or 'SCAN <table>']} for HOT_QUERIES."""
+    params = query_params(connection)
+    plans = {}
+    for label, sql in HOT_QUERIES:
+        details = [row[3] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params)]
+        used = []
+        for detail in details:
+            match = re.search(r'USING (?:COVERING )?INDEX (\w+)', detail)
+            if match:
+                used.append(match.group(1))
+            elif detail.startswith('SCAN ') and 'INDEX' not in detail:
+                used.append(detail)
+            elif 'TEMP B-TREE' in detail:
+                used.append(detail.replace('USE ', ''))
+        plans[label] = used
+    return plans
+
+def show_indexes(only=None):
+    for shard, engine in sqlite_shards(only):
+        with engine.connect() as connection:
+            plans = query_indexes(connection)
+            declared = [name for (name,) in connection.execute(text(
+                "SELECT name FROM sqlite_schema WHERE type = 'index' AND sql IS NOT NULL"
+            ))]
+            analyzed = connection.execute(text(
+                "SELECT COUNT(*) FROM sqlite_schema WHERE name = 'sqlite_stat1'"
+            )).scalar()
+        print(f"[{shard}] planner statistics: {'present' if analyzed else 'missing (run maintain --analyze)'}")
+        for label, used in plans.items():
+            print(f"  {label:28} {', '.join(used) or '-'}")
+        unused = [name for name in declared if not any(name in used for used in plans.values())]
+        if unused:
+            print(f"  not used by these queries: {', '.join(unused)}")
+
+def time_queries(connection, params):
+    timings = {}
+    for label, sql in HOT_QUERIES:
+        samples = []
+        for _ in range(TIMING_ROUNDS):
+            start = time.perf_counter()
+            connection.execute(text(sql), params).all()
+            samples.append((time.perf_counter() - start) * 1000)
+        timings[label] = sorted(samples)[len(samples) // 2]
+    return timings
+
+def is_quiet(connection):
+    since = datetime.utcnow() - QUIET_WINDOW
+    return not connection.execute(text("SELECT COUNT(*) FROM change_events WHERE created_at >= :since"), {'since': since}).scalar()
+
+def prune_tombstones(connection):
+    """Drop old sync tombstones; clients that synced before them start over with a full copy."""
+    cutoff = datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    upto = connection.execute(text("SELECT MAX(row_version) FROM sync_tombstones WHERE created_at < :cutoff"), {'cutoff': cutoff}).scalar()
+    if upto is None:
+        return 0
+    deleted = connection.execute(text("DELETE FROM sync_tombstones WHERE row_version <= :upto"), {'upto': upto}).rowcount
+    connection.execute(text("UPDATE sync_clock SET pruned_through = MAX(pruned_through, :upto) WHERE id = 1"), {'upto': upto})
+    return deleted
+
+def step(label, fn):
+    start = time.perf_counter()
+    note = fn()
+    print(f"  {label:36} {(time.perf_counter() - start) * 1000:9.1f}ms" + (f"  ({note})" if note else ""))
+
+def maintain(shard, engine, analyze=False, force=False, pages=VACUUM_PAGES):
+    """One maintenance pass over a shard; returns False if skipped because it was busy."""
+    # Autocommit: VACUUM and PRAGMA optimize can't run inside a transaction
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        if not force and not is_quiet(connection):
+            print(f"[{shard}] busy (writes in the last {QUIET_WINDOW.seconds // 60} minutes); skipped")
+            return False
+
+        params = query_params(connection)
+        before, before_ms = file_stats(connection), time_queries(connection, params)
+        print(f"[{shard}] maintenance")
+        step('prune sync tombstones', lambda: f"{prune_tombstones(connection)} deleted")
+        if analyze or not connection.execute(text("SELECT COUNT(*) FROM sqlite_schema WHERE name = 'sqlite_stat1'")).scalar():
+            step('ANALYZE', lambda: connection.execute(text("ANALYZE")).close())
+        else:
+            step('PRAGMA optimize', lambda: connection.execute(text("PRAGMA optimize")).close())
+        if before['auto_vacuum'] == 'incremental':
+            step(f'incremental VACUUM ({pages} pages)',
+                 lambda: connection.execute(text(f"PRAGMA incremental_vacuum({int(pages)})")).close())
+        elif before['free_pages']:
+            print(f"  incremental VACUUM skipped: auto_vacuum is {before['auto_vacuum']} (see enable-incremental-vacuum)")
+        after, after_ms = file_stats(connection), time_queries(connection, params)
+
+    print(f"  file: {human(before['bytes'])} ({before['free_pages']} free pages) -> "
+          f"{human(after['bytes'])} ({after['free_pages']} free pages)")
+    print(f"  hot queries (median of {TIMING_ROUNDS}):")
+    for label in before_ms:
+        print(f"    {label:28} {before_ms[label]:8.2f}ms -> {after_ms[label]:8.2f}ms")
+    return True
+
+def enable_incremental_vacuum(only=None):
+    for shard, engine in sqlite_shards(only):
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            before = file_stats(connection)
+            if before['auto_vacuum'] == 'incremental':
+                print(f"[{shard}] already incremental")
+                continue
+            print(f"[{shard}] rebuilding with auto_vacuum=incremental (writers wait until it finishes)")
+            connection.execute(text("PRAGMA auto_vacuum = INCREMENTAL"))
+            step('VACUUM', lambda: connection.execute(text("VACUUM")).close())
+            after = file_stats(connection)
+        print(f"  file: {human(before['bytes'])} -> {human(after['bytes'])}; auto_vacuum={after['auto_vacuum']}")
+
+def schedule(interval_minutes=15):
+    print(f"Maintaining {len(SHARD_URLS)} shard(s) every {interval_minutes} minutes when quiet (pid {os.getpid()})")
+    last_analyze = {}
+    while True:
+        for shard, engine in sqlite_shards():
+            try:
+                analyze = time.monotonic() - last_analyze.get(shard, float('-inf')) > ANALYZE_INTERVAL
+                if maintain(shard, engine, analyze=analyze) and analyze:
+                    last_analyze[shard] = time.monotonic()
+            except Exception as e:
+                print(f"[{shard}] maintenance error: {e}")
+        time.sleep(interval_minutes * 60)
+
+def main(argv):
+    command = argv[0] if argv else None
+    args = argv[1:]
+    if command == 'stats':
+        show_stats(args[0] if args else None)
+    elif command == 'users':
+        show_users(int(args[0]) if args else 20)
+    elif command == 'indexes':
+        show_indexes(args[0] if args else None)
+    elif command == 'maintain':
+        pages = int(args[args.index('--pages') + 1]) if '--pages' in args else VACUUM_PAGES
+        for shard, engine in sqlite_shards():
+            maintain(shard, engine, analyze='--analyze' in args, force='--force' in args, pages=pages)
+    elif command == 'schedule':
+        schedule(float(args[0]) if args else 15)
+    elif command == 'enable-incremental-vacuum':
+        enable_incremental_vacuum(args[0] if args else None)
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
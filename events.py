@@ -0,0 +1,215 @@
+"""
+Live change notifications for the /api/events Server-Sent Events stream.
+
+Write routes call publish() before committing, so a ChangeEvent row lands in
+the same transaction as the change it describes. The change_events table is a
+local stand-in for a pub/sub broker: every gunicorn worker runs one poller
+thread that tails the table on every shard and fans new events out to that
+worker's open streams, so a write handled by one worker reaches streams held by
+any other. An event goes to the writer's streams and, as a shared copy without
+the row's id or data, to those of everyone sharing their budget (their
+household).
+"""
+
+import json
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, text
+
+from database import SHARD_URLS, get_session, get_user_session, ChangeEvent
+
+POLL_INTERVAL = 0.5  # seconds between broker polls
+HEARTBEAT_INTERVAL = 15  # keep idle connections alive through proxies
+STREAM_LIFETIME = 300  # close streams periodically; EventSource reconnects
+PRUNE_INTERVAL = 60
+RETENTION = timedelta(hours=1)
+RECONNECT_DELAY_MS = 3000
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+# Who else gets each writer's events: the rest of their household
+SHARED_WITH_SQL = """
+SELECT me.id, member.id
+FROM users me
+JOIN users member ON member.household_id = me.household_id AND member.id != me.id
+WHERE me.id IN :user_ids
+"""
+
+
+def publish(db_session, user_id, entity, entity_id, op, data=None):
+    """Queue a change notification in the caller's transaction."""
+    db_session.add(ChangeEvent(
+        user_id=user_id,
+        entity=entity,
+        entity_id=entity_id,
+        op=op,
+        payload=json.dumps(data) if data is not None else None
+    ))
+
+
+def _to_message(event):
+    message = {'entity': event.entity, 'id': event.entity_id, 'op': event.op}
+    if event.payload:
+        message['data'] = json.loads(event.payload)
+    return event.id, event.user_id, message
+
+
+def _shared(message):
+    """The copy of a message for recipients other than the writer: the row isn't theirs."""
+    return {'entity': message['entity'], 'op': message['op'], 'shared': True}
+
+
+class Broker:
+    """Per-process fan-out of change events to subscribed streams."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._thread = None
+        self._last_ids = {}  # per shard; event ids are only ordered within a shard
+
+    def subscribe(self, user_id):
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscriber)
+            # Started lazily so the thread lives in the worker, not a preforked parent
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='events-broker', daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, user_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def backlog(self, user_id, since_id):
+        """Events a reconnecting client missed (used for Last-Event-ID)."""
+        db_session = get_user_session(user_id)
+        try:
+            events = db_session.query(ChangeEvent).filter(
+                ChangeEvent.user_id == user_id,
+                ChangeEvent.id > since_id
+            ).order_by(ChangeEvent.id).all()
+            return [_to_message(e) for e in events]
+        finally:
+            db_session.close()
+
+    def _run(self):
+        last_prune = time.monotonic()
+        while True:
+            prune = time.monotonic() - last_prune > PRUNE_INTERVAL
+            for shard in SHARD_URLS:
+                try:
+                    self._poll(shard)
+                    if prune:
+                        self._prune(shard)
+                except Exception as e:
+                    print(f"Events broker error on shard {shard}: {e}")
+            if prune:
+                last_prune = time.monotonic()
+            time.sleep(POLL_INTERVAL)
+
+    def _poll(self, shard):
+        db_session = get_session(shard)
+        try:
+            if shard not in self._last_ids:
+                # Only deliver events committed after this worker started listening
+                self._last_ids[shard] = db_session.query(ChangeEvent.id).order_by(ChangeEvent.id.desc()).limit(1).scalar() or 0
+                return
+
+            events = db_session.query(ChangeEvent).filter(
+                ChangeEvent.id > self._last_ids[shard]
+            ).order_by(ChangeEvent.id).all()
+        finally:
+            db_session.close()
+
+        recipients = self._recipients({event.user_id for event in events}) if events else {}
+        for event in events:
+            self._last_ids[shard] = event.id
+            self._dispatch(_to_message(event), recipients[event.user_id])
+
+    def _recipients(self, user_ids):
+        """{writer: [user ids its events go to]}, the writer first."""
+        recipients = {user_id: [user_id] for user_id in user_ids}
+        with self._lock:
+            if not self._subscribers:
+                return recipients
+        db_session = get_session()  # the directory of users lives on the main shard
+        try:
+            rows = db_session.execute(
+                text(SHARED_WITH_SQL).bindparams(bindparam('user_ids', expanding=True)),
+                {'user_ids': list(user_ids)}
+            )
+            for user_id, member_id in rows:
+                recipients[user_id].append(member_id)
+        finally:
+            db_session.close()
+        return recipients
+
+    def _dispatch(self, message, recipients):
+        """Queue the message on the streams of every recipient.
+
+        Others than the writer get a shared copy and no event id: ids are only
+        ordered within a shard, and the writer's shard need not be theirs, so
+        it mustn't become the Last-Event-ID their backlog is read from. Shared
+        events missed while disconnected are not replayed.
+        """
+        event_id, user_id, change = message
+        for recipient in recipients:
+            with self._lock:
+                subscribers = list(self._subscribers.get(recipient, ()))
+            if recipient != user_id:
+                message = (None, user_id, _shared(change))
+            for subscriber in subscribers:
+                try:
+                    subscriber.put_nowait(message)
+                except queue.Full:
+                    pass  # Slow client; it will resync on reconnect
+
+    def _prune(self, shard):
+        db_session = get_session(shard)
+        try:
+            db_session.query(ChangeEvent).filter(
+                ChangeEvent.created_at < datetime.utcnow() - RETENTION
+            ).delete(synchronize_session=False)
+            db_session.commit()
+        finally:
+            db_session.close()
+
+
+broker = Broker()
+
+
+def format_sse(event_id, message):
+    # Without an id line the client's Last-Event-ID stays as it was
+    event_id = f"id: {event_id}\n" if event_id is not None else ''
+    return f"{event_id}event: change\ndata: {json.dumps(message, separators=(',', ':'))}\n\n"
+
+
+def stream(user_id, last_event_id=None):
+    """Generate the SSE body for one client connection."""
+    subscriber = broker.subscribe(user_id)
+    try:
+        yield f"retry: {RECONNECT_DELAY_MS}\n\n"
+
+        if last_event_id is not None:
+            for event_id, _, message in broker.backlog(user_id, last_event_id):
+                yield format_sse(event_id, message)
+
+        deadline = time.monotonic() + STREAM_LIFETIME
+        while time.monotonic() < deadline:
+            try:
+                timeout = min(HEARTBEAT_INTERVAL, max(0.1, deadline - time.monotonic()))
+                event_id, _, message = subscriber.get(timeout=timeout)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            yield format_sse(event_id, message)
+    finally:
+        broker.unsubscribe(user_id, subscriber)
@@ -0,0 +1,187 @@
+"""
+Month-end spending projections by bootstrapping past days.
+
+Each trial fills the days left in the month with days drawn at random (with
+replacement) from the user's recent history, zero-spend days included, and
+adds the recurring expenses scheduled in that time. Today isn't over either:
+it gets a drawn day too, less what each category has already recorded today
+(never below zero). Whole days are drawn, not each category separately, so
+categories that tend to be spent on together stay correlated in the month's
+total. Expenses generated from recurring templates are left out of the
+history, since their future occurrences are added exactly.
+
+The history is a days x categories NumPy array and all trials advance together:
+each day left is one vectorized draw of a history row per trial, so 100,000
+trials take tens of milliseconds (see bench_forecast.py).
+"""
+
+import calendar
+from datetime import timedelta
+
+import numpy as np
+from sqlalchemy import func, or_
+
+import alerts
+from database import Expense, RecurringExpense, category_name, from_cents
+
+HISTORY_DAYS = 90
+MIN_HISTORY_DAYS = 14
+DEFAULT_TRIALS = 10000
+MAX_TRIALS = 100000
+PERCENTILES = [5, 25, 50, 75, 95]
+RECURRING_SUFFIX = ' (recurring)'  # description of expenses generated from a template
+
+
+def recurs_on(recurring, day):
+    """Whether an active recurring expense generates an expense on day."""
+    if day < recurring.start_date or (recurring.end_date and day > recurring.end_date):
+        return False
+    if recurring.frequency == 'daily':
+        return True
+    if recurring.frequency == 'weekly':
+        return recurring.day_of_week == day.weekday()
+    if recurring.frequency == 'monthly':
+        return recurring.day_of_month == day.day
+    if recurring.frequency == 'yearly':
+        return recurring.start_date.month == day.month and recurring.start_date.day == day.day
+    return False
+
+
+def scheduled_cents(db_session, user_id, today, month_end):
+    """{category_id: cents} recurring expenses will add from today (if not yet generated) to month_end."""
+    scheduled = {}
+    for recurring in db_session.query(RecurringExpense).filter_by(user_id=user_id, is_active=True):
+        day = today if recurring.last_generated != today else today + timedelta(days=1)
+        while day <= month_end:
+            if recurs_on(recurring, day):
+                scheduled[recurring.category_id] = scheduled.get(recurring.category_id, 0) + recurring.amount_cents
+            day += timedelta(days=1)
+    return scheduled
+
+
+def daily_history(db_session, user_id, today):
+    """({category_id: [cents per day]}, days, {category_id: cents today}) over the last HISTORY_DAYS full days of tracking."""
+    tracked_from = alerts.tracking_start(db_session, user_id) or db_session.query(
+        func.min(Expense.date)).filter(Expense.user_id == user_id).scalar() or today
+    start = min(today, max(today - timedelta(days=HISTORY_DAYS), tracked_from))
+    days = (today - start).days
+    rows = db_session.query(Expense.date, Expense.category_id, func.sum(Expense.amount_cents)).filter(
+        Expense.user_id == user_id,
+        Expense.date >= start,
+        Expense.date <= today,
+        or_(Expense.description.is_(None), ~Expense.description.endswith(RECURRING_SUFFIX))
+    ).group_by(Expense.date, Expense.category_id)
+
+    columns, today_cents = {}, {}
+    for day, category, cents in rows:
+        if day == today:
+            today_cents[category] = cents
+        else:
+            columns.setdefault(category, [0] * days)[(day - start).days] = cents
+    return columns, days, today_cents
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list."""
+    return sorted_values[min(len(sorted_values) - 1, len(sorted_values) * pct // 100)]
+
+
+def simulate(columns, days, days_left, trials, rng, today_cents=None):
+    """(categories, cents): simulated spending per trial (rows) and category (columns).
+
+    Each trial covers days_left days and, with today_cents ({category_id: cents
+    recorded today}), the rest of today: a drawn day less what is recorded,
+    floored at 0.
+    """
+    categories = list(columns) if days else []
+    simulated = np.zeros((trials, len(categories)), dtype=np.int64)
+    if not categories:
+        return categories, simulated
+
+    history = np.array([columns[category] for category in categories], dtype=np.int64).T  # days x categories
+    # One row of history per drawn day, so every category of a trial gets the same day
+    for draws in rng.integers(0, days, size=(days_left, trials)):
+        simulated += history[draws]
+    if today_cents is not None:
+        spent = np.array([today_cents.get(category, 0) for category in categories], dtype=np.int64)
+        simulated += np.maximum(history - spent, 0)[rng.integers(0, days, size=trials)]
+    return categories, simulated
+
+
+def projection(name, spent_cents, scheduled, simulated, limit_cents):
+    """Figures for one category (or a sum of them) from its per-trial simulated cents."""
+    known = spent_cents + scheduled
+    simulated = np.sort(simulated)
+    trials = len(simulated)
+    return {
+        'category': name,
+        'spent': from_cents(spent_cents),
+        'scheduled': from_cents(scheduled),
+        'budget': from_cents(limit_cents) if limit_cents is not None else None,
+        'mean': from_cents(known + round(float(simulated.mean()))),
+        'percentiles': {f'p{pct}': from_cents(known + int(percentile(simulated, pct))) for pct in PERCENTILES},
+        'probability_over_budget': (
+            round((trials - int(np.searchsorted(simulated, limit_cents - known, side='right'))) / trials, 4)
+            if limit_cents is not None else None
+        )
+    }
+
+
+def month_end(db_session, user_id, today, trials=DEFAULT_TRIALS, seed=None):
+    """Projected month-end spending per category and in total, with the chance of going over each budget.
+
+    `budgeted` is the budgeted categories together against the sum of their
+    limits, as the dashboard totals them.
+    """
+    month = alerts.month_start(today)
+    last_day = month.replace(day=calendar.monthrange(month.year, month.month)[1])
+    days_left = (last_day - today).days
+
+    columns, history_days, today_cents = daily_history(db_session, user_id, today)
+    if history_days < MIN_HISTORY_DAYS:
+        columns, history_days = {}, 0  # too little to draw from; project only what is known
+    limits = alerts.month_limits(db_session, user_id, month)
+    spent = alerts.month_totals(db_session, user_id, month)
+    scheduled = scheduled_cents(db_session, user_id, today, last_day)
+    simulated_categories, simulated = simulate(
+        columns, history_days, days_left, trials, np.random.default_rng(seed), today_cents
+    )
+    column = {category: i for i, category in enumerate(simulated_categories)}
+
+    def trials_of(categories):
+        """Per-trial simulated cents of the categories together."""
+        return simulated[:, [column[category] for category in categories if category in column]].sum(axis=1)
+
+    categories = []
+    for category in set(limits) | set(spent) | set(scheduled) | set(columns):
+        categories.append(projection(
+            category_name(db_session, category),
+            spent.get(category, 0),
+            scheduled.get(category, 0),
+            trials_of([category]),
+            limits.get(category)
+        ))
+    categories.sort(key=lambda c: -c['percentiles']['p50'])
+
+    return {
+        'month': month.strftime('%Y-%m'),
+        'as_of': today.isoformat(),
+        'days_left': days_left,
+        'history_days': history_days,
+        'trials': trials,
+        'categories': categories,
+        'total': projection(
+            'Total',
+            sum(spent.values()),
+            sum(scheduled.values()),
+            trials_of(simulated_categories),
+            None
+        ),
+        'budgeted': projection(
+            'Budgeted',
+            sum(spent.get(category, 0) for category in limits),
+            sum(scheduled.get(category, 0) for category in limits),
+            trials_of(limits),
+            sum(limits.values())
+        ) if limits else None
+    }
@@ -0,0 +1,70 @@
+"""
+Gunicorn settings, tuned for --preload.
+The app is imported once in the master and workers are forked from it, so each
+worker starts with Flask and SQLAlchemy already imported. Schema setup runs
+once in the master; each worker drops any inherited DB connections after fork.
+Workers sample their RSS and are recycled past MAX_WORKER_RSS_MB (see memory_profile.py).
+With JOBS_IN_WEB=1 each worker also runs background jobs (job_worker.py), for
+deploys without a separate worker process.
+
+Usage:
+    gunicorn -c gunicorn.conf.py app:app
+"""
+
+import os
+import time
+
+# Gunicorn binds to 0.0.0.0:$PORT by default when PORT is set (Render does)
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 16))  # SSE streams each hold a thread
+preload_app = True
+jobs_in_web = os.environ.get('JOBS_IN_WEB') == '1'
+timeout = 30
+graceful_timeout = 30
+
+
+def on_starting(server):
+    """One-shot schema and account setup in the master, before any worker exists."""
+    from init_db import setup_database
+    from database import dispose_engine
+
+    setup_database()
+    # Don't let workers inherit the master's pooled connections
+    dispose_engine()
+
+
+def pre_fork(server, worker):
+    worker.fork_started = time.perf_counter()
+
+
+def post_fork(server, worker):
+    from database import dispose_engine
+
+    # Engines must never share sockets/file handles across processes
+    dispose_engine(close=False)
+
+
+def post_worker_init(worker):
+    import memory_profile
+
+    elapsed = (time.perf_counter() - worker.fork_started) * 1000
+    worker.log.info("Worker %s ready in %.1fms after fork", worker.pid, elapsed)
+    # Past MAX_WORKER_RSS_MB the worker stops accepting, finishes its requests
+    # and exits; the arbiter then forks a fresh one
+    memory_profile.start_sampler(on_ceiling=lambda: setattr(worker, 'alive', False), log=worker.log.warning)
+    if jobs_in_web:
+        import job_worker
+
+        worker.job_threads = job_worker.start()
+
+
+def worker_exit(server, worker):
+    if getattr(worker, 'job_threads', None):
+        import job_worker
+
+        # Let the jobs in hand finish; one cut off is picked up again once its lease runs out
+        job_worker.stopping.set()
+        deadline = time.monotonic() + graceful_timeout
+        for thread in worker.job_threads:
+            thread.join(timeout=max(0, deadline - time.monotonic()))
@@ -0,0 +1,290 @@
+"""
+Combined views of linked accounts (a household) that share a budget.
+
+Members' spending comes from the per-user monthly aggregates, never the
+expense rows: expense_month_totals, kept by triggers, for live expenses and
+expense_rollups for archived ones. On each shard holding members, one grouped
+query over the member ids returns every member's per-category totals, so a
+household view costs about the same as one user's and members can be drilled
+into without another query. The household's limit for a category is the sum
+of its members' (prorated) limits.
+"""
+
+from collections import defaultdict, namedtuple
+from datetime import date, datetime
+
+from sqlalchemy import bindparam, func, or_, text
+
+import alerts
+from database import (
+    MAIN_SHARD, Budget, Household, Saving, Settings, User,
+    category_name, fan_out, from_cents, get_session
+)
+
+
+Member = namedtuple('Member', ['id', 'username', 'shard'])
+
+MEMBERS_SQL = """
+SELECT h.id, h.name, member.id, member.username, member.shard
+FROM users me
+JOIN households h ON h.id = me.household_id
+JOIN users member ON member.household_id = h.id
+WHERE me.id = :user_id
+ORDER BY member.id
+"""
+
+# Every member's per-category totals for a run of months in one grouped query,
+# from the per-month aggregates: one primary-key range per member and table
+MEMBER_TOTALS_SQL = """
+SELECT user_id, category_id, SUM(cents), SUM(count)
+FROM (
+    {live}
+    UNION ALL
+    SELECT user_id, category_id, total_cents, count FROM expense_rollups
+    WHERE user_id IN :user_ids AND month >= :start AND month < :end
+) AS totals
+GROUP BY user_id, category_id
+"""
+LIVE_TOTALS_SQL = """SELECT user_id, category_id, total_cents AS cents, count AS count FROM expense_month_totals
+    WHERE user_id IN :user_ids AND month >= :start AND month < :end"""
+LIVE_EXPENSES_SQL = """SELECT user_id, category_id, amount_cents AS cents, 1 AS count FROM expenses
+    WHERE user_id IN :user_ids AND date >= :start AND date < :end"""
+
+
+def next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def link(db_session, name, usernames):
+    """Put the users in one household named name (created if needed); returns it.
+
+    Users already in another household move to this one.
+    """
+    users = db_session.query(User).filter(User.username.in_(usernames)).all()
+    missing = set(usernames) - {user.username for user in users}
+    if missing:
+        raise ValueError(f"No such user(s): {', '.join(sorted(missing))}")
+    household = db_session.query(Household).filter_by(name=name).first()
+    if household is None:
+        household = Household(name=name)
+        db_session.add(household)
+    for user in users:
+        user.household = household
+    db_session.commit()
+    return household
+
+
+def unlink(db_session, username):
+    """Take a user out of their household; returns False if they weren't in one."""
+    user = db_session.query(User).filter_by(username=username).first()
+    if user is None or user.household_id is None:
+        return False
+    user.household_id = None
+    db_session.commit()
+    return True
+
+
+def household_of(user_id):
+    """(household, [members]) for the user's household, or None if they aren't in one."""
+    db_session = get_session()
+    try:
+        rows = db_session.execute(text(MEMBERS_SQL), {'user_id': user_id}).all()
+    finally:
+        db_session.close()
+    if not rows:
+        return None
+    household = {'id': rows[0][0], 'name': rows[0][1]}
+    return household, [Member(id, username, shard) for _, _, id, username, shard in rows]
+
+
+def serialize_household(household, members):
+    return {
+        **household,
+        'members': [{'id': member.id, 'username': member.username} for member in members]
+    }
+
+
+def _member_totals(db_session, user_ids, start, end):
+    """[(user_id, category, cents, count)] of expenses in months [start, end); None means unbounded."""
+    # No totals triggers outside SQLite; group the expenses there instead
+    live = LIVE_TOTALS_SQL if db_session.get_bind().dialect.name == 'sqlite' else LIVE_EXPENSES_SQL
+    rows = db_session.execute(text(MEMBER_TOTALS_SQL.format(live=live)).bindparams(
+        bindparam('user_ids', expanding=True)
+    ), {'user_ids': user_ids, 'start': start or date.min, 'end': end or date.max})
+    # Categories by name: a shard's custom categories may have other ids elsewhere
+    return [(user_id, category_name(db_session, category), cents, count) for user_id, category, cents, count in rows]
+
+
+def _member_limits(db_session, user_ids, month):
+    """[(user_id, category, prorated limit cents)] of the budget versions in effect in month."""
+    starts = {
+        user_id: datetime.strptime(value, '%Y-%m-%d').date()
+        for user_id, value in db_session.query(Settings.user_id, Settings.value).filter(
+            Settings.user_id.in_(user_ids), Settings.key == 'tracking_start_date')
+    }
+    rows = db_session.query(Budget.user_id, Budget.category_id, Budget.monthly_limit_cents).filter(
+        Budget.user_id.in_(user_ids),
+        Budget.effective_from <= month,
+        or_(Budget.effective_to.is_(None), Budget.effective_to > month)
+    )
+    return [(user_id, category_name(db_session, category), alerts.prorate_cents(limit_cents, month, starts.get(user_id)))
+            for user_id, category, limit_cents in rows]
+
+
+def _member_savings(db_session, user_ids, start, end):
+    """[(user_id, cents)] saved in [start, end)."""
+    return db_session.query(Saving.user_id, func.sum(Saving.amount_cents)).filter(
+        Saving.user_id.in_(user_ids), Saving.date >= start, Saving.date < end
+    ).group_by(Saving.user_id).all()
+
+
+def _gather(members, *queries):
+    """Run each query(db_session, user_ids) on every shard holding members; one list of rows per query.
+
+    Rows start with a user_id. Every shard is asked about all members in one
+    session, and the rows of members living elsewhere (e.g. left behind by a
+    move) are dropped.
+    """
+    shards = defaultdict(set)
+    for member in members:
+        shards[member.shard or MAIN_SHARD].add(member.id)
+    user_ids = [member.id for member in members]
+
+    def run(db_session):
+        return [query(db_session, user_ids) for query in queries]
+
+    if len(shards) == 1:
+        [shard] = shards
+        db_session = get_session(shard)
+        try:
+            results = {shard: run(db_session)}
+        finally:
+            db_session.close()
+    else:
+        results = fan_out(run, list(shards))
+    return [
+        [row for shard, shard_results in results.items() for row in shard_results[i] if row[0] in shards[shard]]
+        for i in range(len(queries))
+    ]
+
+
+def _categories(totals, limits=()):
+    """{category: {'spent', 'count', 'limit', 'budgeted', 'members': {user_id: [cents, count]}}}."""
+    categories = defaultdict(lambda: {'spent': 0, 'count': 0, 'limit': 0, 'budgeted': False, 'members': {}})
+    for user_id, category, cents, count in totals:
+        entry = categories[category]
+        entry['spent'] += cents
+        entry['count'] += count
+        entry['members'][user_id] = [cents, count]
+    for user_id, category, limit_cents in limits:
+        categories[category]['limit'] += limit_cents
+        categories[category]['budgeted'] = True
+    return categories
+
+
+def _member_breakdown(members, entry):
+    return [{
+        'username': member.username,
+        'spent': from_cents(entry['members'].get(member.id, [0, 0])[0]),
+        'count': entry['members'].get(member.id, [0, 0])[1]
+    } for member in members]
+
+
+def dashboard(members, today):
+    """This month's combined spending against the combined limits, like get_dashboard_data() for one user."""
+    month = alerts.month_start(today)
+    totals, limits = _gather(
+        members,
+        lambda db_session, ids: _member_totals(db_session, ids, month, next_month(month)),
+        lambda db_session, ids: _member_limits(db_session, ids, month)
+    )
+    categories = _categories(totals, limits)
+
+    budgeted, unbudgeted = [], []
+    for category, entry in sorted(categories.items()):
+        spent, limit_cents = entry['spent'], entry['limit']
+        if entry['budgeted']:
+            budgeted.append({
+                'category': category,
+                'budget': from_cents(limit_cents),
+                'spent': from_cents(spent),
+                'remaining': from_cents(max(0, limit_cents - spent)),
+                'percentage': round(spent * 100 / limit_cents, 1) if limit_cents > 0 else 0,
+                'status': alerts.status_for(spent, limit_cents) if limit_cents > 0 else 'safe',
+                'members': _member_breakdown(members, entry)
+            })
+        else:
+            unbudgeted.append({
+                'category': category,
+                'budget': 0,
+                'spent': from_cents(spent),
+                'remaining': 0,
+                'percentage': 0,
+                'status': 'no_budget',
+                'members': _member_breakdown(members, entry)
+            })
+
+    total_budget = sum(entry['limit'] for entry in categories.values())
+    total_spent = sum(entry['spent'] for entry in categories.values())
+    return {
+        'month': month.strftime('%Y-%m'),
+        'categories': budgeted + unbudgeted,
+        'total_budget': from_cents(total_budget),
+        'total_spent': from_cents(total_spent),
+        'total_remaining': from_cents(max(0, total_budget - total_spent))
+    }
+
+
+def category_breakdown(members, start=None, end=None):
+    """Combined spending per category over months [start, end), with each member's share."""
+    [totals] = _gather(members, lambda db_session, ids: _member_totals(db_session, ids, start, end))
+    return [{
+        'category': category,
+        'total': from_cents(entry['spent']),
+        'members': _member_breakdown(members, entry)
+    } for category, entry in sorted(_categories(totals).items())]
+
+
+def monthly_report(members, month):
+    """The household's monthly report: combined budgets, spending and savings, with each member's part."""
+    end = next_month(month)
+    totals, limits, savings = _gather(
+        members,
+        lambda db_session, ids: _member_totals(db_session, ids, month, end),
+        lambda db_session, ids: _member_limits(db_session, ids, month),
+        lambda db_session, ids: _member_savings(db_session, ids, month, end)
+    )
+    categories = _categories(totals, limits)
+    savings = {user_id: cents or 0 for user_id, cents in savings}
+
+    rows = []
+    for category, entry in categories.items():
+        spent, limit_cents = entry['spent'], entry['limit']
+        percentage = spent * 100 / limit_cents if limit_cents > 0 else 0
+        status = alerts.REPORT_STATUSES[alerts.status_for(spent, limit_cents)]
+        rows.append({
+            'category': category,
+            'budget': from_cents(limit_cents),
+            'spent': from_cents(spent),
+            'difference': from_cents(limit_cents - spent),
+            'percentage': round(percentage, 1),
+            'transaction_count': entry['count'],
+            'status': status,
+            'members': _member_breakdown(members, entry)
+        })
+
+    total_budget = sum(entry['limit'] for entry in categories.values())
+    total_spent = sum(entry['spent'] for entry in categories.values())
+    return {
+        'month': month.strftime('%Y-%m'),
+        'total_budget': from_cents(total_budget),
+        'total_spent': from_cents(total_spent),
+        'total_saved': from_cents(sum(savings.values())),
+        'total_difference': from_cents(total_budget - total_spent),
+        'categories': sorted(rows, key=lambda r: r['spent'], reverse=True),
+        'members': [{
+            'username': member.username,
+            'spent': from_cents(sum(entry['members'].get(member.id, [0, 0])[0] for entry in categories.values())),
+            'saved': from_cents(savings.get(member.id, 0))
+        } for member in members]
+    }
@@ -2,9 +2,14 @@
 """
 Initialize required accounts if they don't exist.
 This runs automatically to ensure cole and natalie accounts always exist.
+The first run that finds no households links them into one; after that,
+households are only changed with link_household.py, so an --unlink sticks.
 """
 
-from database import get_session, User
+import households
+from database import get_session, Household, User
+
+REQUIRED_HOUSEHOLD = 'Home'
 
 def ensure_accounts_exist():
     """Ensure the two required accounts exist in the database."""
@@ -25,6 +30,10 @@ def ensure_accounts_exist():
                 print(f"✓ Created required account: {username}")
             else:
                 print(f"✓ Account exists: {username}")
+
+        if db_session.query(Household.id).first() is None:
+            households.link(db_session, REQUIRED_HOUSEHOLD, list(REQUIRED_ACCOUNTS))
+            print(f"✓ Linked {' and '.join(REQUIRED_ACCOUNTS)} into a household")
     except Exception as e:
         print(f"Error ensuring accounts: {e}")
         db_session.rollback()
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+One-shot database setup: create any missing tables and the required accounts.
+Run this once per deploy; gunicorn.conf.py runs it in the master process so
+workers and admin scripts never pay for schema setup on import.
+"""
+
+from database import init_db
+from init_accounts import ensure_accounts_exist
+
+def setup_database():
+    """Create missing tables, then make sure the required accounts exist."""
+    init_db()
+    print("✓ Database schema is up to date")
+    ensure_accounts_exist()
+
+if __name__ == '__main__':
+    setup_database()
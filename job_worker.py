@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Run background jobs from the jobs queue (see jobs.py): user data exports and
+backups/restores queued with `backup.py ... --queue` or `auto_backup.py --queue`.
+Runs JOB_CONCURRENCY jobs at a time (default 2); per-kind limits in
+jobs.KIND_LIMITS hold across all workers. Stops cleanly on SIGTERM/Ctrl-C
+after the jobs in hand finish, and likewise once its memory passes
+MAX_WORKER_RSS_MB, for its process manager to start it again; jobs of a worker
+that died are picked up again once their lease runs out.
+
+Where the app is deployed as a single service (render.yaml), set
+JOBS_IN_WEB=1 instead and each gunicorn worker runs these threads itself
+(see gunicorn.conf.py).
+
+Usage:
+    python job_worker.py              # run jobs until stopped
+    python job_worker.py --once       # run what is queued now, then exit (e.g. from cron)
+    python job_worker.py --status ID  # show a job's status
+"""
+
+import json
+import os
+import signal
+import sys
+import threading
+import time
+
+import jobs
+import memory_profile
+from database import get_session, Job
+
+CONCURRENCY = int(os.environ.get('JOB_CONCURRENCY', 2))
+POLL_INTERVAL = 1.0  # seconds between looks at an empty queue
+MAINTENANCE_INTERVAL = 30  # seconds between heartbeats and stale-job sweeps
+PRUNE_INTERVAL = 3600
+
+stopping = threading.Event()
+
+def work(worker, once):
+    while not stopping.is_set():
+        job_id = jobs.claim(worker)
+        if job_id is None:
+            if once:
+                return
+            stopping.wait(POLL_INTERVAL)
+            continue
+        print(f"Running job {job_id}")
+        jobs.run(job_id, worker)
+        print(f"Finished job {job_id}")
+
+def maintain(worker):
+    last_prune = 0
+    while not stopping.wait(MAINTENANCE_INTERVAL):
+        try:
+            jobs.heartbeat(worker)
+            if jobs.requeue_stale():
+                print("Requeued jobs from a worker that stopped responding")
+            if time.monotonic() - last_prune > PRUNE_INTERVAL:
+                jobs.prune()
+                last_prune = time.monotonic()
+        except Exception as e:
+            print(f"Job maintenance error: {e}")
+
+def show_status(job_id):
+    db_session = get_session()
+    try:
+        job = db_session.query(Job).filter_by(id=job_id).first()
+        if job is None:
+            print(f"No job {job_id}")
+            sys.exit(1)
+        print(json.dumps(jobs.serialize_job(job), indent=2))
+    finally:
+        db_session.close()
+
+def start(once=False):
+    """Start the job threads (and the maintenance thread) in this process; returns the job threads."""
+    worker = jobs.worker_name()
+    jobs.requeue_stale()
+    threads = [threading.Thread(target=work, args=(worker, once), name=f'job-{i}') for i in range(CONCURRENCY)]
+    threading.Thread(target=maintain, args=(worker,), name='job-maintenance', daemon=True).start()
+    print(f"Job worker {worker} running {CONCURRENCY} job(s) at a time")
+    for thread in threads:
+        thread.start()
+    return threads
+
+def main():
+    if '--status' in sys.argv:
+        show_status(int(sys.argv[sys.argv.index('--status') + 1]))
+        return
+
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stopping.set())
+
+    memory_profile.start_sampler(on_ceiling=stopping.set)
+    threads = start(once='--once' in sys.argv)
+    # Join with a timeout so signals still reach the main thread
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=0.5)
+
+if __name__ == '__main__':
+    main()
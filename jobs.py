@@ -0,0 +1,258 @@
+"""
+Persistent background jobs, queued in the directory database's jobs table.
+
+Requests and scripts enqueue() a job and return at once; job_worker.py claims
+queued jobs and runs them on a few threads. A claim is a single UPDATE, so two
+workers never take the same job, and it also enforces the per-kind concurrency
+limits in KIND_LIMITS across all workers. Failed jobs are retried with
+exponential backoff up to max_attempts. A worker refreshes the heartbeat of
+the jobs it runs; a job whose heartbeat goes stale (its worker died) goes back
+to the queue. Handlers report progress, which GET /api/jobs/<id> returns.
+"""
+
+import json
+import os
+import socket
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.orm import aliased
+
+import memory_profile
+from database import get_session, Job
+
+EXPORT_DIR = os.environ.get('JOB_EXPORT_DIR', 'exports')
+LEASE = timedelta(minutes=2)  # a running job's heartbeat older than this is presumed dead
+RETRY_DELAY = 30  # seconds before the first retry, doubled for each further one
+RETENTION = timedelta(days=7)  # finished jobs (and their export files) are kept this long
+
+# Most jobs that may run at once, across all workers
+KIND_LIMITS = {
+    'export_backup': 1,
+    'import_backup': 1,
+    'auto_backup': 1,
+    'export_user': 2,
+}
+DEFAULT_KIND_LIMIT = 2
+
+HANDLERS = {}
+MAX_ATTEMPTS = {}
+
+
+class JobError(Exception):
+    """A handler failure that shouldn't be retried."""
+
+
+def handler(kind, max_attempts=3):
+    """Register fn(context) as the handler for a job kind; its return value (JSON) is the result."""
+    def register(fn):
+        HANDLERS[kind] = fn
+        MAX_ATTEMPTS[kind] = max_attempts
+        return fn
+    return register
+
+
+def enqueue(kind, params=None, user_id=None):
+    """Queue a job and return its id."""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind {kind!r}")
+    db_session = get_session()
+    try:
+        job = Job(kind=kind, params=json.dumps(params or {}), user_id=user_id, max_attempts=MAX_ATTEMPTS[kind])
+        db_session.add(job)
+        db_session.commit()
+        return job.id
+    finally:
+        db_session.close()
+
+
+def serialize_job(job):
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': round(job.progress, 3),
+        'message': job.message,
+        'attempts': job.attempts,
+        'error': job.error if job.status == 'failed' else None,
+        'result': json.loads(job.result) if job.result else None,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker):
+    """Mark the next runnable job as running for this worker; returns its id or None."""
+    now = datetime.utcnow()
+    candidate, running = aliased(Job), aliased(Job)
+    limit = case(KIND_LIMITS, value=candidate.kind, else_=DEFAULT_KIND_LIMIT)
+    busy = select(func.count(running.id)).where(
+        running.status == 'running', running.kind == candidate.kind
+    ).scalar_subquery()
+    next_id = select(candidate.id).where(
+        candidate.status == 'queued', candidate.run_after <= now, busy < limit
+    ).order_by(candidate.run_after, candidate.id).limit(1).scalar_subquery()
+
+    db_session = get_session()
+    try:
+        job_id = db_session.execute(
+            update(Job).where(Job.id == next_id, Job.status == 'queued').values(
+                status='running', attempts=Job.attempts + 1, locked_by=worker, heartbeat_at=now
+            ).returning(Job.id)
+        ).scalar()
+        db_session.commit()
+        return job_id
+    finally:
+        db_session.close()
+
+
+def heartbeat(worker):
+    db_session = get_session()
+    try:
+        db_session.query(Job).filter(Job.status == 'running', Job.locked_by == worker).update(
+            {'heartbeat_at': datetime.utcnow()}, synchronize_session=False
+        )
+        db_session.commit()
+    finally:
+        db_session.close()
+
+
+def requeue_stale():
+    """Put jobs whose worker stopped heartbeating back in the queue (or fail them if out of attempts)."""
+    stale = datetime.utcnow() - LEASE
+    db_session = get_session()
+    try:
+        jobs = db_session.query(Job).filter(Job.status == 'running', Job.heartbeat_at < stale).all()
+        for job in jobs:
+            _retry_or_fail(job, f'Worker {job.locked_by} stopped responding')
+        db_session.commit()
+        return len(jobs)
+    finally:
+        db_session.close()
+
+
+def prune():
+    """Delete finished jobs past RETENTION, and the files they exported."""
+    db_session = get_session()
+    try:
+        jobs = db_session.query(Job).filter(
+            Job.status.in_(['succeeded', 'failed']), Job.finished_at < datetime.utcnow() - RETENTION
+        ).all()
+        for job in jobs:
+            filename = (json.loads(job.result) if job.result else {}).get('filename')
+            if job.kind == 'export_user' and filename and os.path.exists(filename):
+                os.remove(filename)
+            db_session.delete(job)
+        db_session.commit()
+        return len(jobs)
+    finally:
+        db_session.close()
+
+
+def _retry_or_fail(job, error):
+    job.error = error
+    job.locked_by = None
+    if job.attempts < job.max_attempts:
+        job.status = 'queued'
+        job.run_after = datetime.utcnow() + timedelta(seconds=RETRY_DELAY * 2 ** (job.attempts - 1))
+    else:
+        job.status = 'failed'
+        job.finished_at = datetime.utcnow()
+
+
+class JobContext:
+    """What a handler gets: the job's params and owner, and a way to report progress."""
+
+    def __init__(self, job):
+        self.id = job.id
+        self.kind = job.kind
+        self.user_id = job.user_id
+        self.params = json.loads(job.params) if job.params else {}
+
+    def progress(self, fraction, message=None):
+        db_session = get_session()
+        try:
+            db_session.query(Job).filter_by(id=self.id, status='running').update({
+                'progress': max(0.0, min(1.0, fraction)),
+                'message': message[:200] if message else None,
+                'heartbeat_at': datetime.utcnow()
+            }, synchronize_session=False)
+            db_session.commit()
+        finally:
+            db_session.close()
+
+
+def run(job_id, worker):
+    """Run a claimed job and record how it ended."""
+    db_session = get_session()
+    try:
+        context = JobContext(db_session.query(Job).filter_by(id=job_id).one())
+    finally:
+        db_session.close()
+
+    outcome, error = None, None
+    try:
+        with memory_profile.Measurement(f'job {context.kind}'):
+            outcome = HANDLERS[context.kind](context)
+    except Exception as e:
+        error = e
+
+    db_session = get_session()
+    try:
+        job = db_session.query(Job).filter_by(id=job_id).one()
+        if job.status != 'running' or job.locked_by != worker:
+            return  # presumed dead and requeued meanwhile; the newer run owns it
+        if error is None:
+            job.status = 'succeeded'
+            job.progress = 1.0
+            job.result = json.dumps(outcome) if outcome is not None else None
+            job.error = None
+            job.locked_by = None
+            job.finished_at = datetime.utcnow()
+        elif isinstance(error, JobError):
+            job.attempts = job.max_attempts
+            _retry_or_fail(job, str(error))
+        else:
+            _retry_or_fail(job, f'{type(error).__name__}: {error}')
+        db_session.commit()
+    finally:
+        db_session.close()
+
+
+# Handlers. Backups import lazily so the web app doesn't load them until needed.
+
+@handler('export_backup')
+def export_backup_job(context):
+    from backup import export_backup
+    return {'filename': os.path.abspath(export_backup(context.params.get('filename'), progress=context.progress))}
+
+
+@handler('import_backup', max_attempts=1)  # a partial restore must not be replayed
+def import_backup_job(context):
+    from backup import import_backup
+    if not import_backup(context.params['filename'], progress=context.progress):
+        raise JobError('Restore failed; see the worker log')
+
+
+@handler('auto_backup')
+def auto_backup_job(context):
+    from auto_backup import create_auto_backup
+    filename = create_auto_backup()
+    if filename is None:
+        raise RuntimeError('Backup failed; see the worker log')
+    return {'filename': os.path.abspath(filename)}
+
+
+@handler('export_user')
+def export_user_job(context):
+    from backup import export_backup
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    # Absolute, since the web app serving the download may run from another directory
+    filename = os.path.abspath(os.path.join(EXPORT_DIR, f'export_{context.user_id}_{context.id}.json'))
+    export_backup(filename, user_id=context.user_id, progress=context.progress)
+    return {'filename': filename}
+
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Link accounts into a household, whose members see combined dashboard,
+category breakdown and monthly report views (/api/household/...), or take an
+account out of its household. Each member keeps their own expenses and budgets.
+
+Usage:
+    python link_household.py <household name> <username> [<username> ...]
+    python link_household.py --unlink <username>
+    python link_household.py --list
+"""
+
+import sys
+
+import households
+from database import get_session, Household
+
+def main(argv):
+    db_session = get_session()
+    try:
+        if argv[:1] == ['--list']:
+            for household in db_session.query(Household).order_by(Household.id):
+                print(f"{household.name}: {', '.join(sorted(m.username for m in household.members)) or '(no members)'}")
+        elif argv[:1] == ['--unlink'] and len(argv) == 2:
+            if households.unlink(db_session, argv[1]):
+                print(f"✓ Removed {argv[1]} from their household")
+            else:
+                print(f"{argv[1]} is not in a household")
+        elif len(argv) >= 2 and not argv[0].startswith('--'):
+            try:
+                household = households.link(db_session, argv[0], argv[1:])
+            except ValueError as e:
+                print(e)
+                sys.exit(1)
+            print(f"✓ {household.name}: {', '.join(sorted(m.username for m in household.members))}")
+        else:
+            print(__doc__)
+            sys.exit(1)
+    finally:
+        db_session.close()
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,13 +1,21 @@
 #!/usr/bin/env python3
 """Simple script to list all users - run this on Render."""
 
-from database import get_session, User
+from sqlalchemy import func
+from database import MAIN_SHARD, get_session, fan_out, User, Expense
+
+# Expense counts per user, gathered from every shard
+expense_counts = {}
+for counts in fan_out(lambda s: s.query(Expense.user_id, func.count(Expense.id)).group_by(Expense.user_id).all()).values():
+    for user_id, count in counts:
+        expense_counts[user_id] = expense_counts.get(user_id, 0) + count
 
 db_session = get_session()
 try:
     users = db_session.query(User).all()
     print(f"Total users: {len(users)}")
     for user in users:
-        print(f"  - {user.username} (ID: {user.id}, Created: {user.created_at})")
+        print(f"  - {user.username} (ID: {user.id}, Shard: {user.shard or MAIN_SHARD}, "
+              f"Expenses: {expense_counts.get(user.id, 0)}, Created: {user.created_at})")
 finally:
     db_session.close()
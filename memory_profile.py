@@ -0,0 +1,304 @@
+"""
+Per-route memory profiling and worker RSS tracking.
+
+With MEMORY_PROFILING=1, tracemalloc records each request's peak allocation
+above what was in use when it started, per route ("GET /api/expenses").
+tracemalloc counts the whole process, so one request is measured at a time
+and requests arriving meanwhile go unmeasured; peaks are exact, at the cost
+of sampling under load. The first measured request of a route, and every
+SITES_EVERY-th after it, also records where that memory went: a watcher
+thread snapshots the heap near the request's peak and the growth is
+attributed to the innermost line of app code on each allocation's stack.
+Those requests pay for the snapshots, so their peaks are left out of the
+statistics.
+
+Independently of that, every worker samples its resident set size every
+RSS_SAMPLE_INTERVAL seconds. Each process writes its figures to a file in
+MEMORY_STATS_DIR so /api/admin/memory can report all workers on the host,
+whichever one serves it. A gunicorn worker whose RSS passes MAX_WORKER_RSS_MB
+stops taking requests and exits once the ones in hand finish; gunicorn starts
+a fresh one in its place (see gunicorn.conf.py).
+"""
+
+import json
+import os
+import resource
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+from flask import g, request
+
+MEMORY_PROFILING = os.environ.get('MEMORY_PROFILING', '0') not in ('', '0')
+TRACE_FRAMES = int(os.environ.get('MEMORY_PROFILE_FRAMES', 30))  # deep enough to reach app code under SQLAlchemy
+SITES_EVERY = 50  # measured requests of a route between allocation site captures
+TOP_SITES = 10
+WATCH_INTERVAL = 0.005  # seconds between the watcher's looks at traced memory
+RSS_SAMPLE_INTERVAL = float(os.environ.get('RSS_SAMPLE_INTERVAL', 15))
+RSS_SAMPLES_KEPT = 240
+MAX_WORKER_RSS_MB = float(os.environ.get('MAX_WORKER_RSS_MB', 0))  # 0 never recycles
+MIN_WORKER_AGE = 60  # seconds; a worker is never recycled sooner, so a low ceiling can't loop
+STATS_DIR = os.environ.get('MEMORY_STATS_DIR', os.path.join(tempfile.gettempdir(), 'budget-memory'))
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_routes = {}  # route -> stats dict
+_routes_lock = threading.Lock()
+_measuring = threading.Lock()  # held by the one request being measured
+_samples = deque(maxlen=RSS_SAMPLES_KEPT)
+_recycling = False
+_started_at = None  # set by start_sampler(): with preload_app, import time is the master's, not the worker's
+
+
+def rss_bytes():
+    """Current resident set size; the peak where /proc isn't available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+
+class PeakWatcher(threading.Thread):
+    """Snapshots the heap whenever traced memory climbs to a new high during one request."""
+
+    def __init__(self):
+        super().__init__(name='memory-watcher', daemon=True)
+        self.stopped = threading.Event()
+        self.high = tracemalloc.get_traced_memory()[0]
+        self.snapshot = None
+
+    def run(self):
+        while not self.stopped.wait(WATCH_INTERVAL):
+            current = tracemalloc.get_traced_memory()[0]
+            # Only sizeable new highs, so snapshots stay few
+            if current > self.high + max(256 * 1024, (self.high - self.start_size) // 10):
+                self.snapshot = tracemalloc.take_snapshot()
+                self.high = tracemalloc.get_traced_memory()[0]
+
+    def start(self):
+        self.start_size = self.high
+        super().start()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        return self.snapshot
+
+
+def _site(traceback):
+    """The innermost frame in app code (else the innermost frame), as 'file.py:line'."""
+    for frame in traceback:
+        if frame.filename.startswith(APP_DIR) and frame.filename != __file__:
+            return f"{os.path.relpath(frame.filename, APP_DIR)}:{frame.lineno}"
+    frame = traceback[0]
+    return f"{frame.filename.rsplit('site-packages' + os.sep, 1)[-1]}:{frame.lineno}"
+
+
+def top_sites(snapshot, baseline):
+    """The sites holding the most memory in snapshot that wasn't held in baseline."""
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    sizes = {}
+    for diff in snapshot.filter_traces(ignore).compare_to(baseline.filter_traces(ignore), 'traceback'):
+        if diff.size_diff > 0:
+            site = _site(diff.traceback)
+            sizes[site] = sizes.get(site, 0) + diff.size_diff
+    return [{'site': site, 'bytes': size} for site, size in sorted(sizes.items(), key=lambda s: -s[1])[:TOP_SITES]]
+
+
+class Measurement:
+    """One measured unit of work (a request or a job); start() is False if another is being measured."""
+
+    def __init__(self, name):
+        self.name = name
+        self.watcher = None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+        if not _measuring.acquire(blocking=False):
+            return False
+        with _routes_lock:
+            stats = _routes.setdefault(self.name, {'count': 0, 'sampled': 0, 'peak_total': 0, 'peak_max': 0,
+                                                   'sites': [], 'sites_peak': 0})
+            due = stats['sampled'] % SITES_EVERY == 0
+            stats['sampled'] += 1
+        if due:
+            self.baseline = tracemalloc.take_snapshot()
+            self.watcher = PeakWatcher()
+        tracemalloc.reset_peak()
+        self.start_size = tracemalloc.get_traced_memory()[0]
+        if self.watcher:
+            self.watcher.start()
+        return True
+
+    def finish(self):
+        try:
+            peak = tracemalloc.get_traced_memory()[1] - self.start_size
+            if self.watcher:
+                snapshot = self.watcher.stop() or tracemalloc.take_snapshot()
+                sites = top_sites(snapshot, self.baseline)
+            with _routes_lock:
+                stats = _routes[self.name]
+                if self.watcher:
+                    if self.watcher.high - self.start_size >= stats['sites_peak']:
+                        stats['sites'] = sites
+                        stats['sites_peak'] = self.watcher.high - self.start_size
+                else:
+                    stats['count'] += 1
+                    stats['peak_total'] += peak
+                    stats['peak_max'] = max(stats['peak_max'], peak)
+        finally:
+            _measuring.release()
+
+    def __enter__(self):
+        self.active = MEMORY_PROFILING and self.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.active:
+            self.finish()
+
+
+def _before_request():
+    if request.url_rule is None:
+        return
+    measurement = Measurement(f"{request.method} {request.url_rule.rule}")
+    if measurement.start():
+        g.memory_measurement = measurement
+
+
+def _after_request(response):
+    # Streamed responses (e.g. /api/events) are measured up to the first byte
+    _finish_request()
+    return response
+
+
+def _finish_request(exc=None):
+    measurement = g.pop('memory_measurement', None)
+    if measurement:
+        measurement.finish()
+
+
+def init_app(app):
+    """Measure every request's memory, if MEMORY_PROFILING is on."""
+    if MEMORY_PROFILING:
+        app.before_request(_before_request)
+        app.after_request(_after_request)
+        app.teardown_request(_finish_request)  # after_request is skipped when a view raises
+
+
+def _stats_path(pid):
+    return os.path.join(STATS_DIR, f'worker-{pid}.json')
+
+
+def write_stats():
+    """Record this process's RSS samples and route profiles for report()."""
+    rss = rss_bytes()
+    if not _samples or _samples[-1][0] < time.time() - 1:
+        _samples.append((round(time.time(), 1), rss))
+    with _routes_lock:
+        routes = json.loads(json.dumps(_routes))
+    stats = {
+        'pid': os.getpid(),
+        'started_at': _started_at,
+        'rss': rss,
+        'max_rss': max(sample[1] for sample in _samples),
+        'samples': list(_samples),
+        'recycling': _recycling,
+        'routes': routes,
+    }
+    os.makedirs(STATS_DIR, exist_ok=True)
+    path = _stats_path(os.getpid())
+    with open(path + '.tmp', 'w') as f:
+        json.dump(stats, f)
+    os.replace(path + '.tmp', path)
+    return stats
+
+
+def start_sampler(on_ceiling=None, log=print):
+    """Sample RSS every RSS_SAMPLE_INTERVAL seconds in this process.
+
+    on_ceiling() is called once when RSS passes MAX_WORKER_RSS_MB, to start a
+    graceful restart; without it the ceiling is only logged. Call it in the
+    process being sampled (after the fork), as MIN_WORKER_AGE counts from here.
+    """
+    global _started_at
+    _started_at = time.time()
+
+    def run():
+        global _recycling
+        while True:
+            try:
+                stats = write_stats()
+                over = MAX_WORKER_RSS_MB and stats['rss'] > MAX_WORKER_RSS_MB * 1024 * 1024
+                if over and not _recycling and time.time() - _started_at >= MIN_WORKER_AGE:
+                    log(f"Worker {os.getpid()} RSS {stats['rss'] / 1024 / 1024:.0f}MB is over "
+                        f"MAX_WORKER_RSS_MB={MAX_WORKER_RSS_MB:.0f}" + ("; recycling it" if on_ceiling else ""))
+                    if on_ceiling:
+                        _recycling = True
+                        on_ceiling()
+            except Exception as e:
+                log(f"Memory sampling error: {e}")
+            time.sleep(RSS_SAMPLE_INTERVAL)
+
+    threading.Thread(target=run, name='memory-sampler', daemon=True).start()
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def report():
+    """Every live process's RSS and the route profiles merged across them."""
+    write_stats()
+    workers = []
+    for name in os.listdir(STATS_DIR):
+        if not (name.startswith('worker-') and name.endswith('.json')):
+            continue
+        pid = int(name[len('worker-'):-len('.json')])
+        if not _alive(pid):
+            try:
+                os.remove(os.path.join(STATS_DIR, name))
+            except OSError:
+                pass
+            continue
+        try:
+            with open(os.path.join(STATS_DIR, name)) as f:
+                workers.append(json.load(f))
+        except (OSError, json.JSONDecodeError):
+            continue  # being replaced right now
+
+    routes = {}
+    for worker in workers:
+        for route, stats in worker.pop('routes').items():
+            merged = routes.setdefault(route, {'count': 0, 'peak_total': 0, 'peak_max': 0, 'sites': [], 'sites_peak': 0})
+            merged['count'] += stats['count']
+            merged['peak_total'] += stats['peak_total']
+            merged['peak_max'] = max(merged['peak_max'], stats['peak_max'])
+            if stats['sites'] and stats['sites_peak'] >= merged['sites_peak']:
+                merged['sites'] = stats['sites']
+                merged['sites_peak'] = stats['sites_peak']
+
+    return {
+        'profiling': MEMORY_PROFILING,
+        'max_worker_rss': int(MAX_WORKER_RSS_MB * 1024 * 1024) or None,
+        'workers': sorted(workers, key=lambda w: -w['rss']),
+        'routes': sorted([{
+            'route': route,
+            'requests': stats['count'],
+            'peak_mean': stats['peak_total'] // stats['count'] if stats['count'] else None,
+            'peak_max': stats['peak_max'],
+            'top_sites': stats['sites'],
+            'top_sites_peak': stats['sites_peak'] if stats['sites'] else None,
+        } for route, stats in routes.items()], key=lambda r: -r['peak_max'])
+    }
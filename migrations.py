@@ -0,0 +1,157 @@
+"""
+In-place upgrades for databases created by older versions of the app.
+init_db() runs these before create_all(); each step checks whether it is
+needed, so running them on an up-to-date database does nothing.
+"""
+
+from sqlalchemy import inspect
+
+from database import SYNC_TABLES, Base, Category
+
+# Tables whose money columns became integer cents and whose category
+# strings became small-int ids into the categories table
+LEDGER_TABLES = ['expenses', 'budgets', 'savings', 'savings_goals', 'recurring_expenses']
+
+# Full-text search objects that reference ledger tables; create_all() rebuilds them
+SEARCH_OBJECTS = [
+    ('TRIGGER', 'expenses_fts_insert'),
+    ('TRIGGER', 'expenses_fts_delete'),
+    ('TRIGGER', 'expenses_fts_update'),
+    ('TRIGGER', 'recurring_fts_insert'),
+    ('TRIGGER', 'recurring_fts_delete'),
+    ('TRIGGER', 'recurring_fts_update'),
+    ('VIEW', 'expense_search_source'),
+    ('VIEW', 'recurring_search_source'),
+    ('TABLE', 'expense_fts'),
+    ('TABLE', 'recurring_fts'),
+]
+
+def _copy_expression(column, old_columns):
+    """SQL that produces a new-schema column from a row of the old table."""
+    if column == 'category_id' and 'category' in old_columns:
+        return "(SELECT id FROM categories WHERE categories.name = old.category)"
+    if column.endswith('_cents') and column[:-len('_cents')] in old_columns:
+        return f"CAST(ROUND(old.{column[:-len('_cents')]} * 100) AS INTEGER)"
+    return f"old.{column}"
+
+def migrate_ledger(connection):
+    """Rewrite ledger tables still using float amounts and category strings."""
+    inspector = inspect(connection)
+    pending = {}
+    for name in LEDGER_TABLES:
+        if inspector.has_table(name):
+            old_columns = {c['name'] for c in inspector.get_columns(name)}
+            if not {c.name for c in Base.metadata.tables[name].columns} <= old_columns:
+                pending[name] = old_columns
+
+    if not pending:
+        return []
+
+    Category.__table__.create(connection, checkfirst=True)
+    if connection.dialect.name == 'sqlite':
+        for kind, name in SEARCH_OBJECTS:
+            connection.exec_driver_sql(f"DROP {kind} IF EXISTS {name}")
+
+    for name, old_columns in pending.items():
+        table = Base.metadata.tables[name]
+        # Indexes follow the renamed table; drop them so the new table can reuse the names
+        for index in inspector.get_indexes(name):
+            connection.exec_driver_sql(f"DROP INDEX {index['name']}")
+        if 'category' in old_columns:
+            # Keep categories users added beyond the predefined list
+            connection.exec_driver_sql(
+                f"INSERT INTO categories (name) SELECT DISTINCT category FROM {name} "
+                f"WHERE category NOT IN (SELECT name FROM categories)"
+            )
+
+        connection.exec_driver_sql(f"ALTER TABLE {name} RENAME TO _{name}_old")
+        table.create(connection)
+        columns = [c.name for c in table.columns]
+        connection.exec_driver_sql(
+            f"INSERT INTO {name} ({', '.join(columns)}) "
+            f"SELECT {', '.join(_copy_expression(c, old_columns) for c in columns)} FROM _{name}_old AS old"
+        )
+        connection.exec_driver_sql(f"DROP TABLE _{name}_old")
+
+    return list(pending)
+
+def migrate_budget_versions(connection):
+    """Turn existing budgets into open-ended versions in effect since BUDGET_EPOCH."""
+    inspector = inspect(connection)
+    if not inspector.has_table('budgets'):
+        return False
+    if 'effective_from' in {c['name'] for c in inspector.get_columns('budgets')}:
+        return False
+
+    table = Base.metadata.tables['budgets']
+    for column in (table.c.effective_from, table.c.effective_to):
+        ddl = f"ALTER TABLE budgets ADD COLUMN {column.name} {column.type.compile(connection.dialect)}"
+        if column.server_default is not None:
+            ddl += f" NOT NULL DEFAULT '{column.server_default.arg}'"
+        connection.exec_driver_sql(ddl)
+    print("✓ Converted budgets to effective-dated versions")
+    return True
+
+def migrate_sync_columns(connection):
+    """Add row_version to synced tables that predate the change journal."""
+    inspector = inspect(connection)
+    added = []
+    for name in SYNC_TABLES:
+        if inspector.has_table(name) and 'row_version' not in {c['name'] for c in inspector.get_columns(name)}:
+            # The sync triggers, created with the schema, number existing rows
+            connection.exec_driver_sql(f"ALTER TABLE {name} ADD COLUMN row_version INTEGER")
+            added.append(name)
+    if added:
+        print(f"✓ Added row_version to {', '.join(added)}")
+    return added
+
+def migrate_user_placement(connection):
+    """Add the shard placement, sync epoch and household columns to an existing users table."""
+    inspector = inspect(connection)
+    if not inspector.has_table('users'):
+        return []
+
+    existing = {c['name'] for c in inspector.get_columns('users')}
+    added = []
+    for column in Base.metadata.tables['users'].columns:
+        if column.name not in existing:
+            # Existing users keep a NULL shard, which routes to the main shard
+            connection.exec_driver_sql(
+                f"ALTER TABLE users ADD COLUMN {column.name} {column.type.compile(connection.dialect)}"
+            )
+            added.append(column.name)
+    if added:
+        print(f"✓ Added {', '.join(added)} to users")
+    return added
+
+def migrate_indexes(connection):
+    """Create indexes added to tables that already exist."""
+    inspector = inspect(connection)
+    created = []
+    for table in Base.metadata.sorted_tables:
+        if not table.indexes or not inspector.has_table(table.name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(connection)
+                created.append(index.name)
+    if created:
+        print(f"✓ Created indexes {', '.join(created)}")
+    return created
+
+def migrate(engine):
+    with engine.begin() as connection:
+        migrate_user_placement(connection)
+        migrate_budget_versions(connection)
+        # Before migrate_ledger, which would otherwise treat the new column as a pending rewrite
+        migrate_sync_columns(connection)
+        migrated = migrate_ledger(connection)
+        migrate_indexes(connection)
+
+    if migrated:
+        print(f"✓ Migrated {', '.join(migrated)} to integer cents and category ids")
+        if engine.dialect.name == 'sqlite':
+            # Hand the space of the rewritten tables back to the filesystem
+            with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+                connection.exec_driver_sql("VACUUM")
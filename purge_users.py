@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Delete users and all of their data with set-based DELETEs.
+
+Rows are deleted per table in batches of --batch rows (default 5000), one
+transaction each, straight from the database: nothing is loaded into memory,
+so users with millions of expenses purge in constant memory without holding
+the write lock for long. An interrupted run can simply be repeated.
+
+WARNING: This permanently deletes the users and everything they recorded!
+
+Usage:
+    python purge_users.py <username> [<username> ...]      # purge these users
+    python purge_users.py --all-except cole,natalie         # purge everyone else
+    python purge_users.py ... --dry-run                     # only count what would go
+    python purge_users.py ... --batch 20000                 # rows per transaction
+"""
+
+import sys
+import time
+
+from sqlalchemy import func
+
+from database import PURGE_BATCH_SIZE, get_session, fan_out, purge_users, user_tables, User
+
+def parse_args(argv):
+    dry_run = '--dry-run' in argv
+    batch_size = PURGE_BATCH_SIZE
+    keep = None
+    usernames = []
+    args = iter(argv)
+    for arg in args:
+        if arg == '--batch':
+            batch_size = int(next(args))
+        elif arg == '--all-except':
+            keep = {name.strip() for name in next(args).split(',') if name.strip()}
+        elif arg != '--dry-run':
+            usernames.append(arg)
+    return usernames, keep, dry_run, batch_size
+
+def count_rows(user_ids):
+    """{table: rows} the users own across every shard."""
+    def count(shard_session):
+        return {
+            table.name: shard_session.query(func.count()).select_from(table).filter(table.c.user_id.in_(user_ids)).scalar()
+            for table in user_tables()
+        }
+
+    totals = {}
+    for counts in fan_out(count).values():
+        for name, rows in counts.items():
+            totals[name] = totals.get(name, 0) + rows
+    return totals
+
+def main(argv):
+    usernames, keep, dry_run, batch_size = parse_args(argv)
+    if not usernames and keep is None:
+        print(__doc__)
+        sys.exit(1)
+
+    db_session = get_session()
+    try:
+        query = db_session.query(User.id, User.username)
+        if keep is not None:
+            users = query.filter(User.username.notin_(keep)).all()
+        else:
+            users = query.filter(User.username.in_(usernames)).all()
+            missing = set(usernames) - {u.username for u in users}
+            for username in sorted(missing):
+                print(f"⚠ No user named '{username}'")
+    finally:
+        db_session.close()
+
+    if not users:
+        print("No users to purge")
+        return
+    print(f"{'Would purge' if dry_run else 'Purging'} {len(users)} user(s): {', '.join(u.username for u in users)}")
+    user_ids = [u.id for u in users]
+
+    if dry_run:
+        for name, rows in sorted(count_rows(user_ids).items()):
+            if rows:
+                print(f"  {name}: {rows} row(s)")
+        return
+
+    last_report = [0.0]
+    def progress(table, deleted):
+        if time.monotonic() - last_report[0] >= 1:
+            last_report[0] = time.monotonic()
+            print(f"  {table}: {deleted} row(s) deleted so far", flush=True)
+
+    start = time.monotonic()
+    totals = purge_users(user_ids, batch_size=batch_size, progress=progress)
+    for name, rows in sorted(totals.items()):
+        if rows:
+            print(f"  ✓ {name}: {rows} row(s) deleted")
+    print(f"Purged {totals.get('users', 0)} user(s) in {time.monotonic() - start:.1f}s")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,109 @@
+"""
+Per-category spending totals for arbitrary date ranges from cumulative sums.
+
+For each user a PrefixSums index holds, per category, the days with expenses
+and the running total of cents up to each of them, so the total for any range
+is the difference of two binary-searched entries. Indexes are built lazily
+from one grouped scan of ix_expenses_user_date and cached per process; the
+expense_index_versions counter, bumped by triggers on every expense write,
+tells a worker when its copy is stale. Archived expenses are folded in, and
+since archiving deletes from expenses it bumps the counter too.
+"""
+
+import bisect
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import date
+
+from sqlalchemy import text
+
+from archive import archive_boundary, read_archived
+from database import category_id
+
+MAX_CACHED_USERS = 1000
+MAX_RANGES = 500
+
+_cache = OrderedDict()  # (database url, user_id) -> (version, PrefixSums)
+_cache_lock = threading.Lock()
+
+
+class PrefixSums:
+    """Cumulative cents per category over the days a user spent money."""
+
+    def __init__(self, rows):
+        """rows: (day ordinal, category_id, cents) grouped by day and category, in day order."""
+        self.days = {}
+        self.sums = {}
+        for day, category, cents in rows:
+            days = self.days.setdefault(category, [])
+            sums = self.sums.setdefault(category, [])
+            days.append(day)
+            sums.append((sums[-1] if sums else 0) + cents)
+
+    def totals(self, start=None, end=None):
+        """{category_id: cents} spent from start through end (dates, inclusive; None is open).
+
+        In category id order, as a grouped scan returns them.
+        """
+        totals = {}
+        for category in sorted(self.days):
+            days = self.days[category]
+            lo = bisect.bisect_left(days, start.toordinal()) if start else 0
+            hi = bisect.bisect_right(days, end.toordinal()) if end else len(days)
+            if hi > lo:
+                sums = self.sums[category]
+                totals[category] = sums[hi - 1] - (sums[lo - 1] if lo else 0)
+        return totals
+
+
+def _version(db_session, user_id):
+    if db_session.get_bind().dialect.name != 'sqlite':
+        return None  # no version triggers; rebuild on every request
+    return db_session.execute(
+        text("SELECT version FROM expense_index_versions WHERE user_id = :user_id"), {'user_id': user_id}
+    ).scalar()
+
+
+def _build(db_session, user_id):
+    rows = db_session.execute(text(
+        "SELECT date, category_id, SUM(amount_cents) FROM expenses "
+        "WHERE user_id = :user_id GROUP BY date, category_id ORDER BY date"
+    ), {'user_id': user_id})
+    if archive_boundary(db_session, user_id) is None:
+        return PrefixSums((_to_ordinal(day), category, cents) for day, category, cents in rows)
+
+    # Archived days come first, but backdated hot expenses can share them
+    grouped = defaultdict(int)
+    for row in read_archived(db_session, user_id, columns=['date', 'category', 'amount_cents']):
+        grouped[(row['date'].toordinal(), category_id(db_session, row['category']))] += row['amount_cents']
+    for day, category, cents in rows:
+        grouped[(_to_ordinal(day), category)] += cents
+    return PrefixSums((day, category, cents) for (day, category), cents in sorted(grouped.items()))
+
+
+def _to_ordinal(day):
+    # Raw SQL returns SQLite dates as 'YYYY-MM-DD' strings
+    if isinstance(day, str):
+        day = date.fromisoformat(day)
+    return day.toordinal()
+
+
+def get_prefix_sums(db_session, user_id):
+    """The user's PrefixSums, rebuilt only if their expenses changed since it was cached."""
+    key = (str(db_session.get_bind().url), user_id)
+    # Read before building: a write in between leaves a stale version, forcing a rebuild next time
+    version = _version(db_session, user_id)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached and version is not None and cached[0] == version:
+            _cache.move_to_end(key)
+            return cached[1]
+
+    index = _build(db_session, user_id)
+    if version is not None:
+        with _cache_lock:
+            _cache[key] = (version, index)
+            _cache.move_to_end(key)
+            while len(_cache) > MAX_CACHED_USERS:
+                _cache.popitem(last=False)
+    return index
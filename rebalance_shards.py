@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Move users between database shards while the app keeps running.
+
+With no arguments, every user whose shard differs from the one the hash ring
+picks (typically after adding a shard to DATABASE_SHARDS) is moved there. A
+move flags the user so the app pauses their writes, waits out cached
+placements, copies their rows to the new shard, switches users.shard (bumping
+users.sync_epoch, so offline copies start over) and then deletes the originals. Reads keep being served from the old shard until the
+switch. Rows left behind by an interrupted move are cleaned up on the next run.
+
+Usage:
+    python rebalance_shards.py                     # move misplaced users
+    python rebalance_shards.py --dry-run           # only report what would move
+    python rebalance_shards.py <username> <shard>  # move one user
+"""
+
+import sys
+import time
+
+from sqlalchemy import distinct, func, select
+
+from database import (
+    MAIN_SHARD, PLACEMENT_TTL, SHARD_URLS, shard_ring, get_session, fan_out, user_tables,
+    purge_user_data, category_id, category_name, User
+)
+
+WRITE_GRACE = 2  # seconds for writes that started before the pause to finish
+SKIP_TABLES = {
+    'change_events',  # short-lived; streams resync on reconnect
+    'expense_index_versions',  # rebuilt by triggers as expenses are copied
+    'expense_month_totals',  # likewise
+    'jobs',  # lives in the directory database, not on shards
+    'sync_tombstones',  # ids change on the new shard; the bumped sync_epoch makes clients resync from scratch
+}
+
+def set_placement(user_id, **values):
+    db_session = get_session()
+    try:
+        db_session.query(User).filter_by(id=user_id).update(values)
+        db_session.commit()
+    finally:
+        db_session.close()
+
+def copy_user_rows(user_id, source_session, target_session):
+    """Insert a user's rows into the target shard, assigning new ids there."""
+    id_maps = {}
+    copied = 0
+    for table in user_tables():
+        if table.name in SKIP_TABLES:
+            continue
+
+        id_map = id_maps[table.name] = {}
+        rows = source_session.execute(
+            table.select().where(table.c.user_id == user_id).order_by(table.c.id)
+        ).mappings().all()
+        for row in rows:
+            values = dict(row)
+            old_id = values.pop('id')
+            for column in table.c:
+                for foreign_key in column.foreign_keys:
+                    referenced = foreign_key.column.table.name
+                    if values[column.name] is None:
+                        continue
+                    if referenced == 'categories':
+                        # Category ids are per shard; translate by name
+                        name = category_name(source_session, values[column.name])
+                        values[column.name] = category_id(target_session, name)
+                    elif referenced in id_maps:
+                        values[column.name] = id_maps[referenced][values[column.name]]
+            id_map[old_id] = target_session.execute(table.insert().values(**values)).inserted_primary_key[0]
+            copied += 1
+    return copied
+
+def move_users(moves):
+    """Move [(user_id, username, source, target), ...] between shards."""
+    for user_id, _, _, _ in moves:
+        set_placement(user_id, is_moving=True)
+    # Processes may route with a placement cached before the flag was set
+    time.sleep(PLACEMENT_TTL + WRITE_GRACE)
+
+    for user_id, username, source, target in moves:
+        source_session = get_session(source)
+        target_session = get_session(target)
+        try:
+            # Anything already on the target is from an interrupted move
+            for table in reversed(user_tables()):
+                target_session.execute(table.delete().where(table.c.user_id == user_id))
+            copied = copy_user_rows(user_id, source_session, target_session)
+            target_session.commit()
+        except Exception:
+            target_session.rollback()
+            set_placement(user_id, is_moving=False)
+            raise
+        finally:
+            source_session.close()
+            target_session.close()
+
+        set_placement(user_id, shard=target, is_moving=False, sync_epoch=func.coalesce(User.sync_epoch, 0) + 1)
+        purge_user_data(user_id, shard=source)
+        print(f"✓ Moved {username} ({copied} rows): {source} -> {target}")
+
+def sweep_orphans():
+    """Delete rows left on shards that no longer own their user."""
+    db_session = get_session()
+    try:
+        placements = {u.id: u.shard or MAIN_SHARD for u in db_session.query(User.id, User.shard)}
+    finally:
+        db_session.close()
+
+    def owners(shard_session):
+        user_ids = set()
+        for table in user_tables():
+            user_ids.update(shard_session.execute(select(distinct(table.c.user_id))).scalars())
+        return user_ids
+
+    for shard, user_ids in fan_out(owners).items():
+        for user_id in user_ids:
+            # Users created after the placements were read are left alone
+            if user_id in placements and placements[user_id] != shard:
+                purge_user_data(user_id, shard=shard)
+                print(f"  Removed leftover rows of user {user_id} from {shard}")
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    dry_run = '--dry-run' in sys.argv
+
+    db_session = get_session()
+    try:
+        if len(args) == 2:
+            username, target = args
+            if target not in SHARD_URLS:
+                print(f"✗ Unknown shard '{target}'. Configured: {', '.join(SHARD_URLS)}")
+                sys.exit(1)
+            users = db_session.query(User).filter_by(username=username).all()
+            if not users:
+                print(f"✗ User '{username}' not found")
+                sys.exit(1)
+            moves = [(u.id, u.username, u.shard or MAIN_SHARD, target) for u in users]
+        else:
+            users = db_session.query(User).all()
+            moves = [(u.id, u.username, u.shard or MAIN_SHARD, shard_ring.node_for(u.id)) for u in users]
+        moves = [m for m in moves if m[2] != m[3]]
+    finally:
+        db_session.close()
+
+    print(f"Shards: {', '.join(SHARD_URLS)}")
+    if not moves:
+        print("✓ Every user is on the right shard")
+    for _, username, source, target in moves:
+        print(f"  {username}: {source} -> {target}")
+
+    if dry_run:
+        return
+    if moves:
+        move_users(moves)
+    sweep_orphans()
+
+if __name__ == '__main__':
+    main()
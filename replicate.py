@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Keep the read replicas in DATABASE_REPLICAS fed.
+Every interval, writes a heartbeat on each primary that has replicas, then
+refreshes SQLite replicas with an online backup of their primary, so each
+snapshot carries the heartbeat it was taken after. Replicas on other databases
+(e.g. a PostgreSQL streaming standby) copy themselves and only need the
+heartbeat for their lag to be measured.
+
+Usage:
+    python replicate.py [interval_seconds]   # run continuously (default 2s)
+    python replicate.py --once               # one round, e.g. from cron
+"""
+
+import os
+import sqlite3
+import sys
+import time
+
+from sqlalchemy.engine import make_url
+
+from database import REPLICA_URLS, get_engine, get_session, ReplicationHeartbeat
+
+def write_heartbeat(shard):
+    db_session = get_session(shard)
+    try:
+        db_session.merge(ReplicationHeartbeat(id=1, written_at=time.time()))
+        db_session.commit()
+    finally:
+        db_session.close()
+
+def snapshot(shard, replica_url):
+    """Copy a SQLite primary into a SQLite replica file with the online backup API."""
+    replica_path = make_url(replica_url).database
+    primary = get_engine(shard).raw_connection()
+    try:
+        replica = sqlite3.connect(replica_path)
+        try:
+            # Readers of the replica see either the old or the new snapshot, never a mix
+            primary.driver_connection.backup(replica)
+        finally:
+            replica.close()
+    finally:
+        primary.close()
+
+def replicate_once():
+    for shard, urls in REPLICA_URLS.items():
+        write_heartbeat(shard)
+        for url in urls:
+            if make_url(url).get_backend_name() == 'sqlite' and get_engine(shard).dialect.name == 'sqlite':
+                snapshot(shard, url)
+
+def main():
+    if not REPLICA_URLS:
+        print("No replicas configured; set DATABASE_REPLICAS (e.g. main=sqlite:///budget-replica.db)")
+        sys.exit(1)
+
+    if '--once' in sys.argv:
+        replicate_once()
+        return
+
+    interval = float(sys.argv[1]) if len(sys.argv) > 1 else 2
+    print(f"Replicating {sum(len(urls) for urls in REPLICA_URLS.values())} replica(s) every {interval}s (pid {os.getpid()})")
+    while True:
+        start = time.monotonic()
+        try:
+            replicate_once()
+        except Exception as e:
+            print(f"Replication error: {e}")
+        time.sleep(max(0, interval - (time.monotonic() - start)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Spending comparisons across arbitrary periods, computed in one SQL statement.
+
+Period syntax accepted from users:
+    2026                     a calendar year
+    2026-Q3                  a quarter
+    2026-09                  a month
+    2026-09-05..2026-10-04   a custom range (both ends inclusive)
+"""
+
+import calendar
+import re
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from archive import archive_boundary, archived_totals
+from database import category_name, from_cents
+
+MAX_PERIODS = 60
+# With stats on expenses SQLite's planner otherwise builds a throwaway automatic
+# index; INDEXED BY is SQLite syntax, so other databases plan it themselves
+SQLITE_INDEX_HINT = 'INDEXED BY ix_expenses_user_date'
+
+_YEAR = re.compile(r'^(\d{4})$')
+_QUARTER = re.compile(r'^(\d{4})-[Qq]([1-4])$')
+_MONTH = re.compile(r'^(\d{4})-(\d{1,2})$')
+_RANGE = re.compile(r'^(\d{4}-\d{2}-\d{2})\.\.(\d{4}-\d{2}-\d{2})$')
+
+# Each period is one range scan of ix_expenses_user_date, which covers the
+# columns summed here, so expense rows are only read for the days a period
+# spans; the window functions then run over the small period x category grid.
+COMPARE_SQL = """
+WITH periods(idx, start_date, end_date) AS (VALUES {periods}),
+totals AS (
+    SELECT p.idx, e.category_id, SUM(e.amount_cents) AS cents, COUNT(*) AS count
+    FROM periods p
+    CROSS JOIN expenses e {index_hint}
+    WHERE e.user_id = :user_id AND e.date >= p.start_date AND e.date < p.end_date
+    GROUP BY p.idx, e.category_id
+),
+-- Totals of archived expenses for periods reaching before the archive boundary
+archived(idx, category_id, cents, count) AS ({archived}),
+grid AS (
+    -- Zero rows fill in categories a period has no spending in, so LAG() compares
+    -- adjacent periods (a LEFT JOIN here makes SQLite scan all of expenses)
+    SELECT idx, category_id, SUM(cents) AS cents, SUM(count) AS count
+    FROM (
+        SELECT idx, category_id, cents, count FROM totals
+        UNION ALL
+        SELECT idx, category_id, cents, count FROM archived
+        UNION ALL
+        SELECT p.idx, c.category_id, 0, 0
+        FROM periods p CROSS JOIN (SELECT category_id FROM totals UNION SELECT category_id FROM archived) c
+    )
+    GROUP BY idx, category_id
+)
+SELECT idx, category_id, cents, count,
+       cents - LAG(cents) OVER by_category AS delta,
+       SUM(cents) OVER (by_category ROWS UNBOUNDED PRECEDING) AS running,
+       SUM(cents) OVER (PARTITION BY idx) AS period_cents
+FROM grid
+WINDOW by_category AS (PARTITION BY category_id ORDER BY idx)
+ORDER BY idx, cents DESC
+"""
+
+
+def parse_period(period):
+    """Return (start, end) for a period string, end exclusive; ValueError if malformed."""
+    period = period.strip()
+    if match := _YEAR.match(period):
+        year = int(match.group(1))
+        return date(year, 1, 1), date(year + 1, 1, 1)
+    if match := _QUARTER.match(period):
+        year, quarter = int(match.group(1)), int(match.group(2))
+        start = date(year, 3 * quarter - 2, 1)
+        return start, date(year + 1, 1, 1) if quarter == 4 else date(year, 3 * quarter + 1, 1)
+    if match := _MONTH.match(period):
+        year, month = int(match.group(1)), int(match.group(2))
+        start = date(year, month, 1)
+        return start, start + timedelta(days=calendar.monthrange(year, month)[1])
+    if match := _RANGE.match(period):
+        start, last = date.fromisoformat(match.group(1)), date.fromisoformat(match.group(2))
+        if last < start:
+            raise ValueError(f"Period '{period}' ends before it starts")
+        return start, last + timedelta(days=1)
+    raise ValueError(f"Unrecognized period '{period}'")
+
+
+def compare_periods(db_session, user_id, periods):
+    """Per-category totals, deltas and running totals for each (label, start, end) period.
+
+    Deltas are against the previous period in the order given and running
+    totals accumulate in that order, so callers choose what is compared.
+    """
+    params = {'user_id': user_id}
+    values = []
+    for idx, (_, start, end) in enumerate(periods):
+        values.append(f'({idx}, :start_{idx}, :end_{idx})')
+        params[f'start_{idx}'] = str(start)
+        params[f'end_{idx}'] = str(end)
+
+    archived = []
+    boundary = archive_boundary(db_session, user_id)
+    for idx, (_, start, end) in enumerate(periods):
+        if boundary and start < boundary:
+            for category, (cents, count) in archived_totals(db_session, user_id, start, end - timedelta(days=1)).items():
+                archived.append(f'({idx}, {int(category)}, {int(cents)}, {int(count)})')
+
+    rows = db_session.execute(text(COMPARE_SQL.format(
+        periods=', '.join(values),
+        index_hint=SQLITE_INDEX_HINT if db_session.get_bind().dialect.name == 'sqlite' else '',
+        archived='VALUES ' + ', '.join(archived) if archived else 'SELECT 0, 0, 0, 0 WHERE 1 = 0'
+    )), params).all()
+
+    results = [{
+        'period': label,
+        'start_date': start.isoformat(),
+        'end_date': (end - timedelta(days=1)).isoformat(),
+        'total': 0,
+        'categories': []
+    } for label, start, end in periods]
+    for row in rows:
+        result = results[row.idx]
+        result['total'] = from_cents(row.period_cents)
+        result['categories'].append({
+            'category': category_name(db_session, row.category_id),
+            'total': from_cents(row.cents),
+            'count': row.count,
+            'delta': from_cents(row.delta) if row.delta is not None else None,
+            'running_total': from_cents(row.running)
+        })
+
+    running = 0
+    for idx, result in enumerate(results):
+        result['delta'] = round(result['total'] - results[idx - 1]['total'], 2) if idx else None
+        running += result['total']
+        result['running_total'] = round(running, 2)
+    return results
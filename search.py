@@ -0,0 +1,170 @@
+"""
+Full-text search over expense descriptions and recurring expense names, backed
+by the FTS5 indexes defined in database.py.
+
+Query syntax accepted from users:
+    coffee            prefix match (coffee, coffeehouse, ...)
+    "whole foods"     exact phrase
+    coffee "bus pass" terms are combined with AND
+
+Archived expenses (see archive.py) left the expenses table and its index; their
+descriptions are matched from the archive partitions with the same tokenizing
+rules, and those hits follow the ranked ones, newest first.
+"""
+
+import itertools
+import re
+import unicodedata
+
+from sqlalchemy import text
+
+import archive
+from database import from_cents
+
+DEFAULT_LIMIT = 25
+MAX_LIMIT = 100
+
+_QUERY_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+_WORD = re.compile(r'[^\W_]+')
+
+
+def parse_terms(query):
+    """[(text, is_prefix)] of the user's input: quoted phrases exact, bare words as prefixes."""
+    terms = []
+    for phrase, word in _QUERY_TOKEN.findall(query or ''):
+        if phrase.strip():
+            terms.append((phrase.strip(), False))
+        elif word:
+            word = word.rstrip('*').replace('"', '')
+            if word:
+                terms.append((word, True))
+    return terms
+
+
+def build_match_query(query, column, user_id):
+    """Translate user input into a safe FTS5 MATCH expression scoped to one user.
+
+    Every term is quoted, so FTS5 operators and column filters typed by the
+    user are searched as plain text rather than interpreted.
+    Returns None if the input contains no searchable terms.
+    """
+    terms = ['"' + term.replace('"', '""') + '"' + ('*' if prefix else '') for term, prefix in parse_terms(query)]
+    if not terms:
+        return None
+    return f'{column} : ({" ".join(terms)}) AND owner : "u{int(user_id)}"'
+
+
+def tokenize(value):
+    """Words of value as the FTS5 unicode61 tokenizer (remove_diacritics 2) indexes them."""
+    value = ''.join(c for c in unicodedata.normalize('NFKD', value or '') if not unicodedata.combining(c))
+    return _WORD.findall(value.casefold())
+
+
+def _matches(tokens, terms):
+    """Whether every (tokens, is_prefix) term appears in tokens, as a run of consecutive words."""
+    for words, prefix in terms:
+        last = len(words) - 1
+        if not any(
+            all(tokens[start + i] == word or (prefix and i == last and tokens[start + i].startswith(word))
+                for i, word in enumerate(words))
+            for start in range(len(tokens) - last)
+        ):
+            return False
+    return True
+
+
+def search_archived(db_session, user_id, query, start_date=None, end_date=None, category=None):
+    """Archived expenses whose description matches the query, newest first (a generator)."""
+    terms = [(tokenize(term), prefix) for term, prefix in parse_terms(query)]
+    terms = [(words, prefix) for words, prefix in terms if words]
+    if not terms:
+        return
+    columns = ['id', 'date', 'category', 'amount_cents', 'description']
+    for row in archive.read_archived(db_session, user_id, start_date, end_date, columns=columns, newest_first=True):
+        if (category is None or row['category'] == category) and _matches(tokenize(row['description']), terms):
+            yield {**archive.serialize_archived(row), 'rank': None}
+
+
+def search_expenses(db_session, user_id, query, start_date=None, end_date=None,
+                    category=None, limit=DEFAULT_LIMIT, offset=0):
+    """Ranked expense hits for one user, then archived ones, plus whether another page exists."""
+    match = build_match_query(query, 'description', user_id)
+    if match is None:
+        return [], False
+
+    limit = max(1, min(limit or DEFAULT_LIMIT, MAX_LIMIT))
+    filters = ''
+    params = {'match': match, 'limit': limit + 1, 'offset': max(0, offset or 0)}
+
+    if start_date:
+        filters += ' AND e.date >= :start_date'
+        params['start_date'] = str(start_date)
+    if end_date:
+        filters += ' AND e.date <= :end_date'
+        params['end_date'] = str(end_date)
+    if category:
+        filters += ' AND c.name = :category'
+        params['category'] = category
+
+    matching = f"""
+        FROM expense_fts
+        JOIN expenses e ON e.id = expense_fts.rowid
+        JOIN categories c ON c.id = e.category_id
+        WHERE expense_fts MATCH :match{filters}
+    """
+    rows = db_session.execute(text(f"""
+        SELECT e.id, e.date, c.name AS category, e.amount_cents, e.description, expense_fts.rank AS rank
+        {matching}
+        ORDER BY expense_fts.rank, e.date DESC, e.id DESC
+        LIMIT :limit OFFSET :offset
+    """), params).all()
+
+    hits = [{
+        'id': r.id,
+        'date': str(r.date),
+        'category': r.category,
+        'amount': from_cents(r.amount_cents),
+        'description': r.description,
+        'rank': round(r.rank, 4)
+    } for r in rows[:limit]]
+    if len(rows) > limit:
+        return hits, True
+
+    # The live hits ran out on this page; archived ones follow them
+    skip = 0
+    if not rows and params['offset']:
+        skip = params['offset'] - db_session.execute(text(f"SELECT COUNT(*) {matching}"), params).scalar()
+    archived = search_archived(db_session, user_id, query, start_date, end_date, category)
+    hits += itertools.islice(archived, max(0, skip), max(0, skip) + limit - len(hits) + 1)
+    return hits[:limit], len(hits) > limit
+
+
+def search_recurring(db_session, user_id, query, category=None, limit=DEFAULT_LIMIT):
+    """Active recurring expense templates whose name matches the query."""
+    match = build_match_query(query, 'name', user_id)
+    if match is None:
+        return []
+
+    filters = ''
+    params = {'match': match, 'limit': max(1, min(limit or DEFAULT_LIMIT, MAX_LIMIT))}
+    if category:
+        filters += ' AND c.name = :category'
+        params['category'] = category
+
+    rows = db_session.execute(text(f"""
+        SELECT r.id, r.name, c.name AS category, r.amount_cents, r.frequency
+        FROM recurring_fts
+        JOIN recurring_expenses r ON r.id = recurring_fts.rowid
+        JOIN categories c ON c.id = r.category_id
+        WHERE recurring_fts MATCH :match AND r.is_active = 1{filters}
+        ORDER BY bm25(recurring_fts)
+        LIMIT :limit
+    """), params).all()
+
+    return [{
+        'id': r.id,
+        'name': r.name,
+        'category': r.category,
+        'amount': from_cents(r.amount_cents),
+        'frequency': r.frequency
+    } for r in rows]
@@ -1,17 +1,141 @@
 // Global state
 let currentBudgets = {};
+// Dashboard data rendered by the server, used once for the first dashboard visit
+let pendingDashboard = null;
+// 'mine' or 'household'; the scope selects show up when the account is in a household
+let viewScope = 'mine';
+// Lists as last rendered (null until loaded), so live updates can patch them in place
+let expensesCache = null;
+let savingsCache = null;
+let goalsCache = null;
+let recurringCache = null;
+let liveUpdatesConnected = false;
+// Local copy of the synced lists in IndexedDB, kept current with /api/sync deltas
+const LOCAL_DB_NAME = 'budget-tracker';
+const SYNCED_STORES = ['expenses', 'savings', 'savings_goals', 'recurring_expenses'];
+let localDbPromise = null;
+let localDataReady = false;
+let archivedBefore = null; // expenses dated before this are archived server-side and not synced
+let syncInFlight = null;
+// GET responses: identical requests in flight share one fetch; those made for a tab are
+// kept until a write touching that tab (or CACHE_MAX_AGE) so revisiting it costs nothing
+const CACHE_MAX_AGE = 5 * 60 * 1000;
+const requestsInFlight = new Map();
+const responseCache = new Map();
+let cacheGeneration = 0; // bumped on every change, so responses fetched before it aren't cached
+// Tabs whose cached responses a change to each entity makes stale
+const STALE_TABS = {
+    expense: ['dashboard', 'visualizations', 'reports'],
+    saving: ['reports'],
+    savings_goal: [],
+    recurring_expense: ['settings'],
+    budgets: ['dashboard', 'budget', 'visualizations', 'reports'],
+    settings: ['dashboard', 'settings', 'reports'] // prorated limits follow the tracking start date
+};
 
 // Initialize app
 document.addEventListener('DOMContentLoaded', function() {
-    checkAuth();
+    const initialState = readInitialState();
+
     initializeTabs();
     initializeExpenseForm();
     initializeSavingsForm();
+    initializeVisualizations();
+    initializeReports();
+    initializeSettings();
+    initializeHousehold();
     initializeLogout();
-    loadExpenses();
     setTodayDate();
+
+    if (initialState) {
+        hydrateInitialState(initialState);
+    } else {
+        checkAuth();
+        loadExpenses();
+    }
+
+    connectLiveUpdates();
+    registerServiceWorker();
 });
 
+// Read the state embedded by the server in index.html
+function readInitialState() {
+    const element = document.getElementById('initialState');
+    if (!element) return null;
+
+    try {
+        return JSON.parse(element.textContent);
+    } catch (error) {
+        console.error('Invalid initial state:', error);
+        return null;
+    }
+}
+
+// Render the first screen without waiting on any API calls
+function hydrateInitialState(state) {
+    showUsername(state.auth.username);
+    currentBudgets = state.budgets;
+    pendingDashboard = state.dashboard;
+    renderExpenses(state.expenses.items);
+
+    // Only the first page was embedded; the rest comes from the local copy,
+    // which a repeat visit only has to bring up to date
+    if (state.expenses.has_more) {
+        loadExpenses();
+    } else {
+        syncLocalData();
+    }
+}
+
+// Fetch JSON, sharing the request with identical ones in flight. With a tab, the response
+// is cached until dataChanged() marks that tab stale. Callers must not mutate the result.
+function fetchJSON(url, tab) {
+    const cached = tab && responseCache.get(url);
+    if (cached && Date.now() - cached.fetchedAt < CACHE_MAX_AGE) {
+        return Promise.resolve(cached.data);
+    }
+    if (requestsInFlight.has(url)) {
+        return requestsInFlight.get(url);
+    }
+
+    const generation = cacheGeneration;
+    const request = fetch(url)
+        .then(response => {
+            if (!response.ok) throw new Error(`${url} failed with ${response.status}`);
+            return response.json();
+        })
+        .then(data => {
+            // A write while this was in flight may have made it stale already
+            if (tab && generation === cacheGeneration) {
+                responseCache.set(url, { tab, data, fetchedAt: Date.now() });
+            }
+            return data;
+        })
+        .finally(() => {
+            if (requestsInFlight.get(url) === request) requestsInFlight.delete(url);
+        });
+    requestsInFlight.set(url, request);
+    return request;
+}
+
+// Forget cached responses that a change to entity makes stale. A household member's
+// change (shared) only makes the combined household views stale.
+function dataChanged(entity, shared = false) {
+    const tabs = STALE_TABS[entity] || [];
+    if (tabs.includes('dashboard') && !shared) pendingDashboard = null;
+    cacheGeneration++;
+    requestsInFlight.clear();
+    for (const [url, entry] of responseCache) {
+        if (tabs.includes(entry.tab) && (!shared || url.startsWith('/api/household/'))) {
+            responseCache.delete(url);
+        }
+    }
+}
+
+function showUsername(username) {
+    document.getElementById('usernameDisplay').textContent = `Welcome, ${username}!`;
+}
+
 // Check authentication
 async function checkAuth() {
     try {
@@ -19,7 +143,7 @@ async function checkAuth() {
         const data = await response.json();
 
         if (data.logged_in) {
-            document.getElementById('usernameDisplay').textContent = `Welcome, ${data.username}!`;
+            showUsername(data.username);
         } else {
             window.location.href = '/login';
         }
@@ -34,6 +158,7 @@ function initializeLogout() {
     document.getElementById('logoutBtn').addEventListener('click', async () => {
         try {
             await fetch('/api/auth/logout', { method: 'POST' });
+            await clearLocalData();
             window.location.href = '/login';
         } catch (error) {
             console.error('Logout failed:', error);
@@ -107,9 +232,10 @@ function initializeExpenseForm() {
 
             if (response.ok) {
                 showNotification('Expense added successfully!', 'success');
+                dataChanged('expense');
                 form.reset();
                 setTodayDate();
-                loadExpenses();
+                if (!liveUpdatesConnected) loadExpenses();
             } else {
                 showNotification('Error adding expense', 'error');
             }
@@ -122,54 +248,80 @@ function initializeExpenseForm() {
     // Filter buttons
     document.getElementById('filterBtn').addEventListener('click', loadExpenses);
     document.getElementById('clearFilterBtn').addEventListener('click', () => {
+        document.getElementById('expenseSearch').value = '';
         document.getElementById('filterStartDate').value = '';
         document.getElementById('filterEndDate').value = '';
         loadExpenses();
     });
+
+    // Search as you type, once typing pauses
+    let searchTimer = null;
+    document.getElementById('expenseSearch').addEventListener('input', () => {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(loadExpenses, 250);
+    });
 }
 
 // Load expenses
 async function loadExpenses() {
+    const searchQuery = document.getElementById('expenseSearch').value.trim();
     const startDate = document.getElementById('filterStartDate').value;
     const endDate = document.getElementById('filterEndDate').value;
 
-    let url = '/api/expenses';
+    let url = searchQuery ? '/api/expenses/search' : '/api/expenses';
     const params = new URLSearchParams();
 
+    if (searchQuery) {
+        params.append('q', searchQuery);
+        params.append('limit', 100);
+    }
     if (startDate) params.append('start_date', startDate);
     if (endDate) params.append('end_date', endDate);
 
     if (params.toString()) url += '?' + params.toString();
 
     try {
-        const response = await fetch(url);
-        const expenses = await response.json();
-
-        const list = document.getElementById('expensesList');
-
-        if (expenses.length === 0) {
-            list.innerHTML = '<p class="no-data">No expenses found</p>';
+        // Search results are ranked server-side; everything else can come from the local copy
+        const local = searchQuery ? null : await loadLocalList('expenses');
+        if (local && (!archivedBefore || (startDate && startDate >= archivedBefore))) {
+            renderExpenses(local.filter(expenseMatchesFilter).sort(compareByDateDesc));
             return;
         }
 
-        list.innerHTML = expenses.map(exp => `
-            <div class="expense-item">
-                <div class="expense-info">
-                    <div class="expense-date">${formatDate(exp.date)}</div>
-                    <div class="expense-category">${exp.category}</div>
-                    <div class="expense-description">${exp.description || '-'}</div>
-                </div>
-                <div class="expense-actions">
-                    <div class="expense-amount">$${exp.amount.toFixed(2)}</div>
-                    <button onclick="deleteExpense(${exp.id})" class="btn-delete">Delete</button>
-                </div>
-            </div>
-        `).join('');
+        const data = await fetchJSON(url);
+        if (searchQuery && document.getElementById('expenseSearch').value.trim() !== searchQuery) {
+            return; // A newer search is on its way
+        }
+        renderExpenses(searchQuery ? (data.results || []) : data);
     } catch (error) {
         console.error('Error loading expenses:', error);
     }
 }
 
+function renderExpenses(expenses) {
+    expensesCache = expenses;
+    const list = document.getElementById('expensesList');
+
+    if (expenses.length === 0) {
+        list.innerHTML = '<p class="no-data">No expenses found</p>';
+        return;
+    }
+
+    list.innerHTML = expenses.map(exp => `
+        <div class="expense-item">
+            <div class="expense-info">
+                <div class="expense-date">${formatDate(exp.date)}</div>
+                <div class="expense-category">${exp.category}</div>
+                <div class="expense-description">${exp.description || '-'}</div>
+            </div>
+            <div class="expense-actions">
+                <div class="expense-amount">$${exp.amount.toFixed(2)}</div>
+                ${exp.archived ? '' : `<button onclick="deleteExpense(${exp.id})" class="btn-delete">Delete</button>`}
+            </div>
+        </div>
+    `).join('');
+}
+
 // Delete expense
 async function deleteExpense(id) {
     showConfirmModal(
@@ -181,7 +333,8 @@ async function deleteExpense(id) {
 
                 if (response.ok) {
                     showNotification('Expense deleted', 'success');
-                    loadExpenses();
+                    dataChanged('expense');
+                    if (!liveUpdatesConnected) loadExpenses();
                 } else {
                     showNotification('Error deleting expense', 'error');
                 }
@@ -193,51 +346,100 @@ async function deleteExpense(id) {
     );
 }
 
-// Load dashboard
-async function loadDashboard() {
+// Household views: offer them if the account is linked into a household
+async function initializeHousehold() {
+    let household;
     try {
-        const response = await fetch('/api/dashboard');
-        const data = await response.json();
+        household = await fetchJSON('/api/household');
+    } catch (error) {
+        return; // not in one
+    }
+
+    const members = household.members.map(member => member.username).join(' & ');
+    document.querySelectorAll('.scope-select').forEach(select => {
+        select.querySelector('option[value="household"]').textContent = `${household.name} (${members})`;
+        select.closest('.form-group').style.display = 'block';
+        select.addEventListener('change', (e) => {
+            viewScope = e.target.value;
+            document.querySelectorAll('.scope-select').forEach(other => { other.value = viewScope; });
+            if (select.id === 'dashboardScope') {
+                loadDashboard();
+            } else if (document.getElementById('reportMonthSelect').value) {
+                loadMonthlyReport(document.getElementById('reportMonthSelect').value);
+            }
+        });
+    });
+}
 
-        document.getElementById('totalBudget').textContent = `$${data.total_budget.toFixed(2)}`;
-        document.getElementById('totalSpent').textContent = `$${data.total_spent.toFixed(2)}`;
-        document.getElementById('totalRemaining').textContent = `$${data.total_remaining.toFixed(2)}`;
+function scopedUrl(mine, household) {
+    return viewScope === 'household' ? household : mine;
+}
 
-        const progressContainer = document.getElementById('categoryProgress');
+// Household views are cached only while live updates are connected: the other
+// members' changes reach this session through them alone
+function scopedTab(tab) {
+    return viewScope === 'household' && !liveUpdatesConnected ? null : tab;
+}
 
-        if (data.categories.length === 0) {
-            document.getElementById('noBudgetMessage').style.display = 'block';
-            progressContainer.innerHTML = '';
-            return;
-        }
+function memberShares(members) {
+    return `<div class="category-members">${members.map(m => `${m.username}: $${m.spent.toFixed(2)}`).join(' · ')}</div>`;
+}
 
-        document.getElementById('noBudgetMessage').style.display = 'none';
+// Load dashboard
+async function loadDashboard() {
+    if (pendingDashboard && viewScope === 'mine') {
+        renderDashboard(pendingDashboard);
+        pendingDashboard = null;
+        return;
+    }
 
-        progressContainer.innerHTML = data.categories.map(cat => `
-            <div class="category-progress ${cat.status}">
-                <div class="category-header">
-                    <span class="category-name">${cat.category}</span>
-                    <span class="category-amount">$${cat.spent.toFixed(2)} / $${cat.budget.toFixed(2)}</span>
-                </div>
-                <div class="progress-bar">
-                    <div class="progress-fill" style="width: ${Math.min(cat.percentage, 100)}%"></div>
-                </div>
-                <div class="category-details">
-                    <span>${cat.percentage.toFixed(1)}% used</span>
-                    <span class="remaining">$${cat.remaining.toFixed(2)} remaining</span>
-                </div>
-            </div>
-        `).join('');
+    try {
+        const url = scopedUrl('/api/dashboard', '/api/household/dashboard');
+        const data = await fetchJSON(url, scopedTab('dashboard'));
+        if (url !== scopedUrl('/api/dashboard', '/api/household/dashboard')) return; // scope changed meanwhile
+        renderDashboard(data);
     } catch (error) {
         console.error('Error loading dashboard:', error);
     }
 }
 
+function renderDashboard(data) {
+    document.getElementById('totalBudget').textContent = `$${data.total_budget.toFixed(2)}`;
+    document.getElementById('totalSpent').textContent = `$${data.total_spent.toFixed(2)}`;
+    document.getElementById('totalRemaining').textContent = `$${data.total_remaining.toFixed(2)}`;
+
+    const progressContainer = document.getElementById('categoryProgress');
+
+    if (data.categories.length === 0) {
+        document.getElementById('noBudgetMessage').style.display = 'block';
+        progressContainer.innerHTML = '';
+        return;
+    }
+
+    document.getElementById('noBudgetMessage').style.display = 'none';
+
+    progressContainer.innerHTML = data.categories.map(cat => `
+        <div class="category-progress ${cat.status}">
+            <div class="category-header">
+                <span class="category-name">${cat.category}</span>
+                <span class="category-amount">$${cat.spent.toFixed(2)} / $${cat.budget.toFixed(2)}</span>
+            </div>
+            <div class="progress-bar">
+                <div class="progress-fill" style="width: ${Math.min(cat.percentage, 100)}%"></div>
+            </div>
+            <div class="category-details">
+                <span>${cat.percentage.toFixed(1)}% used</span>
+                <span class="remaining">$${cat.remaining.toFixed(2)} remaining</span>
+            </div>
+            ${cat.members ? memberShares(cat.members) : ''}
+        </div>
+    `).join('');
+}
+
 // Load budget setup
 async function loadBudgetSetup() {
     // Load current budgets
-    const budgetResponse = await fetch('/api/budgets');
-    const budgets = await budgetResponse.json();
+    const budgets = await fetchJSON('/api/budgets', 'budget');
     currentBudgets = budgets;
 
     populateBudgetInputs(budgets);
@@ -281,6 +483,7 @@ async function saveBudget() {
         if (response.ok) {
             showNotification('Budget saved successfully!', 'success');
             currentBudgets = budgets;
+            dataChanged('budgets');
         } else {
             showNotification('Error saving budget', 'error');
         }
@@ -293,25 +496,30 @@ async function saveBudget() {
 // Visualizations
 let monthlyTrendsChart, categoryBreakdownChart, budgetVsActualChart;
 
+function initializeVisualizations() {
+    document.getElementById('vizFilterBtn').addEventListener('click', loadCategoryBreakdown);
+}
+
 async function loadVisualizations() {
-    await loadMonthlyTrends();
-    await loadCategoryBreakdown();
-    await loadBudgetVsActual();
+    await Promise.all([loadMonthlyTrends(), loadCategoryBreakdown(), loadBudgetVsActual()]);
+}
 
-    // Set up viz filter
-    document.getElementById('vizFilterBtn').addEventListener('click', loadCategoryBreakdown);
+// Create a chart on first use; afterwards swap in the new data and let Chart.js animate the update
+function drawChart(chart, canvasId, config) {
+    if (!chart) {
+        return new Chart(document.getElementById(canvasId).getContext('2d'), config);
+    }
+    chart.data.labels = config.data.labels;
+    chart.data.datasets.forEach((dataset, i) => { dataset.data = config.data.datasets[i].data; });
+    chart.update();
+    return chart;
 }
 
 async function loadMonthlyTrends() {
     try {
-        const response = await fetch('/api/visualizations/monthly-trends');
-        const data = await response.json();
+        const data = await fetchJSON('/api/visualizations/monthly-trends', 'visualizations');
 
-        const ctx = document.getElementById('monthlyTrendsChart').getContext('2d');
-
-        if (monthlyTrendsChart) monthlyTrendsChart.destroy();
-
-        monthlyTrendsChart = new Chart(ctx, {
+        monthlyTrendsChart = drawChart(monthlyTrendsChart, 'monthlyTrendsChart', {
             type: 'line',
             data: {
                 labels: data.map(d => d.month),
@@ -345,7 +553,7 @@ async function loadMonthlyTrends() {
     }
 }
 
-async function loadCategoryBreakdown() {
+function categoryBreakdownUrl() {
     const startDate = document.getElementById('vizStartDate').value;
     const endDate = document.getElementById('vizEndDate').value;
 
@@ -356,21 +564,24 @@ async function loadCategoryBreakdown() {
     if (endDate) params.append('end_date', endDate);
 
     if (params.toString()) url += '?' + params.toString();
+    return url;
+}
 
-    try {
-        const response = await fetch(url);
-        const data = await response.json();
-
-        const ctx = document.getElementById('categoryBreakdownChart').getContext('2d');
+async function loadCategoryBreakdown() {
+    const url = categoryBreakdownUrl();
 
-        if (categoryBreakdownChart) categoryBreakdownChart.destroy();
+    try {
+        const data = await fetchJSON(url, 'visualizations');
+        if (categoryBreakdownUrl() !== url) {
+            return; // The filter changed while this was loading
+        }
 
         const colors = [
             '#3b82f6', '#ef4444', '#10b981', '#f59e0b', '#8b5cf6',
             '#ec4899', '#14b8a6', '#f97316', '#06b6d4', '#84cc16'
         ];
 
-        categoryBreakdownChart = new Chart(ctx, {
+        categoryBreakdownChart = drawChart(categoryBreakdownChart, 'categoryBreakdownChart', {
             type: 'doughnut',
             data: {
                 labels: data.map(d => d.category),
@@ -405,14 +616,9 @@ async function loadCategoryBreakdown() {
 
 async function loadBudgetVsActual() {
     try {
-        const response = await fetch('/api/visualizations/budget-vs-actual');
-        const data = await response.json();
-
-        const ctx = document.getElementById('budgetVsActualChart').getContext('2d');
-
-        if (budgetVsActualChart) budgetVsActualChart.destroy();
+        const data = await fetchJSON('/api/visualizations/budget-vs-actual', 'visualizations');
 
-        budgetVsActualChart = new Chart(ctx, {
+        budgetVsActualChart = drawChart(budgetVsActualChart, 'budgetVsActualChart', {
             type: 'bar',
             data: {
                 labels: data.map(d => d.category),
@@ -471,9 +677,10 @@ function initializeSavingsForm() {
 
             if (response.ok) {
                 showNotification('Savings added successfully!', 'success');
+                dataChanged('saving');
                 form.reset();
                 setTodayDate();
-                loadSavings();
+                if (!liveUpdatesConnected) loadSavings();
             }
         } catch (error) {
             showNotification('Error adding savings', 'error');
@@ -487,38 +694,46 @@ function initializeSavingsForm() {
 
 async function loadSavings() {
     try {
-        const response = await fetch('/api/savings');
-        const savings = await response.json();
-
-        const savingsList = document.getElementById('savingsList');
-
-        if (savings.length === 0) {
-            savingsList.innerHTML = '<p class="no-data">No savings recorded yet</p>';
+        const local = await loadLocalList('savings');
+        if (local) {
+            renderSavings(local.sort(compareByDateDesc));
             return;
         }
 
-        savingsList.innerHTML = savings.map(s => `
-            <div class="expense-item">
-                <div class="expense-info">
-                    <div class="expense-category" style="background: linear-gradient(135deg, #10b981, #059669);">
-                        💰 Savings
-                    </div>
-                    <div class="expense-details">
-                        <div class="expense-date">${formatDate(s.date)}</div>
-                        ${s.description ? `<div class="expense-description">${s.description}</div>` : ''}
-                    </div>
-                </div>
-                <div class="expense-actions">
-                    <div class="expense-amount">$${s.amount.toFixed(2)}</div>
-                    <button class="btn-delete" onclick="deleteSaving(${s.id})">Delete</button>
-                </div>
-            </div>
-        `).join('');
+        renderSavings(await fetchJSON('/api/savings'));
     } catch (error) {
         console.error('Error loading savings:', error);
     }
 }
 
+function renderSavings(savings) {
+    savingsCache = savings;
+    const savingsList = document.getElementById('savingsList');
+
+    if (savings.length === 0) {
+        savingsList.innerHTML = '<p class="no-data">No savings recorded yet</p>';
+        return;
+    }
+
+    savingsList.innerHTML = savings.map(s => `
+        <div class="expense-item">
+            <div class="expense-info">
+                <div class="expense-category" style="background: linear-gradient(135deg, #10b981, #059669);">
+                    💰 Savings
+                </div>
+                <div class="expense-details">
+                    <div class="expense-date">${formatDate(s.date)}</div>
+                    ${s.description ? `<div class="expense-description">${s.description}</div>` : ''}
+                </div>
+            </div>
+            <div class="expense-actions">
+                <div class="expense-amount">$${s.amount.toFixed(2)}</div>
+                <button class="btn-delete" onclick="deleteSaving(${s.id})">Delete</button>
+            </div>
+        </div>
+    `).join('');
+}
+
 async function deleteSaving(id) {
     showConfirmModal(
         'Delete Savings?',
@@ -528,7 +743,8 @@ async function deleteSaving(id) {
                 const response = await fetch(`/api/savings/${id}`, { method: 'DELETE' });
                 if (response.ok) {
                     showNotification('Savings deleted', 'success');
-                    loadSavings();
+                    dataChanged('saving');
+                    if (!liveUpdatesConnected) loadSavings();
                 }
             } catch (error) {
                 showNotification('Error deleting savings', 'error');
@@ -538,15 +754,25 @@ async function deleteSaving(id) {
 }
 
 // Monthly Reports functionality
+function initializeReports() {
+    document.getElementById('reportMonthSelect').addEventListener('change', (e) => {
+        if (e.target.value) {
+            loadMonthlyReport(e.target.value);
+        } else {
+            document.getElementById('reportContent').style.display = 'none';
+        }
+    });
+}
+
 async function loadAvailableMonths() {
     try {
-        const response = await fetch('/api/reports/available-months');
-        const months = await response.json();
+        const months = await fetchJSON('/api/reports/available-months', 'reports');
 
         const select = document.getElementById('reportMonthSelect');
+        const selected = select.value;
         select.innerHTML = '<option value="">Select a month...</option>';
 
-        months.reverse().forEach(month => {
+        [...months].reverse().forEach(month => {
             const option = document.createElement('option');
             option.value = month;
             const date = new Date(month + '-01');
@@ -554,13 +780,13 @@ async function loadAvailableMonths() {
             select.appendChild(option);
         });
 
-        select.addEventListener('change', (e) => {
-            if (e.target.value) {
-                loadMonthlyReport(e.target.value);
-            } else {
-                document.getElementById('reportContent').style.display = 'none';
-            }
-        });
+        // Keep the open report (refreshed, in case it changed) across visits
+        if (selected && months.includes(selected)) {
+            select.value = selected;
+            loadMonthlyReport(selected);
+        } else {
+            document.getElementById('reportContent').style.display = 'none';
+        }
     } catch (error) {
         console.error('Error loading available months:', error);
     }
@@ -568,8 +794,12 @@ async function loadAvailableMonths() {
 
 async function loadMonthlyReport(yearMonth) {
     try {
-        const response = await fetch(`/api/reports/monthly/${yearMonth}`);
-        const report = await response.json();
+        const url = scopedUrl(`/api/reports/monthly/${yearMonth}`, `/api/household/reports/monthly/${yearMonth}`);
+        const report = await fetchJSON(url, scopedTab('reports'));
+        if (document.getElementById('reportMonthSelect').value !== yearMonth ||
+                url !== scopedUrl(`/api/reports/monthly/${yearMonth}`, `/api/household/reports/monthly/${yearMonth}`)) {
+            return; // Another month or scope was picked while this was loading
+        }
 
         // Update summary
         const date = new Date(yearMonth + '-01');
@@ -615,6 +845,7 @@ async function loadMonthlyReport(yearMonth) {
                             <strong>${cat.percentage.toFixed(1)}%</strong>
                         </div>
                     </div>
+                    ${cat.members ? memberShares(cat.members) : ''}
                 </div>
             `).join('');
         }
@@ -626,6 +857,227 @@ async function loadMonthlyReport(yearMonth) {
     }
 }
 
+// Live updates from other sessions (Server-Sent Events)
+function connectLiveUpdates() {
+    if (!window.EventSource) return;
+
+    const source = new EventSource('/api/events');
+    source.onopen = () => { liveUpdatesConnected = true; };
+    source.onerror = () => {
+        liveUpdatesConnected = false;
+        // Members' changes missed while disconnected aren't replayed
+        for (const url of responseCache.keys()) {
+            if (url.startsWith('/api/household/')) responseCache.delete(url);
+        }
+    };
+    source.addEventListener('change', (e) => {
+        try {
+            applyChange(JSON.parse(e.data));
+        } catch (error) {
+            console.error('Error applying live update:', error);
+        }
+    });
+}
+
+function applyChange(change) {
+    dataChanged(change.entity, change.shared);
+    // Another household member's change carries no data; only the combined views show it
+    if (change.shared) {
+        if (viewScope === 'household') refreshDashboard();
+        return;
+    }
+    if (localDataReady && ['expense', 'saving', 'savings_goal', 'recurring_expense'].includes(change.entity)) {
+        scheduleSync();
+    }
+    if (change.entity === 'expense') {
+        if (expensesCache) {
+            renderExpenses(applyListChange(expensesCache, change, expenseMatchesFilter, compareByDateDesc));
+        }
+        refreshDashboard();
+    } else if (change.entity === 'saving') {
+        if (savingsCache) {
+            renderSavings(applyListChange(savingsCache, change, () => true, compareByDateDesc));
+        }
+    } else if (change.entity === 'savings_goal') {
+        if (goalsCache) {
+            const belongs = goal => goal.is_archived === showingArchivedGoals;
+            renderSavingsGoals(applyListChange(goalsCache, change, belongs, compareByCreatedDesc));
+        }
+    } else if (change.entity === 'recurring_expense') {
+        if (recurringCache) {
+            renderRecurringExpenses(applyListChange(recurringCache, change, () => true, (a, b) => b.id - a.id));
+        }
+    } else if (change.entity === 'budgets') {
+        currentBudgets = change.data;
+        if (document.getElementById('budget').classList.contains('active')) {
+            populateBudgetInputs(change.data);
+        }
+        refreshDashboard();
+    } else if (change.entity === 'settings') {
+        refreshDashboard();
+    } else if (change.entity === 'budget_alert' && change.data) {
+        const alert = change.data;
+        const message = alert.status === 'exceeded'
+            ? `${alert.category} is over budget: $${alert.spent.toFixed(2)} of $${alert.budget.toFixed(2)}`
+            : `${alert.category} has reached ${alert.threshold}% of its budget`;
+        showNotification(message, alert.status === 'exceeded' ? 'error' : 'warning');
+    }
+}
+
+// Upsert or remove one row in a rendered list, keeping its sort order
+function applyListChange(list, change, belongs, compare) {
+    const updated = list.filter(item => item.id !== change.id);
+    if (change.op !== 'delete' && change.data && belongs(change.data)) {
+        updated.push(change.data);
+        updated.sort(compare);
+    }
+    return updated;
+}
+
+function compareByDateDesc(a, b) {
+    return b.date.localeCompare(a.date) || b.id - a.id;
+}
+
+function compareByCreatedDesc(a, b) {
+    return (b.created_at || '').localeCompare(a.created_at || '');
+}
+
+function expenseMatchesFilter(expense) {
+    // Search results are ranked server-side; don't splice unranked rows into them
+    if (document.getElementById('expenseSearch').value.trim()) return false;
+
+    const startDate = document.getElementById('filterStartDate').value;
+    const endDate = document.getElementById('filterEndDate').value;
+    return (!startDate || expense.date >= startDate) && (!endDate || expense.date <= endDate);
+}
+
+// Dashboard totals are aggregates, so they are refetched rather than patched
+function refreshDashboard() {
+    pendingDashboard = null;
+    if (document.getElementById('dashboard').classList.contains('active')) {
+        loadDashboard();
+    }
+}
+
+// Offline support: the service worker caches the app shell, IndexedDB the data
+function registerServiceWorker() {
+    if ('serviceWorker' in navigator) {
+        navigator.serviceWorker.register('/sw.js').catch(error => console.error('Service worker failed:', error));
+    }
+}
+
+function openLocalDb() {
+    if (!localDbPromise) {
+        localDbPromise = new Promise(resolve => {
+            if (!window.indexedDB) return resolve(null);
+            const request = indexedDB.open(LOCAL_DB_NAME, 1);
+            request.onupgradeneeded = () => {
+                SYNCED_STORES.forEach(name => request.result.createObjectStore(name, { keyPath: 'id' }));
+                request.result.createObjectStore('meta');
+            };
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => resolve(null); // e.g. private browsing; fall back to the network
+        });
+    }
+    return localDbPromise;
+}
+
+function idbResult(request) {
+    return new Promise((resolve, reject) => {
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function idbDone(transaction) {
+    return new Promise((resolve, reject) => {
+        transaction.oncomplete = () => resolve();
+        transaction.onerror = () => reject(transaction.error);
+        transaction.onabort = () => reject(transaction.error);
+    });
+}
+
+// Bring the local copy up to date; resolves to whether it now matches the server
+function syncLocalData() {
+    if (!syncInFlight) {
+        syncInFlight = runSync().finally(() => { syncInFlight = null; });
+    }
+    return syncInFlight;
+}
+
+async function runSync() {
+    const db = await openLocalDb();
+    if (!db) return false;
+
+    try {
+        let meta = await idbResult(db.transaction('meta').objectStore('meta').get('sync')) || { version: 0 };
+        archivedBefore = meta.archived_before || null;
+        let hasMore = true;
+        while (hasMore) {
+            const epoch = encodeURIComponent(meta.epoch || '');
+            const response = await fetch(`/api/sync?since=${meta.version}&epoch=${epoch}`);
+            if (!response.ok) return false;
+            const data = await response.json();
+
+            if (meta.user_id !== undefined && meta.user_id !== data.user_id && !data.reset) {
+                meta = { version: 0 }; // another account's copy; start over
+                continue;
+            }
+
+            // Rows, tombstones and the new version land together or not at all
+            const tx = db.transaction([...SYNCED_STORES, 'meta'], 'readwrite');
+            SYNCED_STORES.forEach(name => {
+                const store = tx.objectStore(name);
+                if (data.reset) store.clear();
+                data.changes[name].forEach(row => store.put(row));
+                data.deleted[name].forEach(id => store.delete(id));
+            });
+            meta = {
+                version: data.version,
+                epoch: data.epoch,
+                user_id: data.user_id,
+                archived_before: data.archived_before
+            };
+            archivedBefore = data.archived_before;
+            tx.objectStore('meta').put(meta, 'sync');
+            await idbDone(tx);
+            hasMore = data.has_more;
+        }
+        localDataReady = true;
+        return true;
+    } catch (error) {
+        console.error('Sync failed:', error);
+        return false;
+    }
+}
+
+// A synced list from the local copy, or null when the caller should fetch it instead
+async function loadLocalList(name) {
+    if (!await syncLocalData() && !localDataReady) return null;
+    const db = await openLocalDb();
+    return idbResult(db.transaction(name).objectStore(name).getAll());
+}
+
+// Live updates patch the rendered lists; fold them into the local copy once they settle
+let syncTimer = null;
+function scheduleSync() {
+    clearTimeout(syncTimer);
+    syncTimer = setTimeout(syncLocalData, 1000);
+}
+
+async function clearLocalData() {
+    const db = await openLocalDb();
+    if (db) {
+        const tx = db.transaction([...SYNCED_STORES, 'meta'], 'readwrite');
+        [...SYNCED_STORES, 'meta'].forEach(name => tx.objectStore(name).clear());
+        await idbDone(tx);
+    }
+    if (window.caches) {
+        const names = await caches.keys();
+        await Promise.all(names.map(name => caches.delete(name)));
+    }
+}
+
 // Utility functions
 function formatDate(dateString) {
     const date = new Date(dateString + 'T00:00:00');
@@ -705,47 +1157,54 @@ function initializeSavingsGoals() {
 
 async function loadSavingsGoals() {
     try {
-        const url = `/api/savings-goals?archived=${showingArchivedGoals}`;
-        const response = await fetch(url);
-        const goals = await response.json();
-
-        const goalsList = document.getElementById('goalsList');
-
-        if (goals.length === 0) {
-            goalsList.innerHTML = `<p class="no-data">${showingArchivedGoals ? 'No archived goals' : 'No active goals. Create one to get started!'}</p>`;
+        const local = await loadLocalList('savings_goals');
+        if (local) {
+            renderSavingsGoals(local.filter(goal => goal.is_archived === showingArchivedGoals).sort(compareByCreatedDesc));
             return;
         }
 
-        goalsList.innerHTML = goals.map(goal => `
-            <div class="savings-goal-item">
-                <div class="goal-header">
-                    <h3 class="goal-name">${goal.name}</h3>
-                    <div class="goal-amount">$${goal.current_amount.toFixed(2)} / $${goal.target_amount.toFixed(2)}</div>
-                </div>
-                <div class="progress-bar">
-                    <div class="progress-fill" style="width: ${goal.progress_percentage}%; background: linear-gradient(135deg, #10b981, #059669);"></div>
-                </div>
-                <div class="goal-footer">
-                    <span class="goal-percentage">${goal.progress_percentage}% complete</span>
-                    ${!showingArchivedGoals ? `
-                        <div class="goal-actions">
-                            <button class="btn btn-secondary btn-sm" onclick="showAddToGoalModal(${goal.id}, '${goal.name}')">Add Money</button>
-                            <button class="btn btn-secondary btn-sm" onclick="archiveGoal(${goal.id})">Archive</button>
-                            <button class="btn-delete btn-sm" onclick="deleteGoal(${goal.id})">Delete</button>
-                        </div>
-                    ` : `
-                        <div class="goal-actions">
-                            <span class="goal-completed-date">Archived ${goal.completed_at ? formatDate(goal.completed_at.split('T')[0]) : ''}</span>
-                        </div>
-                    `}
-                </div>
-            </div>
-        `).join('');
+        renderSavingsGoals(await fetchJSON(`/api/savings-goals?archived=${showingArchivedGoals}`));
     } catch (error) {
         console.error('Error loading savings goals:', error);
     }
 }
 
+function renderSavingsGoals(goals) {
+    goalsCache = goals;
+    const goalsList = document.getElementById('goalsList');
+
+    if (goals.length === 0) {
+        goalsList.innerHTML = `<p class="no-data">${showingArchivedGoals ? 'No archived goals' : 'No active goals. Create one to get started!'}</p>`;
+        return;
+    }
+
+    goalsList.innerHTML = goals.map(goal => `
+        <div class="savings-goal-item">
+            <div class="goal-header">
+                <h3 class="goal-name">${goal.name}</h3>
+                <div class="goal-amount">$${goal.current_amount.toFixed(2)} / $${goal.target_amount.toFixed(2)}</div>
+            </div>
+            <div class="progress-bar">
+                <div class="progress-fill" style="width: ${goal.progress_percentage}%; background: linear-gradient(135deg, #10b981, #059669);"></div>
+            </div>
+            <div class="goal-footer">
+                <span class="goal-percentage">${goal.progress_percentage}% complete</span>
+                ${!showingArchivedGoals ? `
+                    <div class="goal-actions">
+                        <button class="btn btn-secondary btn-sm" onclick="showAddToGoalModal(${goal.id}, '${goal.name}')">Add Money</button>
+                        <button class="btn btn-secondary btn-sm" onclick="archiveGoal(${goal.id})">Archive</button>
+                        <button class="btn-delete btn-sm" onclick="deleteGoal(${goal.id})">Delete</button>
+                    </div>
+                ` : `
+                    <div class="goal-actions">
+                        <span class="goal-completed-date">Archived ${goal.completed_at ? formatDate(goal.completed_at.split('T')[0]) : ''}</span>
+                    </div>
+                `}
+            </div>
+        </div>
+    `).join('');
+}
+
 function toggleArchivedGoals() {
     showingArchivedGoals = !showingArchivedGoals;
     const btn = document.getElementById('toggleArchivedBtn');
@@ -776,7 +1235,7 @@ async function createSavingsGoal(name, targetAmount) {
 
         if (response.ok) {
             showNotification('Goal created successfully!', 'success');
-            loadSavingsGoals();
+            if (!liveUpdatesConnected) loadSavingsGoals();
         } else {
             showNotification('Error creating goal', 'error');
         }
@@ -812,7 +1271,7 @@ async function addToGoal(goalId, amount) {
             } else {
                 showNotification('Amount added successfully!', 'success');
             }
-            loadSavingsGoals();
+            if (!liveUpdatesConnected) loadSavingsGoals();
         } else {
             showNotification(data.error || 'Error adding to goal', 'error');
         }
@@ -834,7 +1293,7 @@ async function archiveGoal(goalId) {
 
                 if (response.ok) {
                     showNotification('Goal archived', 'success');
-                    loadSavingsGoals();
+                    if (!liveUpdatesConnected) loadSavingsGoals();
                 } else {
                     showNotification('Error archiving goal', 'error');
                 }
@@ -858,7 +1317,7 @@ async function deleteGoal(goalId) {
 
                 if (response.ok) {
                     showNotification('Goal deleted', 'success');
-                    loadSavingsGoals();
+                    if (!liveUpdatesConnected) loadSavingsGoals();
                 } else {
                     showNotification('Error deleting goal', 'error');
                 }
@@ -871,11 +1330,21 @@ async function deleteGoal(goalId) {
 }
 
 // Settings functionality
+function initializeSettings() {
+    initializeRecurringExpenses();
+    document.getElementById('trackingDateForm').addEventListener('submit', async (e) => {
+        e.preventDefault();
+        await saveTrackingStartDate();
+    });
+}
+
 async function loadSettings() {
+    // Recurring expenses load alongside the tracking date
+    loadRecurringExpenses();
+
     try {
         // Load current tracking start date
-        const response = await fetch('/api/settings/tracking-start-date');
-        const data = await response.json();
+        const data = await fetchJSON('/api/settings/tracking-start-date', 'settings');
 
         if (data.start_date) {
             document.getElementById('trackingDateDisplay').textContent = formatDate(data.start_date);
@@ -887,20 +1356,6 @@ async function loadSettings() {
             const today = new Date().toISOString().split('T')[0];
             document.getElementById('trackingStartDate').value = today;
         }
-
-        // Initialize form handler
-        const form = document.getElementById('trackingDateForm');
-        const newForm = form.cloneNode(true);
-        form.parentNode.replaceChild(newForm, form);
-
-        newForm.addEventListener('submit', async (e) => {
-            e.preventDefault();
-            await saveTrackingStartDate();
-        });
-
-        // Initialize recurring expenses
-        initializeRecurringExpenses();
-        loadRecurringExpenses();
     } catch (error) {
         console.error('Error loading settings:', error);
     }
@@ -930,6 +1385,7 @@ async function saveTrackingStartDate() {
 
         if (data.success) {
             showNotification('✅ Tracking start date saved successfully! Your budgets are now prorated based on tracking days.', 'success');
+            dataChanged('settings');
             loadSettings();
 
             // Show additional confirmation in the UI
@@ -959,43 +1415,51 @@ async function saveTrackingStartDate() {
 // Recurring Expenses functionality
 async function loadRecurringExpenses() {
     try {
-        const response = await fetch('/api/recurring-expenses');
-        const recurring = await response.json();
-
-        const list = document.getElementById('recurringList');
-
-        if (recurring.length === 0) {
-            list.innerHTML = '<p class="no-data">No recurring expenses set up yet.</p>';
+        const local = await loadLocalList('recurring_expenses');
+        if (local) {
+            renderRecurringExpenses(local.sort((a, b) => b.id - a.id));
             return;
         }
 
-        list.innerHTML = recurring.map(r => {
-            const frequencyText = r.frequency.charAt(0).toUpperCase() + r.frequency.slice(1);
-            const lastGen = r.last_generated ? `Last generated: ${formatDate(r.last_generated)}` : 'Not generated yet';
+        renderRecurringExpenses(await fetchJSON('/api/recurring-expenses', 'settings'));
+    } catch (error) {
+        console.error('Error loading recurring expenses:', error);
+    }
+}
 
-            return `
-                <div class="expense-item">
-                    <div class="expense-info">
-                        <div class="expense-category">${r.category}</div>
-                        <div style="margin-top: 8px;">
-                            <strong>${r.name}</strong> - $${r.amount.toFixed(2)}
-                        </div>
-                        <div style="font-size: 0.9rem; color: var(--text-secondary); margin-top: 4px;">
-                            ${frequencyText} • Starts: ${formatDate(r.start_date)}${r.end_date ? ` • Ends: ${formatDate(r.end_date)}` : ''}
-                        </div>
-                        <div style="font-size: 0.85rem; color: var(--text-muted); margin-top: 4px;">
-                            ${lastGen}
-                        </div>
+function renderRecurringExpenses(recurring) {
+    recurringCache = recurring;
+    const list = document.getElementById('recurringList');
+
+    if (recurring.length === 0) {
+        list.innerHTML = '<p class="no-data">No recurring expenses set up yet.</p>';
+        return;
+    }
+
+    list.innerHTML = recurring.map(r => {
+        const frequencyText = r.frequency.charAt(0).toUpperCase() + r.frequency.slice(1);
+        const lastGen = r.last_generated ? `Last generated: ${formatDate(r.last_generated)}` : 'Not generated yet';
+
+        return `
+            <div class="expense-item">
+                <div class="expense-info">
+                    <div class="expense-category">${r.category}</div>
+                    <div style="margin-top: 8px;">
+                        <strong>${r.name}</strong> - $${r.amount.toFixed(2)}
+                    </div>
+                    <div style="font-size: 0.9rem; color: var(--text-secondary); margin-top: 4px;">
+                        ${frequencyText} • Starts: ${formatDate(r.start_date)}${r.end_date ? ` • Ends: ${formatDate(r.end_date)}` : ''}
                     </div>
-                    <div class="expense-actions">
-                        <button onclick="deleteRecurring(${r.id})" class="btn-delete">Delete</button>
+                    <div style="font-size: 0.85rem; color: var(--text-muted); margin-top: 4px;">
+                        ${lastGen}
                     </div>
                 </div>
-            `;
-        }).join('');
-    } catch (error) {
-        console.error('Error loading recurring expenses:', error);
-    }
+                <div class="expense-actions">
+                    <button onclick="deleteRecurring(${r.id})" class="btn-delete">Delete</button>
+                </div>
+            </div>
+        `;
+    }).join('');
 }
 
 function showCreateRecurringModal() {
@@ -1083,7 +1547,8 @@ async function createRecurringExpense(data) {
 
         if (response.ok) {
             showNotification('Recurring expense created!', 'success');
-            loadRecurringExpenses();
+            dataChanged('recurring_expense');
+            if (!liveUpdatesConnected) loadRecurringExpenses();
         } else {
             showNotification('Error creating recurring expense', 'error');
         }
@@ -1105,7 +1570,8 @@ async function deleteRecurring(id) {
 
                 if (response.ok) {
                     showNotification('Recurring expense deleted', 'success');
-                    loadRecurringExpenses();
+                    dataChanged('recurring_expense');
+                    if (!liveUpdatesConnected) loadRecurringExpenses();
                 } else {
                     showNotification('Error deleting recurring expense', 'error');
                 }
@@ -1128,7 +1594,8 @@ async function generateRecurringExpenses() {
         if (data.success) {
             if (data.generated > 0) {
                 showNotification(`Generated ${data.generated} recurring expense(s) for today!`, 'success');
-                loadExpenses(); // Reload expenses to show new ones
+                dataChanged('expense');
+                if (!liveUpdatesConnected) loadExpenses(); // Reload expenses to show new ones
             } else {
                 showNotification('No recurring expenses due today', 'success');
             }
@@ -0,0 +1,48 @@
+// Service worker: keeps the app shell loadable offline and on flaky connections.
+// Data isn't cached here; app.js keeps its own copy in IndexedDB via /api/sync.
+const CACHE_NAME = 'budget-shell-v1';
+
+self.addEventListener('install', () => {
+    self.skipWaiting();
+});
+
+self.addEventListener('activate', (event) => {
+    event.waitUntil(
+        caches.keys()
+            .then(names => Promise.all(names.filter(name => name !== CACHE_NAME).map(name => caches.delete(name))))
+            .then(() => self.clients.claim())
+    );
+});
+
+function cacheCopy(request, response) {
+    // Cross-origin scripts (Chart.js) come back opaque, which is fine to replay
+    if ((response.ok && !response.redirected) || response.type === 'opaque') {
+        const copy = response.clone();
+        caches.open(CACHE_NAME).then(cache => cache.put(request, copy));
+    }
+    return response;
+}
+
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+    const url = new URL(request.url);
+
+    // Fingerprinted assets and the pinned Chart.js build never change: cache first
+    if (url.pathname.startsWith('/assets/') || url.href.startsWith('https://cdn.jsdelivr.net/npm/chart.js@')) {
+        event.respondWith(
+            caches.match(request).then(cached => cached || fetch(request).then(response => cacheCopy(request, response)))
+        );
+        return;
+    }
+
+    // The page (with its embedded state) and unbuilt static files: network first,
+    // the last good copy when offline. API calls always go to the network.
+    if ((request.mode === 'navigate' && url.pathname === '/') || url.pathname.startsWith('/static/')) {
+        event.respondWith(
+            fetch(request)
+                .then(response => cacheCopy(request, response))
+                .catch(() => caches.match(request))
+        );
+    }
+});
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Concurrency check for savings-goal contributions.
+Many threads deposit into the same goal at once through
+POST /api/savings-goals/<id>/add against a throwaway database, then the
+goal's current_amount is checked against the number of successful deposits
+and against the sum of the contribution ledger. For comparison, the same load
+is replayed with the old read-modify-write update, which loses deposits.
+
+Usage:
+    python stress_goal_contributions.py [threads] [deposits_per_thread]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# database.py opens budget.db in the working directory
+os.chdir(tempfile.mkdtemp(prefix='budget-bench-'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import func  # noqa: E402
+
+from app import app  # noqa: E402
+from database import get_session, init_db, User, SavingsGoal, GoalContribution  # noqa: E402
+
+DEPOSIT = 1.25
+
+
+def seed():
+    init_db()
+    db_session = get_session()
+    try:
+        user = User(username='saver', password_hash='x')
+        db_session.add(user)
+        db_session.flush()
+        goals = [SavingsGoal(user_id=user.id, name=name, target_amount=1000000, current_amount=0)
+                 for name in ('ledger', 'legacy')]
+        db_session.add_all(goals)
+        db_session.commit()
+        return user.id, goals[0].id, goals[1].id
+    finally:
+        db_session.close()
+
+
+def hammer(worker, threads, deposits):
+    """Run worker(results) on many threads at once; returns (ok, failed, seconds)."""
+    results = {'ok': 0, 'failed': 0}
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def run():
+        barrier.wait()
+        for _ in range(deposits):
+            ok = worker()
+            with lock:
+                results['ok' if ok else 'failed'] += 1
+
+    pool = [threading.Thread(target=run) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return results['ok'], results['failed'], time.perf_counter() - start
+
+
+def legacy_deposit(goal_id):
+    """The previous add_to_goal(): read the balance, add in Python, write it back."""
+    db_session = get_session()
+    try:
+        goal = db_session.query(SavingsGoal).filter_by(id=goal_id).first()
+        goal.current_amount += DEPOSIT
+        db_session.commit()
+        return True
+    except Exception:
+        db_session.rollback()
+        return False
+    finally:
+        db_session.close()
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    deposits = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    user_id, goal_id, legacy_goal_id = seed()
+
+    local = threading.local()
+
+    def ledger_deposit():
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+            with local.client.session_transaction() as sess:
+                sess['user_id'] = user_id
+        response = local.client.post(f'/api/savings-goals/{goal_id}/add', json={'amount': DEPOSIT})
+        return response.status_code == 200
+
+    print(f"Threads: {threads}, deposits per thread: {deposits}, deposit: {DEPOSIT}")
+    for label, worker, checked_goal in (
+        ('atomic update + ledger', ledger_deposit, goal_id),
+        ('read-modify-write (old)', lambda: legacy_deposit(legacy_goal_id), legacy_goal_id),
+    ):
+        ok, failed, seconds = hammer(worker, threads, deposits)
+        db_session = get_session()
+        try:
+            balance = db_session.query(SavingsGoal).filter_by(id=checked_goal).one().current_amount
+            ledger_count, ledger_cents = db_session.query(
+                func.count(GoalContribution.id), func.coalesce(func.sum(GoalContribution.amount_cents), 0)
+            ).filter_by(goal_id=checked_goal).one()
+        finally:
+            db_session.close()
+
+        expected = round(ok * DEPOSIT, 2)
+        lost = round((expected - balance) / DEPOSIT)
+        print(f"  {label:24s} {ok} ok, {failed} failed in {seconds:.1f}s  balance {balance:.2f} "
+              f"(expected {expected:.2f}, lost deposits: {lost})  ledger rows: {ledger_count}")
+        if worker is ledger_deposit:
+            assert lost == 0, "atomic update lost deposits"
+            assert ledger_count == ok and ledger_cents / 100 == balance, "ledger disagrees with balance"
+    print("✓ Ledger and balance agree for the atomic path")
+
+
+if __name__ == '__main__':
+    main()
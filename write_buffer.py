@@ -0,0 +1,128 @@
+"""
+Group commit for single-row inserts (POST /api/expenses and /api/savings).
+
+With GROUP_COMMIT_MS set, a request hands its insert to a committer thread for
+its shard instead of committing on its own. The committer gathers whatever
+arrives within that many milliseconds (or GROUP_COMMIT_MAX_ROWS inserts) and
+writes it in one transaction, so a burst of inserts costs one fsync instead of
+one per row. Each request still waits for the commit that includes its row,
+so it is only acknowledged once durable, and gets its row's real id back.
+
+If a batch fails, its inserts are retried one transaction each so one bad row
+fails only its own request; an insert that can't be committed at all (e.g.
+the database is unreachable) fails its request and the committer carries on. Committer threads live in each worker process;
+with several gunicorn workers each has its own and they take turns on the
+database lock as before.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from database import get_session, shard_for
+
+# 0 disables the buffer and requests commit their own inserts
+GROUP_COMMIT_MS = float(os.environ.get('GROUP_COMMIT_MS', 0))
+GROUP_COMMIT_MAX_ROWS = int(os.environ.get('GROUP_COMMIT_MAX_ROWS', 100))
+COMMIT_TIMEOUT = 10  # seconds a request waits for its batch
+
+
+class CommitTimeout(Exception):
+    """Raised when a buffered insert wasn't committed in time; it may still land later."""
+
+
+class GroupCommitter:
+    """One shard's queue of pending inserts and the thread that commits them."""
+
+    def __init__(self, shard):
+        self.shard = shard
+        self.pending = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name=f'group-commit-{shard}', daemon=True)
+        self.thread.start()
+
+    def submit(self, insert):
+        future = Future()
+        self.pending.put((insert, future))
+        return future
+
+    def _gather(self):
+        batch = [self.pending.get()]
+        deadline = time.monotonic() + GROUP_COMMIT_MS / 1000
+        while len(batch) < GROUP_COMMIT_MAX_ROWS:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._gather()
+            try:
+                self._commit(batch)
+            except Exception:
+                # Isolate the failure: everything else in the batch commits on its own
+                for item in batch:
+                    if item[1].done():
+                        continue  # committed; only closing the session failed
+                    try:
+                        self._commit([item])
+                    except Exception as e:
+                        # e.g. no connection: fail the request, keep the thread for the next batch
+                        if not item[1].done():
+                            item[1].set_exception(e)
+
+    def _commit(self, batch):
+        db_session = get_session(self.shard)
+        try:
+            results = [insert(db_session) for insert, _ in batch]
+            db_session.commit()
+        except Exception as e:
+            db_session.rollback()
+            if len(batch) > 1:
+                raise
+            batch[0][1].set_exception(e)
+        else:
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+        finally:
+            db_session.close()
+
+
+_committers = {}
+_committers_pid = None
+_committers_lock = threading.Lock()
+
+
+def _committer(shard):
+    """The shard's committer in this process (never one inherited across fork)."""
+    global _committers_pid
+    with _committers_lock:
+        if _committers_pid != os.getpid():
+            _committers.clear()
+            _committers_pid = os.getpid()
+        if shard not in _committers:
+            _committers[shard] = GroupCommitter(shard)
+        return _committers[shard]
+
+
+def enabled():
+    return GROUP_COMMIT_MS > 0
+
+
+def submit(user_id, insert):
+    """Run insert(db_session) for the user's shard in the next group commit; returns its result.
+
+    insert adds and flushes rows and returns what the caller needs (e.g. the
+    new id). It runs on the committer thread, so it must not touch the request.
+    """
+    future = _committer(shard_for(user_id)).submit(insert)
+    try:
+        return future.result(timeout=COMMIT_TIMEOUT)
+    except FutureTimeoutError:
+        raise CommitTimeout()